@@ -0,0 +1,170 @@
+"""
+I hold the async def versions of the read-heavy routes.
+main.py registers this router ahead of its own routes when EMERALD_ASYNC_DB=1,
+so these handlers answer those paths without taking a threadpool worker for
+the duration of the SQLite round trip. The sync handlers stay the documented
+contract (same paths, parameters and payloads), so this router is left out of
+the OpenAPI schema. Bad cursors and sort keys become 400s through main.py's
+InvalidQueryError handler.
+"""
+
+from datetime import date
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import async_crud, database, params, schemas, serialization
+
+router = APIRouter(include_in_schema=False)
+
+
+async def _cursor_page(fetch, db: AsyncSession, after: str, limit: int, **kwargs):
+    items, next_cursor = await fetch(db, after, limit, **kwargs)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get(
+    "/emeralds/",
+    response_model=Union[list[schemas.EmeraldLotRead], schemas.EmeraldLotPage],
+    dependencies=[params.lots_etag],
+)
+async def read_emeralds(
+    response: Response,
+    skip: int = 0, limit: int = params.LimitParam, after: Optional[str] = None,
+    sort: Optional[str] = params.SortParam,
+    filters: dict = Depends(params.emerald_filters),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    if after is not None:
+        page = await _cursor_page(async_crud.get_emeralds_page, db, after, limit, sort=sort, as_rows=True,
+                                  **filters)
+    else:
+        page = await async_crud.get_emeralds(db, skip, limit, sort=sort, as_rows=True, **filters)
+    return serialization.json_response(page, response)
+
+
+@router.get(
+    "/counterparties/",
+    response_model=Union[list[schemas.CounterpartyRead], schemas.CounterpartyPage],
+    dependencies=[params.counterparties_etag],
+)
+async def read_counterparties(
+    response: Response,
+    skip: int = 0, limit: int = params.LimitParam, after: Optional[str] = None,
+    sort: Optional[str] = params.SortParam,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    if after is not None:
+        page = await _cursor_page(async_crud.get_counterparties_page, db, after, limit, sort=sort, as_rows=True)
+    else:
+        page = await async_crud.get_counterparties(db, skip, limit, sort=sort, as_rows=True)
+    return serialization.json_response(page, response)
+
+
+@router.get(
+    "/trades/",
+    response_model=Union[list[schemas.TradeExpandedRead], schemas.TradePage],
+    dependencies=[params.trades_etag],
+)
+async def read_trades(
+    response: Response,
+    skip: int = 0, limit: int = params.LimitParam, after: Optional[str] = None,
+    sort: Optional[str] = params.SortParam,
+    filters: dict = Depends(params.trade_filters),
+    expand: set = Depends(params.trade_expand),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    if expand:  # nested objects go through the ORM and response_model
+        if after is not None:
+            return await _cursor_page(async_crud.get_trades_page, db, after, limit, sort=sort, expand=expand,
+                                      **filters)
+        return await async_crud.get_trades(db, skip, limit, sort=sort, expand=expand, **filters)
+    if after is not None:
+        page = await _cursor_page(async_crud.get_trades_page, db, after, limit, sort=sort, as_rows=True, **filters)
+    else:
+        page = await async_crud.get_trades(db, skip, limit, sort=sort, as_rows=True, **filters)
+    return serialization.json_response(page, response)
+
+
+# The int convertor keeps /trades/export and friends falling through to main.py
+@router.get(
+    "/trades/{trade_id:int}",
+    response_model=schemas.TradeExpandedRead,
+    dependencies=[params.trades_etag],
+)
+async def read_trade(
+    trade_id: int, expand: set = Depends(params.trade_expand),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    db_trade = await async_crud.get_trade(db, trade_id, expand)
+    if not db_trade:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return db_trade
+
+
+@router.get("/search", dependencies=[params.search_etag])
+async def search(
+    response: Response, q: str, limit: int = Query(20, ge=1, le=100), after: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_read_db)
+):
+    return serialization.json_response(await _cursor_page(async_crud.search, db, after, limit, q=q), response)
+
+
+# /reports/inventory streams through a sync session, so main.py answers it
+@router.get("/reports/inventory/facets", dependencies=[params.lots_etag])
+async def report_inventory_facets(
+    response: Response,
+    filters: dict = Depends(params.inventory_facet_filters),
+    db: AsyncSession = Depends(database.get_async_read_db)
+):
+    return serialization.json_response(await async_crud.get_inventory_facets(db, **filters), response)
+
+
+@router.get("/reports/inventory/counts", dependencies=[params.lots_etag])
+async def report_inventory_counts(response: Response, db: AsyncSession = Depends(database.get_async_read_db)):
+    return serialization.json_response(await async_crud.get_inventory_counts(db), response)
+
+
+@router.get(
+    "/reports/dashboard",
+    response_model=schemas.DashboardSummary,
+    dependencies=[params.dashboard_etag],
+)
+async def report_dashboard(
+    response: Response, recent: int = Query(5, ge=0, le=50), base_currency: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_read_db)
+):
+    return serialization.json_response(await async_crud.get_dashboard(db, recent, base_currency), response)
+
+
+@router.get("/reports/pnl", dependencies=[params.pnl_etag])
+async def report_pnl(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    currency: Optional[str] = None,
+    counterparty_id: Optional[int] = None,
+    group_by: Optional[schemas.PnlGroupBy] = None,
+    base_currency: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_read_db)
+):
+    return serialization.json_response(await async_crud.get_pnl(
+        db, date_from, date_to, currency, counterparty_id,
+        group_by.value if group_by else None, base_currency,
+    ), response)
+
+
+@router.get("/reports/pnl/timeseries", dependencies=[params.pnl_etag])
+async def report_pnl_timeseries(
+    response: Response,
+    bucket: schemas.PnlBucket = schemas.PnlBucket.day,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    currency: Optional[str] = None,
+    base_currency: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_read_db)
+):
+    return serialization.json_response(await async_crud.get_pnl_timeseries(
+        db, bucket.value, date_from, date_to, currency, base_currency,
+    ), response)
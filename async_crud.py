@@ -0,0 +1,69 @@
+"""
+I expose the crud functions to async code.
+Each wrapper runs the sync implementation through AsyncSession.run_sync, so the
+queries go out over the async driver and the event loop is free while SQLite
+works, while crud.py stays the single place the query logic lives.
+Streaming iter_* functions are not wrapped: their rows are pulled lazily after
+the call returns, which run_sync cannot support. Cached reports go through the
+cache's async entry point, so waiting on another request's computation awaits
+instead of blocking the event loop.
+"""
+
+import functools
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+
+
+def _async(fn):
+    if hasattr(fn, "run_async"):
+        return fn.run_async
+
+    @functools.wraps(fn)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(fn, *args, **kwargs)
+    return wrapper
+
+
+# --- EmeraldLot ---
+create_emerald = _async(crud.create_emerald)
+get_emeralds = _async(crud.get_emeralds)
+get_emeralds_page = _async(crud.get_emeralds_page)
+get_emerald = _async(crud.get_emerald)
+update_emerald = _async(crud.update_emerald)
+delete_emerald = _async(crud.delete_emerald)
+bulk_create_emeralds = _async(crud.bulk_create_emeralds)
+
+# --- Counterparty ---
+create_counterparty = _async(crud.create_counterparty)
+get_counterparties = _async(crud.get_counterparties)
+get_counterparties_page = _async(crud.get_counterparties_page)
+get_counterparty = _async(crud.get_counterparty)
+update_counterparty = _async(crud.update_counterparty)
+delete_counterparty = _async(crud.delete_counterparty)
+bulk_create_counterparties = _async(crud.bulk_create_counterparties)
+
+# --- Trade ---
+create_trade = _async(crud.create_trade)
+get_trades = _async(crud.get_trades)
+get_trades_page = _async(crud.get_trades_page)
+get_trade = _async(crud.get_trade)
+update_trade = _async(crud.update_trade)
+delete_trade = _async(crud.delete_trade)
+bulk_create_trades = _async(crud.bulk_create_trades)
+
+# --- Search ---
+search = _async(crud.search)
+
+# --- Reports ---
+get_inventory_cells = _async(crud.get_inventory_cells)
+get_inventory_counts = _async(crud.get_inventory_counts)
+get_pnl = _async(crud.get_pnl)
+get_pnl_timeseries = _async(crud.get_pnl_timeseries)
+get_dashboard = _async(crud.get_dashboard)
+
+
+async def get_inventory_facets(db: AsyncSession, **filters):
+    """The grouped pass goes through the cache; the drill-down is plain Python."""
+    return crud.summarize_facets(await get_inventory_cells(db), **filters)
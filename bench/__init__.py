@@ -0,0 +1,10 @@
+"""
+I am the performance benchmark suite.
+
+    python -m bench.run --trades 10000 100000 --mode inprocess crud uvicorn
+    python -m bench.compare bench/results/latest.json bench/baseline.json
+
+run.py seeds a synthetic ledger per size (ledger.py), times every case in
+cases.py and writes latency percentiles and throughput as JSON. compare.py
+diffs two result files and fails when a case got slower than the threshold.
+"""
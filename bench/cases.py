@@ -0,0 +1,179 @@
+"""
+I list what the benchmarks time: one HTTP case per main.py endpoint, plus
+direct calls into each crud function. Every case is called with the iteration
+number, so writes can build unique payloads. Cases whose cost grows with the
+ledger (full exports, streaming) declare a smaller share of the iterations.
+Deletes need a fresh target per call: their setup creates it before the timer
+starts and hands it to the timed call.
+"""
+
+from datetime import date
+from typing import NamedTuple
+
+import crud
+import schemas
+
+# A trade/lot/counterparty id that exists at every ledger size
+ID = 1
+# ledger_gen numbers lot codes after the lot id
+LOT_CODE = f"EM{ID:07d}"
+
+
+class Upload(NamedTuple):
+    """A request body sent as a multipart file upload instead of JSON."""
+    filename: str
+    content: str
+
+
+def _trade(i):
+    return {"type": "SALE", "date": "2024-06-01", "currency": "USD", "unit_price": 1000.0,
+            "total_price": 1000.0, "emerald_lot_id": ID, "counterparty_id": ID}
+
+
+def _lots(prefix, i, count=100):
+    return [{"lot_code": f"{prefix}{i}-{n}", "carat": 1.0} for n in range(count)]
+
+
+def _counterparties(prefix, i, count=100):
+    return [{"name": f"{prefix}{i}-{n}", "type": "BUYER"} for n in range(count)]
+
+
+def _trade_csv(i):
+    rows = [f"SALE,2024-06-01,USD,1000.0,1000.0,{LOT_CODE},{ID}"] * 100
+    return Upload("trades.csv", "\n".join(
+        ["type,date,currency,unit_price,total_price,lot_code,counterparty_id", *rows]
+    ))
+
+
+def _fx_csv(i):
+    rows = [f"2024-01-{day:02d},EUR,{1.08 + i / 1e6}" for day in range(1, 31)]
+    return Upload("fx_rates.csv", "\n".join(["date,currency,rate", *rows]))
+
+
+def _created(send, path, body):
+    """Create a delete target over HTTP and return its URL."""
+    response = send("POST", path, body)
+    return f"{path}{response.json()['id']}"
+
+
+def _full(rows):
+    """Drain a streamed (fields, rows) result."""
+    return sum(1 for _ in rows[1])
+
+
+# (name, method, path or setup(send, i) -> path, body(i) or None, iteration share)
+HTTP_CASES = [
+    ("GET /emeralds/", "GET", "/emeralds/?limit=100", None, 1),
+    ("GET /emeralds/ cursor", "GET", "/emeralds/?after=&limit=100&sort=-carat", None, 1),
+    ("GET /emeralds/ filtered", "GET", "/emeralds/?origin=Colombia&carat_min=5&limit=100", None, 1),
+    ("GET /emeralds/{id}", "GET", f"/emeralds/{ID}", None, 1),
+    ("GET /counterparties/", "GET", "/counterparties/?limit=100", None, 1),
+    ("GET /counterparties/{id}", "GET", f"/counterparties/{ID}", None, 1),
+    ("GET /trades/", "GET", "/trades/?limit=100", None, 1),
+    ("GET /trades/ limit=1000", "GET", "/trades/?limit=1000", None, 1),
+    ("GET /trades/ cursor", "GET", "/trades/?after=&limit=100", None, 1),
+    ("GET /trades/ filtered", "GET", "/trades/?type=SALE&currency=EUR&limit=100", None, 1),
+    ("GET /trades/ expand", "GET", "/trades/?limit=100&expand=emerald_lot,counterparty", None, 1),
+    ("GET /trades/{id}", "GET", f"/trades/{ID}", None, 1),
+    ("GET /search exact", "GET", f"/search?q={LOT_CODE}", None, 1),
+    ("GET /search broad", "GET", "/search?q=Colombia", None, 1),
+    ("GET /reports/inventory/counts", "GET", "/reports/inventory/counts", None, 1),
+    ("GET /reports/inventory/facets", "GET", "/reports/inventory/facets?origin=Colombia", None, 1),
+    ("GET /reports/inventory cursor", "GET", "/reports/inventory?after=&limit=100", None, 1),
+    ("GET /reports/pnl", "GET", "/reports/pnl", None, 1),
+    ("GET /reports/pnl by counterparty", "GET", "/reports/pnl?group_by=counterparty", None, 1),
+    ("GET /reports/pnl by month", "GET", "/reports/pnl?group_by=month", None, 1),
+    ("GET /reports/pnl/timeseries", "GET", "/reports/pnl/timeseries", None, 1),
+    ("GET /reports/pnl/timeseries by week", "GET", "/reports/pnl/timeseries?bucket=week", None, 1),
+    ("GET /reports/dashboard", "GET", "/reports/dashboard", None, 1),
+    ("GET /reports/cache", "GET", "/reports/cache", None, 1),
+    ("GET /reports/slow-queries", "GET", "/reports/slow-queries", None, 1),
+    ("GET /metrics", "GET", "/metrics", None, 1),
+    ("GET /reports/inventory", "GET", "/reports/inventory", None, 0.1),
+    ("GET /trades/export", "GET", "/trades/export?format=ndjson", None, 0.1),
+    ("GET /emeralds/export", "GET", "/emeralds/export", None, 0.1),
+    ("GET /counterparties/export", "GET", "/counterparties/export", None, 0.1),
+    ("POST /trades/", "POST", "/trades/", _trade, 1),
+    ("PUT /trades/{id}", "PUT", f"/trades/{ID}", lambda i: {"location": f"Vault {i}"}, 1),
+    ("DELETE /trades/{id}", "DELETE", lambda send, i: _created(send, "/trades/", _trade(i)), None, 1),
+    ("POST /emeralds/", "POST", "/emeralds/", lambda i: {"lot_code": f"BENCH{i}", "carat": 1.0}, 1),
+    ("PUT /emeralds/{id}", "PUT", f"/emeralds/{ID}", lambda i: {"lot_code": LOT_CODE, "carat": 1.0 + i / 1000}, 1),
+    ("DELETE /emeralds/{id}", "DELETE",
+     lambda send, i: _created(send, "/emeralds/", {"lot_code": f"DEL{i}", "carat": 1.0}), None, 1),
+    ("POST /counterparties/", "POST", "/counterparties/", lambda i: {"name": f"BENCH{i}", "type": "BUYER"}, 1),
+    ("PUT /counterparties/{id}", "PUT", f"/counterparties/{ID}", lambda i: {"country": f"C{i}"}, 1),
+    ("DELETE /counterparties/{id}", "DELETE",
+     lambda send, i: _created(send, "/counterparties/", {"name": f"DEL{i}", "type": "BUYER"}), None, 1),
+    ("POST /trades/bulk", "POST", "/trades/bulk", lambda i: [_trade(i)] * 100, 1),
+    ("POST /emeralds/bulk", "POST", "/emeralds/bulk", lambda i: _lots("BULK", i), 1),
+    ("POST /counterparties/bulk", "POST", "/counterparties/bulk", lambda i: _counterparties("BULK", i), 1),
+    ("POST /import/trades", "POST", "/import/trades", _trade_csv, 1),
+    ("POST /import/fx_rates", "POST", "/import/fx_rates", _fx_csv, 1),
+    ("GET /fx/rates/{currency}", "GET", "/fx/rates/EUR?on=2024-06-01", None, 1),
+]
+
+
+def _new_lot(db, i):
+    return crud.create_emerald(db, schemas.EmeraldLotCreate(lot_code=f"CDEL{i}", carat=1.0)).id
+
+
+def _new_counterparty(db, i):
+    return crud.create_counterparty(db, schemas.CounterpartyCreate(name=f"CDEL{i}", type="BUYER")).id
+
+
+def _new_trade(db, i):
+    return crud.create_trade(db, schemas.TradeCreate(**_trade(i))).id
+
+
+# (name, call(db, i) or (setup(db, i), call(db, target)), iteration share)
+CRUD_CASES = [
+    ("crud.get_emeralds", lambda db, i: crud.get_emeralds(db, 0, 100), 1),
+    ("crud.get_emeralds as_rows", lambda db, i: crud.get_emeralds(db, 0, 100, as_rows=True), 1),
+    ("crud.get_emeralds_page", lambda db, i: crud.get_emeralds_page(db, None, 100, sort="-carat"), 1),
+    ("crud.get_emerald", lambda db, i: crud.get_emerald(db, ID), 1),
+    ("crud.get_emerald_cached", lambda db, i: crud.get_emerald_cached(db, ID), 1),
+    ("crud.get_emerald_by_code", lambda db, i: crud.get_emerald_by_code(db, LOT_CODE), 1),
+    ("crud.get_counterparties", lambda db, i: crud.get_counterparties(db, 0, 100), 1),
+    ("crud.get_counterparties_page", lambda db, i: crud.get_counterparties_page(db, None, 100), 1),
+    ("crud.get_counterparty", lambda db, i: crud.get_counterparty(db, ID), 1),
+    ("crud.get_counterparty_cached", lambda db, i: crud.get_counterparty_cached(db, ID), 1),
+    ("crud.get_trades", lambda db, i: crud.get_trades(db, 0, 1000), 1),
+    ("crud.get_trades as_rows", lambda db, i: crud.get_trades(db, 0, 1000, as_rows=True), 1),
+    ("crud.get_trades_page", lambda db, i: crud.get_trades_page(db, None, 1000), 1),
+    ("crud.get_trade", lambda db, i: crud.get_trade(db, ID), 1),
+    ("crud.search exact", lambda db, i: crud.search(db, q=LOT_CODE), 1),
+    ("crud.search broad", lambda db, i: crud.search(db, q="Colombia"), 1),
+    ("crud.get_inventory_counts", lambda db, i: crud.get_inventory_counts(db), 1),
+    ("crud.get_inventory_facets", lambda db, i: crud.get_inventory_facets(db, origin=["Colombia"]), 1),
+    ("crud.get_pnl", lambda db, i: crud.get_pnl(db), 1),
+    ("crud.get_pnl counterparty", lambda db, i: crud.get_pnl(db, counterparty_id=ID), 1),
+    ("crud.get_pnl 2023", lambda db, i: crud.get_pnl(db, date(2023, 1, 1), date(2023, 12, 31)), 1),
+    ("crud.get_pnl_timeseries", lambda db, i: crud.get_pnl_timeseries(db), 1),
+    ("crud.get_pnl_timeseries by month", lambda db, i: crud.get_pnl_timeseries(db, "month"), 1),
+    ("crud.get_dashboard", lambda db, i: crud.get_dashboard(db), 1),
+    ("crud.get_inventory_page", lambda db, i: crud.get_inventory_page(db, None, 100), 1),
+    ("crud.iter_inventory", lambda db, i: _full(crud.iter_inventory(db)), 0.1),
+    ("crud.iter_trades", lambda db, i: _full(crud.iter_trades(db)), 0.1),
+    ("crud.iter_emeralds", lambda db, i: _full(crud.iter_emeralds(db)), 0.1),
+    ("crud.iter_counterparties", lambda db, i: _full(crud.iter_counterparties(db)), 0.1),
+    ("crud.create_trade", lambda db, i: crud.create_trade(db, schemas.TradeCreate(**_trade(i))), 1),
+    ("crud.update_trade",
+     lambda db, i: crud.update_trade(db, ID, schemas.TradeUpdate(location=f"Vault {i}")), 1),
+    ("crud.delete_trade", (_new_trade, crud.delete_trade), 1),
+    ("crud.create_emerald",
+     lambda db, i: crud.create_emerald(db, schemas.EmeraldLotCreate(lot_code=f"CBENCH{i}", carat=1.0)), 1),
+    ("crud.update_emerald",
+     lambda db, i: crud.update_emerald(db, ID, schemas.EmeraldLotCreate(lot_code=LOT_CODE, carat=1.0 + i / 1000)), 1),
+    ("crud.delete_emerald", (_new_lot, crud.delete_emerald), 1),
+    ("crud.create_counterparty",
+     lambda db, i: crud.create_counterparty(db, schemas.CounterpartyCreate(name=f"CBENCH{i}", type="BUYER")), 1),
+    ("crud.update_counterparty",
+     lambda db, i: crud.update_counterparty(db, ID, schemas.CounterpartyUpdate(country=f"C{i}")), 1),
+    ("crud.delete_counterparty", (_new_counterparty, crud.delete_counterparty), 1),
+    ("crud.bulk_create_trades", lambda db, i: crud.bulk_create_trades(db, [_trade(i)] * 100), 1),
+    ("crud.bulk_create_emeralds", lambda db, i: crud.bulk_create_emeralds(db, _lots("CBULK", i)), 1),
+    ("crud.bulk_create_counterparties",
+     lambda db, i: crud.bulk_create_counterparties(db, _counterparties("CBULK", i)), 1),
+    ("crud.bulk_upsert_fx_rates",
+     lambda db, i: crud.bulk_upsert_fx_rates(db, [{"date": "2024-01-01", "currency": "EUR", "rate": 1.08}]), 1),
+]
@@ -0,0 +1,74 @@
+"""
+I compare two benchmark result files and flag regressions.
+
+    python -m bench.compare CURRENT BASELINE [--threshold 0.25] [--metric p50_ms]
+
+A case regresses when its metric is more than `threshold` (a fraction) above
+the baseline. Cases present in only one file are listed but never fail.
+Exits 1 when anything regressed.
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_METRIC = "p50_ms"
+
+
+def flatten(report):
+    """{"size/mode/case": stats} from a result file."""
+    return {
+        f"{size}/{mode}/{case}": stats
+        for size, modes in report["results"].items()
+        for mode, results in modes.items()
+        for case, stats in results.items()
+    }
+
+
+def find_regressions(current, baseline, threshold: float = DEFAULT_THRESHOLD,
+                     metric: str = DEFAULT_METRIC):
+    """[(key, baseline_value, current_value, ratio)] for every case slower than allowed."""
+    now, before = flatten(current), flatten(baseline)
+    regressions = []
+    for key in sorted(now.keys() & before.keys()):
+        base, value = before[key][metric], now[key][metric]
+        ratio = value / base if base else 1.0
+        if ratio > 1 + threshold:
+            regressions.append((key, base, value, ratio))
+    return regressions
+
+
+def report(current, baseline, threshold: float = DEFAULT_THRESHOLD, metric: str = DEFAULT_METRIC):
+    """Print a comparison and return the regressions."""
+    now, before = flatten(current), flatten(baseline)
+    for key in sorted(now.keys() | before.keys()):
+        if key not in before or key not in now:
+            print(f"  {'new' if key in now else 'gone':>8}  {key}")
+            continue
+        base, value = before[key][metric], now[key][metric]
+        print(f"  {value / base if base else 1.0:7.2f}x  {key}  {base:.3f} -> {value:.3f} {metric}")
+    regressions = find_regressions(current, baseline, threshold, metric)
+    for key, base, value, ratio in regressions:
+        print(f"REGRESSION {key}: {metric} {base:.3f} -> {value:.3f} ({ratio:.2f}x)")
+    if not regressions:
+        print(f"No regressions above {threshold:.0%} on {metric}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline.")
+    parser.add_argument("current")
+    parser.add_argument("baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--metric", default=DEFAULT_METRIC)
+    args = parser.parse_args(argv)
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    sys.exit(1 if report(current, baseline, args.threshold, args.metric) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+I seed ledgers for the benchmarks with ledger_gen: a fixed ratio of lots and
+counterparties to trades, so every size has the same shape. Seeded databases
+are kept in bench/.data and reused across runs; callers copy one before
+writing to it.
+"""
+
+import os
+import shutil
+
+from sqlalchemy import create_engine
+
+import ledger_gen
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+
+def seed_ledger(path: str, trades: int, seed: int = 0):
+    """Create `path` holding `trades` trades over trades/4 lots and trades/100 counterparties."""
+    engine = create_engine(f"sqlite:///{path}")
+    ledger_gen.generate(engine, max(1, trades // 4), max(1, trades // 100), trades, seed)
+    engine.dispose()
+
+
+def ledger_copy(trades: int, dest: str, seed: int = 0):
+    """Copy the cached ledger of `trades` trades to `dest`, seeding it on first use."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    cached = os.path.join(DATA_DIR, f"ledger-{trades}-{seed}.db")
+    if not os.path.exists(cached):
+        seed_ledger(cached + ".tmp", trades, seed)
+        os.replace(cached + ".tmp", cached)
+    shutil.copyfile(cached, dest)
+    return dest
@@ -0,0 +1,245 @@
+"""
+I run the benchmark cases against seeded ledgers and write the results as JSON.
+
+Modes:
+  inprocess  HTTP cases through TestClient, with the app's db dependencies
+             pointed at the ledger (the same override tests/conftest.py uses)
+  crud       the crud functions called directly on a Session
+  uvicorn    HTTP cases over the network against `uvicorn main:app` started
+             on the ledger in a subprocess
+
+Each case gets a few warm-up calls, then --iterations timed calls. Latencies
+are reported as p50/p90/p99/mean/max in milliseconds, plus calls per second.
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from bench import cases, compare, ledger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WARMUP = 3
+
+
+def summarize(latencies, elapsed: float):
+    """Percentiles (ms) and throughput for one case."""
+    ms = sorted(value * 1000 for value in latencies)
+    q = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "iterations": len(ms),
+        "p50_ms": round(q[49], 3),
+        "p90_ms": round(q[89], 3),
+        "p99_ms": round(q[98], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "max_ms": round(ms[-1], 3),
+        "ops_per_s": round(len(ms) / elapsed, 1),
+    }
+
+
+def time_calls(call, iterations: int, setup=None):
+    """Time call(i), or call(setup(i)) with setup run outside the timer."""
+    prepare = setup or (lambda i: i)
+    for i in range(WARMUP):
+        call(prepare(-1 - i))
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        arg = prepare(i)
+        t0 = time.perf_counter()
+        call(arg)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def _iterations(total: int, share: float):
+    return max(3, int(total * share))
+
+
+def _request(client, method: str, url: str, body):
+    """Send through a TestClient or httpx.Client; Upload bodies go as multipart files."""
+    if isinstance(body, cases.Upload):
+        return client.request(method, url, files={"file": (body.filename, body.content, "text/csv")})
+    return client.request(method, url, json=body)
+
+
+def run_http(send, iterations: int):
+    results = {}
+    for name, method, path, body, share in cases.HTTP_CASES:
+        def setup(i):
+            return i, path(send, i) if callable(path) else path
+
+        def call(arg):
+            i, url = arg
+            response = send(method, url, body(i) if body else None)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+        results[name] = time_calls(call, _iterations(iterations, share), setup)
+    return results
+
+
+def _clear_caches():
+    from cache import report_cache, entity_cache
+    report_cache.clear()
+    entity_cache.clear()
+
+
+def _sessionmaker(path: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import database
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.apply_sqlite_profile(engine, database.load_sqlite_pragmas())
+    # Ledgers cached by older revisions pick up new tables and indexes, as at app startup
+    database.init_db(engine)
+    return engine, sessionmaker(bind=engine, autoflush=False)
+
+
+def run_inprocess(path: str, iterations: int):
+    from fastapi.testclient import TestClient
+    import database
+    from main import app
+
+    engine, factory = _sessionmaker(path)
+
+    def override():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[database.get_db] = override
+    app.dependency_overrides[database.get_read_db] = override
+    _clear_caches()
+    try:
+        with TestClient(app) as client:
+            return run_http(lambda method, url, body: _request(client, method, url, body), iterations)
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def run_crud(path: str, iterations: int):
+    engine, factory = _sessionmaker(path)
+    _clear_caches()
+    results = {}
+    try:
+        for name, fn, share in cases.CRUD_CASES:
+            with factory() as db:
+                setup, fn = fn if isinstance(fn, tuple) else (None, fn)
+                results[name] = time_calls(
+                    lambda arg: fn(db, arg), _iterations(iterations, share), setup and (lambda i: setup(db, i))
+                )
+    finally:
+        engine.dispose()
+    return results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_uvicorn(path: str, iterations: int):
+    import httpx
+    port = _free_port()
+    env = {**os.environ, "EMERALD_DATABASE_URL": f"sqlite:///{path}"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    client.get("/reports/cache")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("uvicorn did not start")
+                    time.sleep(0.1)
+            return run_http(lambda method, url, body: _request(client, method, url, body), iterations)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+RUNNERS = {"inprocess": run_inprocess, "crud": run_crud, "uvicorn": run_uvicorn}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, modes, iterations: int, cold: bool = False, seed: int = 0):
+    if cold:  # every report request recomputes instead of hitting the cache
+        os.environ["EMERALD_REPORT_CACHE_SIZE"] = "0"
+        os.environ["EMERALD_ENTITY_CACHE_SIZE"] = "0"
+        from cache import report_cache, entity_cache
+        report_cache.maxsize = entity_cache.maxsize = 0
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "cold": cold,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for mode in modes:
+                # Each run writes, so each starts from a fresh copy of the ledger
+                path = ledger.ledger_copy(size, os.path.join(tmp, f"{size}-{mode}.db"), seed)
+                print(f"[{size} trades] {mode}", file=sys.stderr)
+                report["results"].setdefault(str(size), {})[mode] = RUNNERS[mode](path, iterations)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--trades", type=int, nargs="+", default=[10_000],
+                        help="ledger sizes in trades, e.g. 10000 100000 1000000")
+    parser.add_argument("--mode", nargs="+", choices=RUNNERS, default=["inprocess", "crud"])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--cold", action="store_true", help="disable the report and identity caches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(ROOT, "bench", "results", "latest.json"))
+    parser.add_argument("--baseline", help="result file to compare against")
+    parser.add_argument("--threshold", type=float, default=compare.DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = run(args.trades, args.mode, args.iterations, args.cold, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare.report(report, baseline, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+I measure list serialization throughput, in rows per second, for the old path
+(ORM objects validated through response_model, then JSONResponse) against the
+fast path (read-schema columns as Row tuples, serialization.dumps).
+
+    python bench/serialization.py --rows 50000 --page 1000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import schemas
+import serialization
+from database import Base
+from models import EmeraldLot, Counterparty, Trade, CounterpartyType, TradeType
+
+
+def seed(db, rows: int):
+    db.execute(insert(EmeraldLot), [{"lot_code": "EM0", "carat": 1.0}])
+    db.execute(insert(Counterparty), [{"name": "CP0", "type": CounterpartyType.BOTH}])
+    start = date(2020, 1, 1)
+    db.execute(insert(Trade), [
+        {
+            "type": TradeType.SALE if i % 2 else TradeType.PURCHASE,
+            "date": start + timedelta(days=i % 1500), "currency": "USD",
+            "unit_price": 100.0 + i, "total_price": 250.0 + i, "location": "Bogota",
+            "emerald_lot_id": 1, "counterparty_id": 1,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def orm_path(db, page: int, skip: int):
+    """What FastAPI does for response_model=list[TradeRead] over ORM rows."""
+    trades = crud.get_trades(db, skip, page)
+    models = TypeAdapter(list[schemas.TradeRead]).validate_python(trades, from_attributes=True)
+    return json.dumps(jsonable_encoder(models), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(db, page: int, skip: int):
+    return serialization.dumps(crud.get_trades(db, skip, page, as_rows=True))
+
+
+def measure(fn, session_factory, rows: int, page: int):
+    started = time.perf_counter()
+    for skip in range(0, rows, page):
+        with session_factory() as db:
+            fn(db, page, skip)
+    return rows / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--page", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine)
+        with factory() as db:
+            seed(db, args.rows)
+            assert orm_path(db, args.page, 0) == fast_path(db, args.page, 0), "wire formats differ"
+
+        before = measure(orm_path, factory, args.rows, args.page)
+        after = measure(fast_path, factory, args.rows, args.page)
+        engine.dispose()
+
+    print(f"ORM + response_model: {before:12,.0f} rows/s")
+    print(f"Row tuples + dumps:   {after:12,.0f} rows/s  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
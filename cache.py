@@ -0,0 +1,275 @@
+"""
+I cache report results and hot entity lookups in process memory.
+Report entries are keyed by report name and parameters, expire after a TTL, and are
+evicted least-recently-used once the cache is full. Concurrent requests for the
+same missing entry share one computation (single-flight) instead of all
+scanning the database at once.
+
+Each entry remembers the write versions (see versioning.py) of the tables it
+was computed from. A committed write to one of those tables evicts the entry
+at once, and an entry whose versions no longer match is never served, so a
+computation that races with a write cannot return stale data.
+
+EntityCache holds single lots and counterparties for id and natural-key lookups.
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import versioning
+
+
+class _Flight:
+    """One in-progress computation that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReportCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tables, versions, value)
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = self.shared = 0
+
+    # --- lookup / store ---
+    def _lookup(self, key):
+        """Return (found, value); caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, tables, versions, value = entry
+        if expires_at < time.monotonic() or versioning.version(*tables) != versions:
+            del self._entries[key]
+            self.evictions += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def _store(self, key, tables, versions, value):
+        with self._lock:
+            if versioning.version(*tables) != versions:
+                return  # a write landed while computing; don't keep the result
+            self._entries[key] = (time.monotonic() + self.ttl, tables, versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # --- sync callers ---
+    def get_or_compute(self, key, tables, compute):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        versions = versioning.version(*tables)
+        try:
+            flight.value = compute()
+            self._store(key, tables, versions, flight.value)
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    # --- async callers ---
+    async def get_or_compute_async(self, key, tables, compute):
+        """Like get_or_compute, but waiters await instead of blocking the event loop."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            future = self._async_flights.get(key)
+            if future is None:
+                future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+                self.misses += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+        if not leader:
+            return await asyncio.shield(future)
+
+        versions = versioning.version(*tables)
+        try:
+            value = await compute()
+            self._store(key, tables, versions, value)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            with self._lock:
+                del self._async_flights[key]
+
+    # --- invalidation / introspection ---
+    def invalidate(self, tables):
+        """Drop every entry computed from any of `tables`."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if not tables.isdisjoint(entry[1])]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+report_cache = ReportCache(
+    maxsize=int(os.getenv("EMERALD_REPORT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("EMERALD_REPORT_CACHE_TTL", "300")),
+)
+versioning.subscribe(report_cache.invalidate)
+
+
+def cached_report(*tables):
+    """
+    Decorator for crud report functions `fn(db, *args, **kwargs)`.
+    `tables` are the tables whose writes make a cached result stale.
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        def key(args, kwargs):
+            # Bind so positional and keyword spellings of a call share one entry
+            bound = signature.bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            return (fn.__name__, *list(bound.arguments.items())[1:])
+
+        @functools.wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            return report_cache.get_or_compute(
+                key(args, kwargs), tables, lambda: fn(db, *args, **kwargs)
+            )
+
+        async def run_async(db, *args, **kwargs):
+            """Async entry point: compute through AsyncSession.run_sync on a miss."""
+            return await report_cache.get_or_compute_async(
+                key(args, kwargs), tables, lambda: db.run_sync(fn, *args, **kwargs)
+            )
+
+        wrapper.run_async = run_async
+        return wrapper
+    return decorate
+
+
+class EntityCache:
+    """
+    Bounded LRU of serialized lots and counterparties (their Read schemas),
+    reachable by id and by natural key (lot_code / name). crud drops the entry
+    on every update and delete; the next read refills it.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._by_id = OrderedDict()  # (kind, id) -> (natural_key, value)
+        self._by_key = {}  # (kind, natural_key) -> id
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _count(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get(self, kind, entity_id):
+        with self._lock:
+            entry = self._by_id.get((kind, entity_id))
+            if entry is not None:
+                self._by_id.move_to_end((kind, entity_id))
+            return self._count(entry and entry[1])
+
+    def get_by_key(self, kind, natural_key):
+        with self._lock:
+            entity_id = self._by_key.get((kind, natural_key))
+            entry = self._by_id.get((kind, entity_id)) if entity_id is not None else None
+            if entry is not None:
+                self._by_id.move_to_end((kind, entity_id))
+            return self._count(entry and entry[1])
+
+    def _drop(self, kind, entity_id):
+        """Caller holds the lock."""
+        natural_key, _ = self._by_id.pop((kind, entity_id))
+        if self._by_key.get((kind, natural_key)) == entity_id:
+            del self._by_key[(kind, natural_key)]
+
+    def put(self, kind, entity_id, natural_key, value):
+        with self._lock:
+            if (kind, entity_id) in self._by_id:
+                self._drop(kind, entity_id)  # the natural key may have changed
+            self._by_id[(kind, entity_id)] = (natural_key, value)
+            self._by_key[(kind, natural_key)] = entity_id
+            while len(self._by_id) > self.maxsize:
+                self._drop(*next(iter(self._by_id)))
+                self.evictions += 1
+
+    def discard(self, kind, entity_id):
+        with self._lock:
+            if (kind, entity_id) in self._by_id:
+                self._drop(kind, entity_id)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_key.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._by_id),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+entity_cache = EntityCache(maxsize=int(os.getenv("EMERALD_ENTITY_CACHE_SIZE", "10000")))
@@ -4,9 +4,207 @@ I use model_dump() instead of dict() for Pydantic v2 compatibility.
 I return None for not-found cases to let the API layer handle 404 responses.
 """
 
-from sqlalchemy.orm import Session
-from models import EmeraldLot, Counterparty, Trade, LotStatus, TradeType
+import base64
+import binascii
+import json
+from datetime import date
+
+from pydantic import ValidationError
+from sqlalchemy import Date, Integer, case, delete, func, insert, literal_column, null, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, selectinload
+from models import (
+    EmeraldLot, Counterparty, Trade, LotStatus, TradeType, CounterpartyType, PnlDaily, LotStatusCount, FxRate,
+    search_tables,
+)
+import fx
+import matching
 import schemas
+import versioning
+from cache import cached_report, entity_cache
+
+
+# --- Query parameters ---
+class InvalidQueryError(ValueError):
+    """Raised for list parameters that cannot be honoured (bad cursor or sort key)."""
+
+
+class InvalidCursorError(InvalidQueryError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class MissingFxRateError(InvalidQueryError):
+    """Raised when a report in a base currency meets a trade with no rate to convert it."""
+
+
+# Sort keys accepted by the list endpoints. All are NOT NULL, so keyset cursors
+# over (key, id) never skip rows.
+SORT_COLUMNS = {
+    EmeraldLot: {"id": EmeraldLot.id, "lot_code": EmeraldLot.lot_code, "carat": EmeraldLot.carat},
+    Counterparty: {"id": Counterparty.id, "name": Counterparty.name},
+    Trade: {
+        "id": Trade.id, "date": Trade.date,
+        "unit_price": Trade.unit_price, "total_price": Trade.total_price,
+    },
+}
+
+
+# Largest keyset (cursor mode) page; offset pages keep their historical unbounded limit
+MAX_PAGE_SIZE = 1000
+
+
+def sort_columns(model, sort: str):
+    """Resolve a sort key such as "carat" or "-date" into (columns, descending); id breaks ties."""
+    descending = sort.startswith("-")
+    column = SORT_COLUMNS[model].get(sort.lstrip("-"))
+    if column is None:
+        raise InvalidQueryError(f"Cannot sort by '{sort}'")
+    columns = [column] if column is model.id else [column, model.id]
+    return columns, descending
+
+
+def _order(query, columns, descending: bool):
+    return query.order_by(*[col.desc() if descending else col for col in columns])
+
+
+READ_SCHEMAS = {
+    EmeraldLot: schemas.EmeraldLotRead,
+    Counterparty: schemas.CounterpartyRead,
+    Trade: schemas.TradeRead,
+}
+
+
+def _select(db: Session, model, as_rows: bool = False):
+    """
+    Query ORM objects, or with as_rows just the read-schema columns as plain
+    Row tuples, in schema field order, for callers that serialize them
+    directly (see serialization.py).
+    """
+    if not as_rows:
+        return db.query(model)
+    return db.query(*_schema_columns(model))
+
+
+def _schema_columns(model):
+    return [getattr(model, name) for name in READ_SCHEMAS[model].model_fields]
+
+
+# --- Single-statement writes ---
+# Updates and deletes run as one UPDATE/DELETE ... RETURNING the read-schema
+# columns, so a write is a single statement plus COMMIT, with no SELECT before
+# it and no refresh after. Both return a Row, or None when no row has `obj_id`.
+# With commit=False the caller finishes the transaction.
+def _update_returning(db: Session, model, obj_id: int, values: dict, commit: bool = True):
+    columns = _schema_columns(model)
+    if not values:  # nothing to set; answer with the row as it is
+        return db.query(*columns).filter(model.id == obj_id).first()
+    row = db.execute(update(model).where(model.id == obj_id).values(**values).returning(*columns)).first()
+    if row is None:
+        db.rollback()
+        return None
+    if commit:
+        db.commit()
+    return row
+
+
+def _delete_returning(db: Session, model, obj_id: int, commit: bool = True):
+    row = db.execute(delete(model).where(model.id == obj_id).returning(*_schema_columns(model))).first()
+    if row is None:
+        db.rollback()
+        return None
+    if commit:
+        db.commit()
+    return row
+
+
+# --- Keyset pagination ---
+def encode_cursor(values):
+    """Pack the sort-key values of the last row into an opaque, URL-safe cursor."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _converter(column):
+    python_type = column.type.python_type
+    return date.fromisoformat if python_type is date else python_type
+
+
+def decode_cursor(cursor: str, columns):
+    """Unpack a cursor and coerce each value to the type of its sort column."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursorError("Invalid cursor")
+        return [_converter(col)(value) for col, value in zip(columns, values)]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+
+
+def _keyset_page(query, columns, after, limit, descending: bool = False):
+    """
+    I seek past the cursor with a row-value comparison on the sort key instead of
+    OFFSET, so every page is an index range scan no matter how deep it is.
+    One extra row is fetched to know whether a next page exists.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if after:
+        values = decode_cursor(after, columns)
+        key = columns[0] if len(columns) == 1 else tuple_(*columns)
+        bound = values[0] if len(columns) == 1 else tuple(values)
+        query = query.filter(key < bound if descending else key > bound)
+    rows = _order(query, columns, descending).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, col.key) for col in columns])
+    return rows, next_cursor
+
+
+def _list(query, model, skip: int, limit: int, sort: str):
+    """Offset page; ordered by id unless another sort key is given."""
+    return _order(query, *sort_columns(model, sort or "id")).offset(skip).limit(limit).all()
+
+
+def _page(query, model, after: str, limit: int, sort: str):
+    columns, descending = sort_columns(model, sort)
+    return _keyset_page(query, columns, after, limit, descending)
+
+
+# --- Identity cache ---
+# Lots and counterparties are cached serialized (as their Read schemas) under
+# their id and natural key. update_* and delete_* below only drop the entry:
+# storing the row they wrote could let a slower of two concurrent updates
+# leave its older row cached, while _read_through refuses to fill across a write.
+IDENTITY_KEYS = {
+    EmeraldLot: (EmeraldLot.lot_code, schemas.EmeraldLotRead),
+    Counterparty: (Counterparty.name, schemas.CounterpartyRead),
+}
+
+
+def _read_through(db: Session, column, value):
+    """Look `column == value` up in the identity cache, loading and caching on a miss."""
+    model = column.class_
+    key_column, read_schema = IDENTITY_KEYS[model]
+    kind = model.__tablename__
+    if column is key_column:
+        cached = entity_cache.get_by_key(kind, value)
+    else:
+        cached = entity_cache.get(kind, value)
+    if cached is not None:
+        return cached
+    # Skip the fill if a write commits while we read, so a stale row is never cached
+    before = versioning.version(kind)
+    db_obj = db.query(model).filter(column == value).first()
+    if db_obj is None:
+        return None
+    result = read_schema.model_validate(db_obj)
+    if versioning.version(kind) == before:
+        entity_cache.put(kind, db_obj.id, getattr(db_obj, key_column.key), result)
+    return result
+
 
 # --- EmeraldLot ---
 def create_emerald(db: Session, emerald: schemas.EmeraldLotCreate):
@@ -17,8 +215,33 @@ def create_emerald(db: Session, emerald: schemas.EmeraldLotCreate):
     return db_emerald
 
 
-def get_emeralds(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(EmeraldLot).offset(skip).limit(limit).all()
+def _filter_emeralds(query, status: LotStatus = None, origin: str = None, color_grade: str = None,
+                     carat_min: float = None, carat_max: float = None):
+    """Apply the optional lot filters shared by list and export queries."""
+    if status is not None:
+        query = query.filter(EmeraldLot.status == status)
+    if origin is not None:
+        query = query.filter(EmeraldLot.origin == origin)
+    if color_grade is not None:
+        query = query.filter(EmeraldLot.color_grade == color_grade)
+    if carat_min is not None:
+        query = query.filter(EmeraldLot.carat >= carat_min)
+    if carat_max is not None:
+        query = query.filter(EmeraldLot.carat <= carat_max)
+    return query
+
+
+def get_emeralds(db: Session, skip: int = 0, limit: int = 100, sort: str = None, as_rows: bool = False,
+                 **filters):
+    query = _filter_emeralds(_select(db, EmeraldLot, as_rows), **filters)
+    return _list(query, EmeraldLot, skip, limit, sort)
+
+
+def get_emeralds_page(db: Session, after: str = None, limit: int = 100, sort: str = None,
+                      as_rows: bool = False, **filters):
+    """Keyset page of emeralds (by id unless sorted); returns (rows, next_cursor)."""
+    query = _filter_emeralds(_select(db, EmeraldLot, as_rows), **filters)
+    return _page(query, EmeraldLot, after, limit, sort or "id")
 
 
 def get_emerald(db: Session, emerald_id: int):
@@ -26,24 +249,28 @@ def get_emerald(db: Session, emerald_id: int):
     return db.query(EmeraldLot).filter(EmeraldLot.id == emerald_id).first()
 
 
+def get_emerald_cached(db: Session, emerald_id: int):
+    """EmeraldLotRead by ID, served from the identity cache when possible."""
+    return _read_through(db, EmeraldLot.id, emerald_id)
+
+
+def get_emerald_by_code(db: Session, lot_code: str):
+    """EmeraldLotRead by lot_code, served from the identity cache when possible."""
+    return _read_through(db, EmeraldLot.lot_code, lot_code)
+
+
 def update_emerald(db: Session, emerald_id: int, emerald: schemas.EmeraldLotCreate):
-    db_obj = get_emerald(db, emerald_id)
-    if not db_obj:
-        return None
-    for field, value in emerald.model_dump().items():
-        setattr(db_obj, field, value)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
+    row = _update_returning(db, EmeraldLot, emerald_id, emerald.model_dump())
+    if row is not None:
+        entity_cache.discard(EmeraldLot.__tablename__, emerald_id)
+    return row
 
 
 def delete_emerald(db: Session, emerald_id: int):
-    emerald = get_emerald(db, emerald_id)
-    if emerald:
-        db.delete(emerald)
-        db.commit()
-        return emerald
-    return None
+    row = _delete_returning(db, EmeraldLot, emerald_id)
+    if row is not None:
+        entity_cache.discard(EmeraldLot.__tablename__, emerald_id)
+    return row
 
 
 # --- Counterparty ---
@@ -55,89 +282,609 @@ def create_counterparty(db: Session, cp: schemas.CounterpartyCreate):
     return db_cp
 
 
-def get_counterparties(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Counterparty).offset(skip).limit(limit).all()
+def get_counterparties(db: Session, skip: int = 0, limit: int = 100, sort: str = None,
+                       as_rows: bool = False):
+    return _list(_select(db, Counterparty, as_rows), Counterparty, skip, limit, sort)
+
+
+def get_counterparties_page(db: Session, after: str = None, limit: int = 100, sort: str = None,
+                            as_rows: bool = False):
+    """Keyset page of counterparties (by id unless sorted); returns (rows, next_cursor)."""
+    return _page(_select(db, Counterparty, as_rows), Counterparty, after, limit, sort or "id")
 
 
 def get_counterparty(db: Session, cp_id: int):
     return db.query(Counterparty).filter(Counterparty.id == cp_id).first()
 
 
+def get_counterparty_cached(db: Session, cp_id: int):
+    """CounterpartyRead by ID, served from the identity cache when possible."""
+    return _read_through(db, Counterparty.id, cp_id)
+
+
+def get_counterparty_by_name(db: Session, name: str):
+    """CounterpartyRead by name, served from the identity cache when possible."""
+    return _read_through(db, Counterparty.name, name)
+
+
 def update_counterparty(db: Session, cp_id: int, cp: schemas.CounterpartyUpdate):
-    db_cp = get_counterparty(db, cp_id)
-    if not db_cp:
-        return None
     update_data = cp.model_dump(exclude_unset=True)  # ✅ allow partial updates
-    for key, value in update_data.items():
-        setattr(db_cp, key, value)
-    db.commit()
-    db.refresh(db_cp)
-    return db_cp
+    row = _update_returning(db, Counterparty, cp_id, update_data)
+    if row is not None:
+        entity_cache.discard(Counterparty.__tablename__, cp_id)
+    return row
 
 
 def delete_counterparty(db: Session, cp_id: int):
-    db_cp = get_counterparty(db, cp_id)
-    if not db_cp:
-        return None
-    db.delete(db_cp)
-    db.commit()
-    return db_cp
+    row = _delete_returning(db, Counterparty, cp_id)
+    if row is not None:
+        entity_cache.discard(Counterparty.__tablename__, cp_id)
+    return row
 
 
 # --- Trade ---
+# Trade writes re-run the FIFO matching of the lots they touch before
+# committing, so roi, holding_days and lot status land with the trade (see matching.py).
 def create_trade(db: Session, trade: schemas.TradeCreate):
     db_trade = Trade(**trade.model_dump())
     db.add(db_trade)
+    db.flush()
+    matching.rematch_lots(db, [db_trade.emerald_lot_id])
     db.commit()
     db.refresh(db_trade)
     return db_trade
 
 
-def get_trades(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Trade).offset(skip).limit(limit).all()
+# Relationships a trade read can inline with ?expand=
+TRADE_EXPANSIONS = {"emerald_lot": Trade.emerald_lot, "counterparty": Trade.counterparty}
+
+
+def _expand_trades(query, expand):
+    """
+    Eager-load the `expand` relationships with one SELECT ... IN per relationship.
+    populate_existing resets the others to unloaded even on trades already in
+    the session, and TradeExpandedRead skips unloaded relationships, so
+    serializing the rows never lazy-loads per row. expand=None leaves the query as is.
+    """
+    if expand is None:
+        return query
+    unknown = set(expand) - TRADE_EXPANSIONS.keys()
+    if unknown:
+        raise InvalidQueryError(f"Unknown expand: {', '.join(sorted(unknown))}")
+    return query.options(*(selectinload(TRADE_EXPANSIONS[name]) for name in expand)).populate_existing()
+
 
+def _trades_query(db: Session, as_rows: bool, expand, filters):
+    """Filtered trades; expand applies to ORM objects only, as_rows has no relationships."""
+    query = _filter_trades(_select(db, Trade, as_rows), **filters)
+    return query if as_rows else _expand_trades(query, expand)
 
-def get_trade(db: Session, trade_id: int):
-    return db.query(Trade).filter(Trade.id == trade_id).first()
+
+def get_trades(db: Session, skip: int = 0, limit: int = 100, sort: str = None, expand=None,
+               as_rows: bool = False, **filters):
+    return _list(_trades_query(db, as_rows, expand, filters), Trade, skip, limit, sort)
+
+
+def get_trades_page(db: Session, after: str = None, limit: int = 100, sort: str = None, expand=None,
+                    as_rows: bool = False, **filters):
+    """Keyset page of trades (by date, id unless sorted); returns (rows, next_cursor)."""
+    query = _trades_query(db, as_rows, expand, filters)
+    return _page(query, Trade, after, limit, sort or "date")
+
+
+def get_trade(db: Session, trade_id: int, expand=None):
+    return _expand_trades(db.query(Trade), expand).filter(Trade.id == trade_id).first()
 
 
 def update_trade(db: Session, trade_id: int, trade: schemas.TradeUpdate):
-    db_trade = get_trade(db, trade_id)
-    if not db_trade:
-        return None
     update_data = trade.model_dump(exclude_unset=True)  # supports partial updates
-    for key, value in update_data.items():
-        setattr(db_trade, key, value)
+    if not matching.MATCH_FIELDS & update_data.keys():
+        return _update_returning(db, Trade, trade_id, update_data)
+    lot_ids = set()
+    if "emerald_lot_id" in update_data:  # the lot the trade leaves needs re-matching too
+        lot_ids.add(db.query(Trade.emerald_lot_id).filter(Trade.id == trade_id).scalar())
+    row = _update_returning(db, Trade, trade_id, update_data, commit=False)
+    if row is None:
+        return None
+    changed = matching.rematch_lots(db, lot_ids | {row.emerald_lot_id})
     db.commit()
-    db.refresh(db_trade)
-    return db_trade
+    if row.id in changed:  # RETURNING ran before the match; patch in its result
+        roi, holding_days = changed[row.id]
+        return schemas.TradeRead.model_validate(row).model_copy(update={"roi": roi, "holding_days": holding_days})
+    return row
 
 
 def delete_trade(db: Session, trade_id: int):
-    db_trade = get_trade(db, trade_id)
-    if not db_trade:
-        return None
-    db.delete(db_trade)
+    row = _delete_returning(db, Trade, trade_id, commit=False)
+    if row is not None:
+        matching.rematch_lots(db, [row.emerald_lot_id])
+        db.commit()
+    return row
+
+
+# --- Streaming reads ---
+# Rows fetched per round trip while streaming an export
+STREAM_BATCH_SIZE = 1000
+
+
+def _stream_rows(columns, query):
+    """
+    I select only the read-schema columns as tuples and fetch them with
+    yield_per, which also turns on a server-side cursor, so memory stays flat
+    and the first rows are available before the whole result is read.
+    """
+    return [col.key for col in columns], query.order_by(columns[0]).yield_per(STREAM_BATCH_SIZE)
+
+
+def _read_columns(model, read_schema):
+    return [getattr(model, name) for name in ["id", *(n for n in read_schema.model_fields if n != "id")]]
+
+
+def iter_emeralds(db: Session, **filters):
+    """Stream emerald lots matching the list filters; returns (field_names, row_iterator)."""
+    columns = _read_columns(EmeraldLot, schemas.EmeraldLotRead)
+    return _stream_rows(columns, _filter_emeralds(db.query(*columns), **filters))
+
+
+def iter_counterparties(db: Session):
+    """Stream every counterparty; returns (field_names, row_iterator)."""
+    columns = _read_columns(Counterparty, schemas.CounterpartyRead)
+    return _stream_rows(columns, db.query(*columns))
+
+
+def iter_trades(db: Session, **filters):
+    """Stream trades matching the list filters; returns (field_names, row_iterator)."""
+    columns = _read_columns(Trade, schemas.TradeRead)
+    return _stream_rows(columns, _filter_trades(db.query(*columns), **filters))
+
+
+# --- Bulk writes ---
+def validate_rows(schema, rows: list):
+    """
+    Validate a batch against `schema` in a single pass.
+    Returns (valid, errors): valid is a list of (index, model) pairs and errors
+    maps a row index to its list of messages.
+    """
+    valid, errors = [], {}
+    for index, row in enumerate(rows):
+        if isinstance(row, schema):
+            valid.append((index, row))
+            continue
+        try:
+            valid.append((index, schema.model_validate(row)))
+        except ValidationError as exc:
+            errors[index] = [
+                f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+                for err in exc.errors()
+            ]
+    return valid, errors
+
+
+def _check_unique(db: Session, column, valid, field: str, errors: dict):
+    """Flag rows whose `field` repeats within the batch or already exists in the table."""
+    values = {getattr(obj, field) for _, obj in valid}
+    taken = {v for (v,) in db.query(column).filter(column.in_(values))} if values else set()
+    seen = set()
+    for index, obj in valid:
+        value = getattr(obj, field)
+        if value in taken or value in seen:
+            errors.setdefault(index, []).append(f"{field}: '{value}' already exists")
+        seen.add(value)
+
+
+def _check_references(db: Session, column, valid, field: str, errors: dict):
+    """Flag rows whose foreign key `field` points at no row of `column`'s table."""
+    wanted = {getattr(obj, field) for _, obj in valid}
+    found = {v for (v,) in db.query(column).filter(column.in_(wanted))} if wanted else set()
+    for index, obj in valid:
+        if getattr(obj, field) not in found:
+            errors.setdefault(index, []).append(f"{field}: {getattr(obj, field)} does not exist")
+
+
+def _bulk_insert(db: Session, model, valid, errors: dict, atomic: bool, before_commit=None, statement=None):
+    """
+    I insert every clean row with one multi-row INSERT ... RETURNING id and a
+    single commit. In atomic mode nothing is written if any row failed.
+    `before_commit(db, rows)` runs in the same transaction after the insert.
+    `statement` replaces the plain insert(model), e.g. with an upsert.
+    """
+    rows = [(index, obj) for index, obj in valid if index not in errors]
+    report_errors = [{"index": i, "errors": msgs} for i, msgs in sorted(errors.items())]
+    if not rows or (atomic and errors):
+        return {"created_ids": [], "errors": report_errors}
+    result = db.execute(
+        (insert(model) if statement is None else statement).returning(model.id, sort_by_parameter_order=True),
+        [obj.model_dump() for _, obj in rows],
+    )
+    created_ids = list(result.scalars())
+    if before_commit is not None:
+        before_commit(db, [obj for _, obj in rows])
     db.commit()
-    return db_trade
+    return {"created_ids": created_ids, "errors": report_errors}
+
+
+def bulk_create_emeralds(db: Session, emeralds: list, atomic: bool = True):
+    valid, errors = validate_rows(schemas.EmeraldLotCreate, emeralds)
+    _check_unique(db, EmeraldLot.lot_code, valid, "lot_code", errors)
+    return _bulk_insert(db, EmeraldLot, valid, errors, atomic)
+
+
+def bulk_create_counterparties(db: Session, counterparties: list, atomic: bool = True):
+    valid, errors = validate_rows(schemas.CounterpartyCreate, counterparties)
+    _check_unique(db, Counterparty.name, valid, "name", errors)
+    return _bulk_insert(db, Counterparty, valid, errors, atomic)
+
+
+def bulk_create_trades(db: Session, trades: list, atomic: bool = True):
+    valid, errors = validate_rows(schemas.TradeCreate, trades)
+    _check_references(db, EmeraldLot.id, valid, "emerald_lot_id", errors)
+    _check_references(db, Counterparty.id, valid, "counterparty_id", errors)
+    return _bulk_insert(db, Trade, valid, errors, atomic, before_commit=_rematch_inserted)
+
+
+def _rematch_inserted(db: Session, trades):
+    matching.rematch_lots(db, {trade.emerald_lot_id for trade in trades})
+
+
+def bulk_upsert_fx_rates(db: Session, rates: list, atomic: bool = True):
+    """Insert rates, replacing any existing rate for the same currency and date."""
+    valid, errors = validate_rows(schemas.FxRateCreate, rates)
+    upsert = sqlite_insert(FxRate)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[FxRate.currency, FxRate.date], set_={"rate": upsert.excluded.rate}
+    )
+    return _bulk_insert(db, FxRate, valid, errors, atomic, statement=upsert)
+
+
+# --- Search ---
+# Searchable models in result order within a rank, with the natural key that
+# ranks first; search hits are reported under these type names.
+SEARCH_MODELS = (
+    ("emerald_lot", EmeraldLot, EmeraldLot.lot_code),
+    ("counterparty", Counterparty, Counterparty.name),
+)
+# Trigram FTS cannot match anything shorter
+MIN_SEARCH_TERM = 3
+SEARCH_CURSOR_COLUMNS = tuple(literal_column(name, Integer) for name in ("rank", "type", "id"))
+
+
+def _fts_query(q: str):
+    """FTS5 query requiring every term of `q`, each as a quoted literal fragment."""
+    terms = [term for term in q.split() if len(term) >= MIN_SEARCH_TERM]
+    if not terms:
+        raise InvalidQueryError(f"Search needs a term of at least {MIN_SEARCH_TERM} characters")
+    return "(" + " ".join('"' + term.replace('"', '""') + '"' for term in terms) + ")"
+
+
+def search(db: Session, after: str = None, limit: int = 20, *, q: str):
+    """
+    Lots and counterparties containing every term of `q`, ranked:
+    0 for an exact lot_code or name, 1 for a fragment of it, 2 for a fragment
+    of any other searchable column; ties come in id order.
+    I walk each (rank, type) bucket in FTS5 rowid order from the cursor, so a
+    page reads at most limit + 1 matches per bucket however broad the terms
+    are, instead of scoring every match as ORDER BY bm25 would.
+    Returns ({rank, type, item} dicts, next_cursor).
+    """
+    match = _fts_query(q)
+    cursor = decode_cursor(after, SEARCH_CURSOR_COLUMNS) if after else None
+    params = {"exact": q.strip(), "match": match, "limit": limit + 1}
+    if cursor is not None:
+        params["after_id"] = cursor[2]
+    buckets = []
+    for type_index, (_, model, key) in enumerate(SEARCH_MODELS):
+        table = model.__tablename__
+        everything, key_only = search_tables(table)
+        params[f"other_{type_index}"] = f"{match} NOT {{{key.key}}}: {match}"
+        for rank, source, where in (
+            (0, table, f"{key.key} = :exact"),
+            (1, key_only, f"{key_only} MATCH :match "
+                          f"AND rowid IS NOT (SELECT id FROM {table} WHERE {key.key} = :exact)"),
+            (2, everything, f"{everything} MATCH :other_{type_index}"),
+        ):
+            if cursor is not None and (rank, type_index) < tuple(cursor[:2]):
+                continue
+            if cursor is not None and (rank, type_index) == tuple(cursor[:2]):
+                where += " AND rowid > :after_id"
+            buckets.append(
+                f"SELECT * FROM (SELECT {rank} AS rank, {type_index} AS type, rowid AS id "
+                f"FROM {source} WHERE {where} ORDER BY rowid LIMIT :limit)"
+            )
+    hits = db.execute(
+        text(" UNION ALL ".join(buckets) + " ORDER BY rank, type, id LIMIT :limit"), params
+    ).all()
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(list(hits[-1]))
+
+    found = {}
+    for type_index, (_, model, _) in enumerate(SEARCH_MODELS):
+        ids = [hit.id for hit in hits if hit.type == type_index]
+        if ids:
+            for row in _select(db, model, as_rows=True).filter(model.id.in_(ids)):
+                found[type_index, row.id] = row
+    items = [
+        {"rank": hit.rank, "type": SEARCH_MODELS[hit.type][0], "item": found[hit.type, hit.id]}
+        for hit in hits
+    ]
+    return items, next_cursor
 
 
 # --- Reports ---
-def get_inventory(db: Session):
-    """Return emerald lots currently in stock."""
-    return db.query(EmeraldLot).filter(EmeraldLot.status == LotStatus.IN_STOCK).all()
-
-
-def get_pnl(db: Session):
-    """Compute total cost, revenue, and profit from trades."""
-    purchases = db.query(Trade).filter(Trade.type == TradeType.PURCHASE).all()
-    sales = db.query(Trade).filter(Trade.type == TradeType.SALE).all()
-
-    total_cost = sum(t.total_price for t in purchases)
-    total_revenue = sum(t.total_price for t in sales)
-
+# Report results are cached in-process (see cache.py) and are plain data or Row
+# tuples rather than ORM objects, so a cached result outlives its session.
+def get_inventory_page(db: Session, after: str = None, limit: int = 100):
+    """Keyset page of the lots in stock, by id; returns (rows, next_cursor)."""
+    return get_emeralds_page(db, after, limit, as_rows=True, status=LotStatus.IN_STOCK)
+
+
+def iter_inventory(db: Session):
+    """Stream the lots in stock; returns (field_names, row_iterator)."""
+    return iter_emeralds(db, status=LotStatus.IN_STOCK)
+
+
+# Lot columns the stock screen breaks down by; each is also a drill-down filter
+INVENTORY_FACETS = ("origin", "color_grade", "clarity", "treatment", "shape")
+
+
+@cached_report("emerald_lots")
+def get_inventory_cells(db: Session):
+    """
+    Lot count and carat total of every combination of facet values in stock,
+    from one grouped pass over ix_emerald_lots_facets. There are at most a few
+    thousand combinations, so every drill-down is answered from this result.
+    """
+    columns = [getattr(EmeraldLot, name) for name in INVENTORY_FACETS]
+    return (
+        db.query(*columns, func.count(), func.sum(EmeraldLot.carat))
+        .filter(EmeraldLot.status == LotStatus.IN_STOCK)
+        .group_by(*columns)
+        .all()
+    )
+
+
+def summarize_facets(cells, **filters):
+    """
+    Fold get_inventory_cells() rows into the facets report. `filters` maps
+    facet names to the values to drill down to. The totals match every filter;
+    the buckets of a facet ignore that facet's own filter, so its other values
+    stay visible with the counts they would give.
+    """
+    unknown = set(filters) - set(INVENTORY_FACETS)
+    if unknown:
+        raise InvalidQueryError(f"Unknown facet: {', '.join(sorted(unknown))}")
+    selected = [
+        (position, set(filters[name])) for position, name in enumerate(INVENTORY_FACETS) if filters.get(name)
+    ]
+    totals = {"lot_count": 0, "total_carat": 0.0}
+    buckets = [{} for _ in INVENTORY_FACETS]
+    for *values, lot_count, total_carat in cells:
+        misses = [position for position, allowed in selected if values[position] not in allowed]
+        if len(misses) > 1:
+            continue
+        if misses:
+            positions = misses
+        else:
+            positions = range(len(INVENTORY_FACETS))
+            totals["lot_count"] += lot_count
+            totals["total_carat"] += total_carat
+        for position in positions:
+            bucket = buckets[position].setdefault(values[position], [0, 0.0])
+            bucket[0] += lot_count
+            bucket[1] += total_carat
+    return {
+        **totals,
+        "facets": {
+            name: [
+                {"value": value, "lot_count": lot_count, "total_carat": total_carat}
+                for value, (lot_count, total_carat) in sorted(
+                    buckets[position].items(), key=lambda item: (-item[1][0], item[0] is None, item[0] or "")
+                )
+            ]
+            for position, name in enumerate(INVENTORY_FACETS)
+        },
+    }
+
+
+def get_inventory_facets(db: Session, **filters):
+    """Lot counts and carat totals of the stock by each of INVENTORY_FACETS, drilled down by `filters`."""
+    return summarize_facets(get_inventory_cells(db), **filters)
+
+
+@cached_report("emerald_lots")
+def get_inventory_counts(db: Session):
+    """Lot counts and carat totals per status, read from the lot_status_counts rollup."""
+    return {
+        row.status.value: {"lot_count": row.lot_count, "total_carat": row.total_carat}
+        for row in db.query(LotStatusCount).order_by(LotStatusCount.status)
+    }
+
+
+# Grouping keys accepted by get_pnl(group_by=...); each maps a source table to its key column
+PNL_GROUP_COLUMNS = {
+    "currency": lambda source: source.currency,
+    "counterparty": lambda source: source.counterparty_id,
+    "lot": lambda source: source.emerald_lot_id,
+    "month": lambda source: func.strftime("%Y-%m", source.date),
+}
+
+# Groupings the pnl_daily rollup can answer without touching trades
+PNL_ROLLUP_GROUPS = {None, "currency", "month"}
+
+
+def _filter_trades(query, date_from: date = None, date_to: date = None,
+                   currency: str = None, counterparty_id: int = None,
+                   trade_type: TradeType = None, emerald_lot_id: int = None, source=Trade):
+    """Apply the optional trade filters shared by list, export and report queries."""
+    if trade_type is not None:
+        query = query.filter(source.type == trade_type)
+    if emerald_lot_id is not None:
+        query = query.filter(source.emerald_lot_id == emerald_lot_id)
+    if date_from is not None:
+        query = query.filter(source.date >= date_from)
+    if date_to is not None:
+        query = query.filter(source.date <= date_to)
+    if currency is not None:
+        query = query.filter(source.currency == currency)
+    if counterparty_id is not None:
+        query = query.filter(source.counterparty_id == counterparty_id)
+    return query
+
+
+def _pnl_totals(cost: float = 0.0, revenue: float = 0.0):
+    return {"total_cost": cost, "total_revenue": revenue, "profit": revenue - cost}
+
+
+def _amount(db: Session, source, base_currency: str = None):
+    """
+    source.total_price, converted to base_currency when one is given. Returns
+    (amount, unconverted, join_rates): `unconverted` aggregates to a currency
+    that had no rate (NULL when all converted) and join_rates(query) adds the
+    fx_rates joins the conversion reads.
+    """
+    if base_currency is None:
+        return source.total_price, null(), lambda query: query
+    if base_currency not in fx.fx_cache.currencies(db):
+        raise InvalidQueryError(f"No FX rates for base currency '{base_currency}'")
+    amount, joins = fx.in_base(source, base_currency)
+
+    def join_rates(query):
+        for alias, onclause in joins:
+            query = query.outerjoin(alias, onclause)
+        return query
+    return amount, func.min(case((amount.is_(None), source.currency))), join_rates
+
+
+def _check_converted(unconverted, base_currency: str):
+    if unconverted is not None:
+        raise MissingFxRateError(
+            f"No FX rate converts {unconverted} to {base_currency} on some trade dates"
+        )
+
+
+@cached_report("trades", "fx_rates")
+def get_pnl(db: Session, date_from: date = None, date_to: date = None,
+            currency: str = None, counterparty_id: int = None, group_by: str = None,
+            base_currency: str = None):
+    """
+    Compute total cost, revenue, and profit from trades.
+    I let SQLite do the summing with one SUM ... GROUP BY type query. When no
+    counterparty-level detail is asked for, I sum the per-day pnl_daily rollup
+    instead of trades, so the work is O(days) rather than O(trades).
+    With base_currency, each row is converted at its date's rates inside the SUM.
+    """
+    use_rollup = counterparty_id is None and group_by in PNL_ROLLUP_GROUPS
+    source = PnlDaily if use_rollup else Trade
+    price, unconverted, join_rates = _amount(db, source, base_currency)
+    columns = [source.type, func.sum(price), unconverted]
+    group_columns = [source.type]
+    if group_by is not None:
+        key = PNL_GROUP_COLUMNS[group_by](source)
+        columns.insert(0, key)
+        group_columns.insert(0, key)
+    query = _filter_trades(
+        join_rates(db.query(*columns)), date_from, date_to, currency, counterparty_id, source=source
+    )
+
+    totals = {TradeType.PURCHASE: 0.0, TradeType.SALE: 0.0}
+    groups = {}
+    for row in query.group_by(*group_columns):
+        *key, trade_type, amount, missing = row
+        _check_converted(missing, base_currency)
+        totals[trade_type] += amount
+        if group_by is not None:
+            group = groups.setdefault(key[0], {TradeType.PURCHASE: 0.0, TradeType.SALE: 0.0})
+            group[trade_type] += amount
+
+    report = _pnl_totals(totals[TradeType.PURCHASE], totals[TradeType.SALE])
+    if base_currency is not None:
+        report["base_currency"] = base_currency
+    if group_by is not None:
+        report["group_by"] = group_by
+        report["groups"] = [
+            {"key": key, **_pnl_totals(g[TradeType.PURCHASE], g[TradeType.SALE])}
+            for key, g in sorted(groups.items())
+        ]
+    return report
+
+
+# Time-series buckets, each keyed by the date it starts on (weeks start on Monday)
+PNL_BUCKETS = {
+    "day": lambda column: column,
+    "week": lambda column: func.date(column, "weekday 0", "-6 days", type_=Date),
+    "month": lambda column: func.date(column, "start of month", type_=Date),
+}
+
+
+@cached_report("trades", "fx_rates")
+def get_pnl_timeseries(db: Session, bucket: str = "day", date_from: date = None,
+                       date_to: date = None, currency: str = None, base_currency: str = None):
+    """
+    Cost, revenue and profit per day, week or month, with running totals.
+    One query over the pnl_daily rollup: GROUP BY the bucket start, then
+    SUM(...) OVER (ORDER BY bucket) for the cumulative columns. Buckets
+    without trades are left out; running totals start at date_from.
+    """
+    key = PNL_BUCKETS[bucket](PnlDaily.date).label("bucket")
+    price, unconverted, join_rates = _amount(db, PnlDaily, base_currency)
+    cost = func.sum(case((PnlDaily.type == TradeType.PURCHASE, price), else_=0.0))
+    revenue = func.sum(case((PnlDaily.type == TradeType.SALE, price), else_=0.0))
+    running = {"order_by": key}
+    query = _filter_trades(
+        join_rates(db.query(
+            key, cost, revenue,
+            func.sum(cost).over(**running), func.sum(revenue).over(**running), unconverted,
+        )),
+        date_from, date_to, currency, source=PnlDaily,
+    )
+    points = []
+    for start, bucket_cost, bucket_revenue, total_cost, total_revenue, missing in query.group_by(key).order_by(key):
+        _check_converted(missing, base_currency)
+        points.append({
+            "bucket": start,
+            **_pnl_totals(bucket_cost, bucket_revenue),
+            "cumulative_cost": total_cost,
+            "cumulative_revenue": total_revenue,
+            "cumulative_profit": total_revenue - total_cost,
+        })
+    report = {"bucket": bucket, "points": points}
+    if base_currency is not None:
+        report["base_currency"] = base_currency
+    return report
+
+
+@cached_report("emerald_lots", "counterparties", "trades", "fx_rates")
+def get_dashboard(db: Session, recent: int = 5, base_currency: str = None):
+    """
+    Everything the dashboard shows, from four small queries: the two rollups,
+    a GROUP BY over counterparties, and an index-ordered LIMIT for recent trades.
+    With base_currency the P&L totals come from get_pnl's converted sums instead.
+    """
+    counterparties = {cp_type.value: 0 for cp_type in CounterpartyType}
+    for cp_type, count in db.query(Counterparty.type, func.count()).group_by(Counterparty.type):
+        counterparties[cp_type.value] = count
+
+    trades, totals = [], {TradeType.PURCHASE: 0.0, TradeType.SALE: 0.0}
+    for trade_type, currency, count, amount in (
+        db.query(PnlDaily.type, PnlDaily.currency, func.sum(PnlDaily.trade_count), func.sum(PnlDaily.total_price))
+        .group_by(PnlDaily.type, PnlDaily.currency)
+        .order_by(PnlDaily.type, PnlDaily.currency)
+    ):
+        trades.append({"type": trade_type, "currency": currency, "trade_count": count, "total_price": amount})
+        totals[trade_type] += amount
+
+    recent_trades = (
+        _select(db, Trade, as_rows=True).order_by(Trade.date.desc(), Trade.id.desc()).limit(recent).all()
+    )
     return {
-        "total_cost": total_cost,
-        "total_revenue": total_revenue,
-        "profit": total_revenue - total_cost,
-    }
\ No newline at end of file
+        # the uncached body: a nested single-flight wait could block an async caller
+        "lots_by_status": get_inventory_counts.__wrapped__(db),
+        "counterparties_by_type": counterparties,
+        "trades": trades,
+        "pnl": (
+            _pnl_totals(totals[TradeType.PURCHASE], totals[TradeType.SALE]) if base_currency is None
+            else get_pnl.__wrapped__(db, base_currency=base_currency)
+        ),
+        "recent_trades": recent_trades,
+    }
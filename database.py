@@ -1,14 +1,91 @@
 # database.py
+import os
+
 from sqlalchemy import create_engine, event
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
-from models import Base
+from models import Base, SEARCHABLE_TABLES, create_search_index
+from slow_queries import slow_log
+
+DATABASE_URL = os.getenv("EMERALD_DATABASE_URL", "sqlite:///./emerald.db")
+
+# EMERALD_ASYNC_DB=1 serves the read-heavy routes through AsyncSession (see async_api.py)
+ASYNC_ENABLED = os.getenv("EMERALD_ASYNC_DB", "0") == "1"
+
+# PRAGMA profiles applied to every new connection of our engines.
+# "production" uses WAL so readers never wait on the writer, fsyncs only at
+# checkpoints (synchronous=NORMAL), and keeps hot pages in memory.
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative = KiB, i.e. 64 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,      # ms to wait for a lock instead of failing
+    },
+}
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+
 
-DATABASE_URL = "sqlite:///./emerald.db"
+def load_sqlite_pragmas(environ=os.environ):
+    """
+    I pick the profile named by EMERALD_SQLITE_PROFILE (default "production") and
+    let EMERALD_SQLITE_<PRAGMA> variables override single values.
+    """
+    pragmas = dict(SQLITE_PROFILES[environ.get("EMERALD_SQLITE_PROFILE", "production")])
+    for name in SQLITE_PRAGMAS:
+        value = environ.get(f"EMERALD_SQLITE_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+def apply_sqlite_profile(target: Engine, pragmas: dict, read_only: bool = False):
+    """I run the tuning PRAGMAs on each new connection of `target`."""
+    if target.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(target, "connect")
+    def tune(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    if not read_only:
+        @event.listens_for(target, "close")
+        def optimize(dbapi_connection, connection_record):
+            """SQLite recommends PRAGMA optimize before closing long-lived connections."""
+            try:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA optimize")
+                cursor.close()
+            except Exception:
+                pass  # best effort; the connection is going away anyway
+
+
+SQLITE_PRAGMA_SETTINGS = load_sqlite_pragmas()
 
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}
 )
+apply_sqlite_profile(engine, SQLITE_PRAGMA_SETTINGS)
+
+# Reports read through their own pool of query_only connections, so long scans
+# never hold a connection the write path needs (and cannot write by mistake).
+read_engine = create_engine(
+    DATABASE_URL, connect_args={"check_same_thread": False}
+)
+apply_sqlite_profile(read_engine, SQLITE_PRAGMA_SETTINGS, read_only=True)
+
+# EMERALD_SLOW_QUERY_MS=<ms> logs slower statements with their plans (see slow_queries.py)
+if slow_log.enabled:
+    slow_log.watch(engine)
+    slow_log.watch(read_engine)
 
 # Enable SQLite foreign key constraints
 @event.listens_for(Engine, "connect")
@@ -22,6 +99,7 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         pass  # ignore for non-sqlite drivers
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Dependency for FastAPI routes
 def get_db():
@@ -32,5 +110,68 @@ def get_db():
     finally:
         db.close()
 
+
+def get_read_db():
+    """Read-only sessions for report and export routes."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# --- Async stack ---
+def async_url(url: str):
+    """Swap the pysqlite driver for aiosqlite in a sqlite URL."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed
+
+
+def make_async_sessionmaker(url: str, pragmas: dict, read_only: bool = False):
+    """
+    I build an AsyncEngine plus sessionmaker with the same tuning as the sync
+    engines. expire_on_commit is off because async code cannot lazy-load the
+    attributes that FastAPI reads while serializing the response.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(async_url(url))
+    apply_sqlite_profile(async_engine.sync_engine, pragmas, read_only=read_only)
+    if slow_log.enabled:
+        slow_log.watch(async_engine.sync_engine)
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Built only when selected, so the sync deployment does not need aiosqlite
+AsyncSessionLocal = AsyncReadSessionLocal = None
+if ASYNC_ENABLED:
+    AsyncSessionLocal = make_async_sessionmaker(DATABASE_URL, SQLITE_PRAGMA_SETTINGS)
+    AsyncReadSessionLocal = make_async_sessionmaker(DATABASE_URL, SQLITE_PRAGMA_SETTINGS, read_only=True)
+
+
+async def get_async_db():
+    """Async counterpart of get_db."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Async counterpart of get_read_db."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+def init_db(bind=engine):
+    """I create missing tables and indexes so existing database files pick up new access paths."""
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    with bind.begin() as connection:
+        for table in SEARCHABLE_TABLES:
+            create_search_index(table, connection)
+
 # Always create tables when imported
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+init_db()
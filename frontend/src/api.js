@@ -4,7 +4,7 @@ const API_URL = "http://127.0.0.1:8000";
 // Later we can replace this with: process.env.REACT_APP_API_URL
 
 // Emeralds
-export const listEmeralds = () => axios.get(`${API_URL}/emeralds/`);
+export const listEmeralds = (params) => axios.get(`${API_URL}/emeralds/`, { params });
 export const createEmerald = (payload) => axios.post(`${API_URL}/emeralds/`, payload);
 export const updateEmerald = (id, payload) => axios.put(`${API_URL}/emeralds/${id}`, payload);
 export const deleteEmerald = (id) => axios.delete(`${API_URL}/emeralds/${id}`);
@@ -17,8 +17,11 @@ export const updateCounterparty = (id, payload) => axios.put(`${API_URL}/counter
 export const deleteCounterparty = (id) => axios.delete(`${API_URL}/counterparties/${id}`);
 
 // Trades 
-export const listTrades = () => axios.get(`${API_URL}/trades/`);
+export const listTrades = (params) => axios.get(`${API_URL}/trades/`, { params });
 export const getTrade = (id) => axios.get(`${API_URL}/trades/${id}`);   //  optional
 export const createTrade = (payload) => axios.post(`${API_URL}/trades/`, payload);
 export const updateTrade = (id, payload) => axios.put(`${API_URL}/trades/${id}`, payload);
 export const deleteTrade = (id) => axios.delete(`${API_URL}/trades/${id}`);
+
+// Reports
+export const getDashboard = (params) => axios.get(`${API_URL}/reports/dashboard`, { params });
@@ -1,34 +1,24 @@
 import React, { useEffect, useState } from "react";
-import { listEmeralds, listCounterparties, listTrades } from "../api";
-import axios from "axios";
+import { getDashboard } from "../api";
 import DataTable from "../components/DataTable";
 
-const API_URL = process.env.REACT_APP_API_URL || "http://127.0.0.1:8000";
-
 export default function Dashboard() {
-  const [emeralds, setEmeralds] = useState([]);
-  const [counterparties, setCounterparties] = useState([]);
+  const [inStock, setInStock] = useState(0);
+  const [counterpartyCount, setCounterpartyCount] = useState(0);
   const [pnl, setPnl] = useState({ total_cost: 0, total_revenue: 0, profit: 0 });
   const [recentTrades, setRecentTrades] = useState([]);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Get emeralds
-        const { data: emeraldData } = await listEmeralds();
-        setEmeralds(emeraldData);
-
-        // Get counterparties
-        const { data: cpData } = await listCounterparties();
-        setCounterparties(cpData);
-
-        // Get P&L
-        const { data: pnlData } = await axios.get(`${API_URL}/reports/pnl`);
-        setPnl(pnlData);
-
-        // Get trades (latest 5)
-        const { data: tradeData } = await listTrades();
-        setRecentTrades(tradeData.slice(-5).reverse()); // last 5, newest first
+        // One aggregate call instead of downloading every list
+        const { data } = await getDashboard({ recent: 5 });
+        setInStock(data.lots_by_status.IN_STOCK?.lot_count ?? 0);
+        setCounterpartyCount(
+          Object.values(data.counterparties_by_type).reduce((sum, n) => sum + n, 0)
+        );
+        setPnl(data.pnl);
+        setRecentTrades(data.recent_trades); // newest first
       } catch (e) {
         console.error("Dashboard fetch failed:", e);
       }
@@ -61,12 +51,12 @@ export default function Dashboard() {
       >
         <div className="card">
           <h3>💎 Emeralds in Stock</h3>
-          <p>{emeralds.filter((e) => e.status === "IN_STOCK").length}</p>
+          <p>{inStock}</p>
         </div>
 
         <div className="card">
           <h3>👥 Counterparties</h3>
-          <p>{counterparties.length}</p>
+          <p>{counterpartyCount}</p>
         </div>
 
         <div className="card">
@@ -0,0 +1,103 @@
+"""
+I convert amounts between currencies with the rates in the fx_rates table.
+Every rate is the value of one unit of a currency in FX_PIVOT, so any pair
+converts through the pivot, and the pivot itself needs no rows. The rate of a
+currency on a day is its latest rate on or before that day, which covers
+weekends and holidays without extra rows.
+
+Reports convert inside their SQL aggregate: in_base() outer-joins each summed
+row to the two rates in effect on its date (one index seek each) and hands back
+the converted amount as a column expression. Single lookups go through
+FxRateCache, which keeps the whole table in memory and reloads it after a
+commit to fx_rates. Rates are loaded from CSV with POST /import/fx_rates.
+"""
+
+import bisect
+import threading
+
+from sqlalchemy import and_, case, func, literal, select
+from sqlalchemy.orm import Session, aliased
+
+import versioning
+from models import FxRate
+
+FX_PIVOT = "USD"
+
+
+def _as_of(alias, currency, day):
+    """Join condition picking the row of `alias` in effect for `currency` on `day`."""
+    latest = (
+        select(func.max(FxRate.date))
+        .where(FxRate.currency == currency, FxRate.date <= day)
+        .scalar_subquery()
+    )
+    return and_(alias.currency == currency, alias.date == latest)
+
+
+def in_base(source, base: str):
+    """
+    Express source.total_price in `base`, converted at the rates of source.date.
+    Returns (amount, joins): add each (alias, onclause) in `joins` to the query
+    with outerjoin(). amount is NULL where a rate is missing.
+    """
+    quote = aliased(FxRate, name="fx_quote")
+    joins = [(quote, _as_of(quote, source.currency, source.date))]
+    amount = source.total_price * case((source.currency == FX_PIVOT, 1.0), else_=quote.rate)
+    if base != FX_PIVOT:
+        base_rate = aliased(FxRate, name="fx_base")
+        joins.append((base_rate, _as_of(base_rate, literal(base), source.date)))
+        amount = amount / base_rate.rate
+    return case((source.currency == base, source.total_price), else_=amount), joins
+
+
+class FxRateCache:
+    """All rates in memory as per-currency (dates, rates) lists, reloaded once fx_rates changes."""
+
+    def __init__(self):
+        self._rates = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _table(self, db: Session):
+        version = versioning.version(FxRate.__tablename__)
+        with self._lock:
+            if self._version == version:
+                return self._rates
+        rates = {}
+        for currency, day, rate in db.query(FxRate.currency, FxRate.date, FxRate.rate).order_by(
+            FxRate.currency, FxRate.date
+        ):
+            dates, values = rates.setdefault(currency, ([], []))
+            dates.append(day)
+            values.append(rate)
+        with self._lock:
+            self._rates, self._version = rates, version
+            self.loads += 1
+        return rates
+
+    def currencies(self, db: Session):
+        """Every currency with at least one rate, plus the pivot."""
+        return set(self._table(db)) | {FX_PIVOT}
+
+    def rate(self, db: Session, currency: str, on, base: str = FX_PIVOT):
+        """Value of one unit of `currency` in `base` on day `on`, or None without a rate."""
+        table = self._table(db)
+        pivot_rates = []
+        for code in (currency, base):
+            if code == FX_PIVOT:
+                pivot_rates.append(1.0)
+                continue
+            dates, values = table.get(code, ((), ()))
+            index = bisect.bisect_right(dates, on) - 1
+            if index < 0:
+                return None
+            pivot_rates.append(values[index])
+        return pivot_rates[0] / pivot_rates[1]
+
+    def clear(self):
+        with self._lock:
+            self._rates, self._version = {}, None
+
+
+fx_cache = FxRateCache()
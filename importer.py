@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+I load supplier CSV files (lot manifests, counterparty lists, trade confirmations)
+in fixed-size chunks, so memory depends on the chunk size and not the file size.
+Each chunk is validated, has its lot codes and counterparty names resolved with one
+query per column, and is inserted in a single transaction through crud's bulk path.
+
+Usage:
+    python importer.py emeralds manifest.csv
+    python importer.py trades confirmations.csv --chunk-size 5000
+"""
+
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+
+from sqlalchemy.orm import Session
+
+import crud
+from models import EmeraldLot, Counterparty
+
+# Rows validated and inserted per transaction
+CHUNK_ROWS = 1000
+# Row errors kept in the report; the count keeps going past this
+MAX_REPORTED_ERRORS = 1000
+
+BULK_CREATE = {
+    "emeralds": crud.bulk_create_emeralds,
+    "counterparties": crud.bulk_create_counterparties,
+    "trades": crud.bulk_create_trades,
+    "fx_rates": crud.bulk_upsert_fx_rates,
+}
+
+
+def _lookup(db: Session, key_column, values):
+    """Map natural keys to ids with one IN query."""
+    if not values:
+        return {}
+    model = key_column.class_
+    return dict(db.query(key_column, model.id).filter(key_column.in_(values)))
+
+
+def _resolve_trade_keys(db: Session, rows, errors: dict):
+    """Replace lot_code / counterparty_name columns with emerald_lot_id / counterparty_id."""
+    lot_ids = _lookup(db, EmeraldLot.lot_code, {r["lot_code"] for r in rows if r.get("lot_code")})
+    cp_ids = _lookup(db, Counterparty.name, {r["counterparty_name"] for r in rows if r.get("counterparty_name")})
+    for index, row in enumerate(rows):
+        lot_code = row.pop("lot_code", None)
+        if lot_code and not row.get("emerald_lot_id"):
+            if lot_code in lot_ids:
+                row["emerald_lot_id"] = lot_ids[lot_code]
+            else:
+                errors.setdefault(index, []).append(f"lot_code: '{lot_code}' not found")
+        name = row.pop("counterparty_name", None)
+        if name and not row.get("counterparty_id"):
+            if name in cp_ids:
+                row["counterparty_id"] = cp_ids[name]
+            else:
+                errors.setdefault(index, []).append(f"counterparty_name: '{name}' not found")
+
+
+def import_csv(db: Session, entity: str, lines, chunk_size: int = CHUNK_ROWS):
+    """
+    Import CSV text (any iterable of lines with a header row) for `entity`.
+    Returns a report with row/created counts and per-line errors.
+    """
+    create = BULK_CREATE[entity]
+    reader = csv.DictReader(lines)
+    report = {"rows": 0, "created": 0, "error_count": 0, "errors": []}
+    undecodable = None
+
+    while undecodable is None:
+        rows, line_numbers = [], []
+        try:
+            for row in islice(reader, chunk_size):
+                # Empty cells mean "not provided", not an empty string
+                rows.append({k: (v if v != "" else None) for k, v in row.items() if k})
+                line_numbers.append(reader.line_num)
+        except UnicodeDecodeError:
+            # Earlier chunks are committed, so stop here and report instead of raising
+            undecodable = reader.line_num + 1
+        if not rows:
+            break
+
+        errors = {}
+        if entity == "trades":
+            _resolve_trade_keys(db, rows, errors)
+        # Rows that failed lookup are replaced by an empty dict so indexes line up;
+        # their validation errors are dropped in favour of the lookup error.
+        result = create(db, [{} if i in errors else r for i, r in enumerate(rows)], atomic=False)
+        for err in result["errors"]:
+            errors.setdefault(err["index"], err["errors"])
+
+        report["rows"] += len(rows)
+        report["created"] += len(result["created_ids"])
+        report["error_count"] += len(errors)
+        for index in sorted(errors):
+            if len(report["errors"]) >= MAX_REPORTED_ERRORS:
+                break
+            report["errors"].append({"line": line_numbers[index], "errors": errors[index]})
+    if undecodable is not None:
+        report["error_count"] += 1
+        report["errors"].append({
+            "line": undecodable, "errors": ["Not valid UTF-8: this line and the rest of the file were not imported"],
+        })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a CSV file into the ledger.")
+    parser.add_argument("entity", choices=sorted(BULK_CREATE))
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8-sig") as handle:
+            report = import_csv(db, args.entity, handle, args.chunk_size)
+    finally:
+        db.close()
+    print(json.dumps(report, indent=2))
+    return 1 if report["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+I generate a synthetic emerald ledger for load and scale testing.
+The same seed always produces the same rows. Lots get realistic carat, origin,
+grade and treatment mixes; each lot is bought from a supplier and, most of the
+time, sold on later at a markup, possibly several times over. Prices follow
+grade and origin, and trades are booked in several currencies.
+
+Rows are drawn column-wise and go in through one executemany per table on
+the models tables. The rollup triggers and the secondary trade indexes are
+dropped for the load and rebuilt once at the end, which is much cheaper than
+maintaining them row by row.
+
+Usage:
+    python ledger_gen.py ledger.db --lots 250000 --counterparties 5000 --trades 1000000 --seed 42
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from operator import itemgetter
+
+from sqlalchemy import create_engine, text
+
+from models import (
+    Base, EmeraldLot, Counterparty, Trade, PnlDaily, LotStatusCount,
+    LotStatus, CounterpartyType, TradeType,
+    ROLLUP_TRIGGERS, PNL_DAILY_REBUILD, LOT_STATUS_REBUILD, SEARCH_TRIGGERS, search_rebuild,
+)
+
+START, END = date(2018, 1, 1), date(2025, 12, 31)
+
+ORIGINS = {"Colombia": 0.55, "Zambia": 0.25, "Brazil": 0.12, "Afghanistan": 0.04, "Ethiopia": 0.04}
+ORIGIN_PREMIUM = {"Colombia": 1.35, "Zambia": 1.0, "Brazil": 0.7, "Afghanistan": 1.15, "Ethiopia": 0.85}
+# USD per carat for a typical stone of each color grade (A best)
+GRADE_PRICE = {"A": 9000, "B": 5500, "C": 3500, "D": 2200, "E": 1300, "F": 750, "G": 400}
+GRADE_WEIGHTS = {"A": 0.03, "B": 0.09, "C": 0.18, "D": 0.25, "E": 0.22, "F": 0.15, "G": 0.08}
+TREATMENTS = {"None": 0.10, "Minor oil": 0.45, "Moderate oil": 0.35, "Significant oil": 0.10}
+TREATMENT_DISCOUNT = {"None": 1.6, "Minor oil": 1.0, "Moderate oil": 0.8, "Significant oil": 0.55}
+SHAPES = {"Emerald cut": 0.45, "Oval": 0.2, "Cushion": 0.12, "Pear": 0.1, "Round": 0.08, "Cabochon": 0.05}
+CLARITIES = {"VVS": 0.05, "VS": 0.25, "SI1": 0.35, "SI2": 0.25, "I1": 0.1}
+
+COUNTERPARTY_TYPES = {CounterpartyType.SUPPLIER: 0.4, CounterpartyType.BUYER: 0.4, CounterpartyType.BOTH: 0.2}
+COUNTRIES = {
+    "Colombia": 0.3, "USA": 0.2, "Switzerland": 0.1, "Belgium": 0.1, "UK": 0.08,
+    "Hong Kong": 0.08, "Zambia": 0.06, "Brazil": 0.05, "Thailand": 0.03,
+}
+NAME_PARTS = (
+    ("Andes", "Muzo", "Chivor", "Coscuez", "Verde", "Kagem", "Itabira", "Panjshir", "Atlas", "Aurora",
+     "Sierra", "Boyaca", "Orion", "Lumen", "Vireo", "Jade"),
+    ("Gems", "Emeralds", "Mining", "Trading", "Jewels", "Holdings", "Stones", "& Co"),
+)
+
+# Booking currency mix, with a fixed USD rate for converting prices
+CURRENCIES = {"USD": 0.6, "EUR": 0.2, "COP": 0.1, "GBP": 0.05, "CHF": 0.05}
+USD_RATES = {"USD": 1.0, "EUR": 0.92, "COP": 4000.0, "GBP": 0.79, "CHF": 0.88}
+LOCATIONS = {
+    "USD": ("New York", "Miami"), "EUR": ("Antwerp", "Paris"), "COP": ("Bogotá", "Medellín"),
+    "GBP": ("London",), "CHF": ("Geneva",),
+}
+
+HOLDING_DAYS = 60.0        # gamma(2, scale) days between a purchase and its sale
+RESTOCK_DAYS = 90.0         # mean days between a sale and buying the lot back
+MARKUP = (0.22, 0.15)       # normal(mean, sd) sale markup over the purchase price
+
+# Secondary trade indexes, rebuilt after the load
+TRADE_INDEXES = [index for index in Trade.__table__.indexes if not index.unique]
+
+LOT_COLUMNS = ("id", "lot_code", "carat", "origin", "color_grade", "treatment", "shape", "clarity",
+               "certificate_id", "status")
+COUNTERPARTY_COLUMNS = ("id", "name", "type", "country", "contact_info")
+TRADE_COLUMNS = ("date", "type", "currency", "unit_price", "total_price", "location",
+                 "emerald_lot_id", "counterparty_id")
+
+
+def _trigger_name(ddl: str):
+    """Name in a "CREATE TRIGGER IF NOT EXISTS <name> ..." statement."""
+    return ddl.split()[5]
+
+
+def _draw(rng: random.Random, weights: dict, count: int):
+    """`count` keys of `weights` in one call; per-row choices() is the slow part at this scale."""
+    return rng.choices([getattr(key, "value", key) for key in weights], list(weights.values()), k=count)
+
+
+def generate_lots(rng: random.Random, count: int):
+    """Lot rows in LOT_COLUMNS order; status is settled later from each lot's last trade."""
+    origins, grades = _draw(rng, ORIGINS, count), _draw(rng, GRADE_WEIGHTS, count)
+    treatments, shapes, clarities = (_draw(rng, TREATMENTS, count), _draw(rng, SHAPES, count),
+                                     _draw(rng, CLARITIES, count))
+    gauss, rand, randrange, exp = rng.gauss, rng.random, rng.randrange, math.exp
+    lots = []
+    for i in range(count):
+        lots.append([
+            i + 1, f"EM{i + 1:07d}", round(min(30.0, max(0.2, exp(gauss(0.6, 0.65)))), 2),
+            origins[i], grades[i], treatments[i], shapes[i], clarities[i],
+            f"CERT{randrange(10**8):08d}" if rand() < 0.7 else None, LotStatus.IN_STOCK.value,
+        ])
+    return lots
+
+
+def generate_counterparties(rng: random.Random, count: int):
+    """Counterparty rows in COUNTERPARTY_COLUMNS order."""
+    kinds, countries = _draw(rng, COUNTERPARTY_TYPES, count), _draw(rng, COUNTRIES, count)
+    first, second = NAME_PARTS
+    return [
+        (i + 1, f"{rng.choice(first)} {rng.choice(second)} {i + 1:05d}", kinds[i], countries[i],
+         f"desk{i + 1}@example.com")
+        for i in range(count)
+    ]
+
+
+def _lot_dates(rng: random.Random, trades: int, span: int):
+    """Ascending day offsets for a lot's alternating purchase/sale history."""
+    rand, log = rng.random, math.log
+    gaps = [0.0]
+    for n in range(1, trades):
+        if n % 2:  # gamma with shape 2 is the sum of two exponentials
+            gaps.append(-HOLDING_DAYS * log((1.0 - rand()) * (1.0 - rand())))
+        else:
+            gaps.append(-RESTOCK_DAYS * log(1.0 - rand()))
+    total = sum(gaps)
+    if total > span * 0.8:  # squeeze long histories into the window
+        gaps = [gap * span * 0.8 / total for gap in gaps]
+        total = span * 0.8
+    day = rng.uniform(0, span - total)
+    offsets = []
+    for gap in gaps:
+        day += gap
+        offsets.append(int(day))
+    return offsets
+
+
+def generate_trades(rng: random.Random, lots, suppliers, buyers, count: int):
+    """
+    Spread `count` trades over the lots as purchase, sale, purchase, ... runs:
+    every lot is bought once (while trades last) and the rest land on random
+    lots, so some lots cycle many times and about half end up unsold.
+    Returns rows in TRADE_COLUMNS order sorted by date, so ids grow with time
+    as in a real ledger, and sets each lot's status from its last trade.
+    """
+    span = (END - START).days
+    days = [(START + timedelta(days=n)).isoformat() for n in range(span + 1)]
+    currencies = _draw(rng, CURRENCIES, count)
+    rand, gauss, exp = rng.random, rng.gauss, math.exp
+    markup, markup_sd = MARKUP
+    sale, purchase = TradeType.SALE.value, TradeType.PURCHASE.value
+    sold, in_stock = LotStatus.SOLD.value, LotStatus.IN_STOCK.value
+    per_lot = [1 if n < count else 0 for n in range(len(lots))]
+    for n in rng.choices(range(len(lots)), k=max(0, count - len(lots))):
+        per_lot[n] += 1
+    trades, i = [], 0
+    for lot, lot_trades in zip(lots, per_lot):
+        if not lot_trades:
+            continue
+        lot_id, carat, grade, origin, treatment = lot[0], lot[2], lot[4], lot[3], lot[5]
+        value = (GRADE_PRICE[grade] * ORIGIN_PREMIUM[origin] * TREATMENT_DISCOUNT[treatment]
+                 * (1 + 0.15 * math.log1p(carat)) * exp(gauss(0, 0.25)))
+        for k, offset in enumerate(_lot_dates(rng, lot_trades, span)):
+            if k % 2:
+                unit_usd = cost * (1 + gauss(markup, markup_sd))
+                kind, parties = sale, buyers
+            else:
+                value *= exp(gauss(0.02, 0.08))  # market drift between cycles
+                unit_usd = cost = value
+                kind, parties = purchase, suppliers
+            cur = currencies[i]
+            places = LOCATIONS[cur]
+            unit = unit_usd * USD_RATES[cur]
+            trades.append((
+                days[offset], kind, cur, round(unit, 2), round(unit * carat, 2),
+                places[int(rand() * len(places))], lot_id, parties[int(rand() * len(parties))],
+            ))
+            i += 1
+        lot[9] = sold if lot_trades % 2 == 0 else in_stock
+    trades.sort(key=itemgetter(0))
+    return trades
+
+
+def _insert(conn, table, columns, rows):
+    """
+    One executemany of pre-rendered rows (enum names, ISO dates). Going around
+    Core's per-row bind processing is what makes a million-row load take seconds.
+    """
+    marks = ", ".join("?" * len(columns))
+    conn.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({marks})", rows)
+
+
+def generate(engine, lots: int, counterparties: int, trades: int, seed: int = 0):
+    """Create the schema on `engine` (an empty database) and fill it; returns row counts."""
+    if lots < 1 or counterparties < 1:
+        raise ValueError("Need at least one lot and one counterparty")
+    rng = random.Random(seed)
+    lot_rows = generate_lots(rng, lots)
+    cp_rows = generate_counterparties(rng, counterparties)
+    suppliers = [cp[0] for cp in cp_rows if cp[2] != CounterpartyType.BUYER.value] or [1]
+    buyers = [cp[0] for cp in cp_rows if cp[2] != CounterpartyType.SUPPLIER.value] or [1]
+    trade_rows = generate_trades(rng, lot_rows, suppliers, buyers, trades)
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            for triggers in (*ROLLUP_TRIGGERS.values(), *SEARCH_TRIGGERS.values()):
+                for trigger in triggers:
+                    conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {_trigger_name(trigger)}")
+        for index in TRADE_INDEXES:
+            index.drop(conn, checkfirst=True)
+
+        _insert(conn, EmeraldLot.__table__, LOT_COLUMNS, list(map(tuple, lot_rows)))
+        _insert(conn, Counterparty.__table__, COUNTERPARTY_COLUMNS, cp_rows)
+        _insert(conn, Trade.__table__, TRADE_COLUMNS, trade_rows)
+
+        for index in TRADE_INDEXES:
+            index.create(conn, checkfirst=True)
+        conn.execute(PnlDaily.__table__.delete())
+        conn.execute(LotStatusCount.__table__.delete())
+        conn.execute(text(PNL_DAILY_REBUILD))
+        conn.execute(text(LOT_STATUS_REBUILD))
+        if engine.dialect.name == "sqlite":
+            # One bulk re-index instead of a trigger call per row
+            for table_name in SEARCH_TRIGGERS:
+                for statement in search_rebuild(table_name):
+                    conn.exec_driver_sql(statement)
+            for triggers in (*ROLLUP_TRIGGERS.values(), *SEARCH_TRIGGERS.values()):
+                for trigger in triggers:
+                    conn.exec_driver_sql(trigger)
+            conn.exec_driver_sql("ANALYZE")
+    return {"lots": lots, "counterparties": counterparties, "trades": len(trade_rows)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic ledger.")
+    parser.add_argument("path", help="SQLite file to create")
+    parser.add_argument("--lots", type=int, default=25_000)
+    parser.add_argument("--counterparties", type=int, default=500)
+    parser.add_argument("--trades", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="replace an existing file")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path):
+        if not args.force:
+            parser.error(f"{args.path} exists (use --force to replace it)")
+        os.remove(args.path)
+    started = time.perf_counter()
+    engine = create_engine(f"sqlite:///{args.path}")
+    counts = generate(engine, args.lots, args.counterparties, args.trades, args.seed)
+    engine.dispose()
+    print(f"Generated {counts['lots']} lots, {counts['counterparties']} counterparties and "
+          f"{counts['trades']} trades in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
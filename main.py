@@ -5,9 +5,15 @@ I added CORS middleware to allow my React frontend to communicate with the API.
 """
 
 # main.py
-from fastapi import FastAPI, Depends
+import io
+from datetime import date
+from typing import Optional, Union
+from fastapi import FastAPI, Depends, Query, Request, Response, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-import crud, schemas, database
+import crud, schemas, database, export, fx, importer, metrics, params, serialization
+from cache import report_cache, entity_cache
+from slow_queries import slow_log
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import HTTPException
 
@@ -22,7 +28,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+# Outermost, so the latency covers CORS handling and error responses too
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(crud.InvalidQueryError)
+def invalid_query(request: Request, exc: crud.InvalidQueryError):
+    """Bad cursors and sort keys are client errors."""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# With EMERALD_ASYNC_DB=1 the async handlers are registered first, so they
+# serve the read-heavy paths; everything else falls through to the sync routes.
+if database.ASYNC_ENABLED:
+    import async_api
+    app.include_router(async_api.router)
+
+
+# Largest batch accepted by the /bulk endpoints
+BULK_MAX_ROWS = 10_000
+
+
+def _bulk_create(create, db: Session, rows: list, mode: schemas.BulkMode):
+    """I run a bulk insert and turn a rejected all-or-nothing batch into a 422."""
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+    result = create(db, rows, atomic=mode == schemas.BulkMode.atomic)
+    if mode == schemas.BulkMode.atomic and result["errors"]:
+        raise HTTPException(status_code=422, detail=result)
+    return result
+
+
+def _export(name: str, fields, rows, fmt: schemas.ExportFormat):
+    """I stream an export as it is read instead of building the whole body first."""
+    return StreamingResponse(
+        export.stream(fmt.value, fields, rows),
+        media_type=export.MEDIA_TYPES[fmt.value],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
+
+
+def _cursor_page(fetch, db: Session, after: str, limit: int, **kwargs):
+    """I run a keyset page query and wrap it as {items, next_cursor} (cursor mode)."""
+    items, next_cursor = fetch(db, after, limit, **kwargs)
+    return {"items": items, "next_cursor": next_cursor}
 
 
 # Emeralds
@@ -30,20 +79,61 @@ app.add_middleware(
 def create_emerald(emerald: schemas.EmeraldLotCreate, db: Session = Depends(database.get_db)):
     return crud.create_emerald(db, emerald)
 
-@app.get("/emeralds/", response_model=list[schemas.EmeraldLotRead])
-def read_emeralds(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    return crud.get_emeralds(db, skip, limit)
+@app.post("/emeralds/bulk", response_model=schemas.BulkResult)
+def create_emeralds_bulk(
+    # Rows are validated one by one so bad rows can be reported by index
+    rows: list[dict], mode: schemas.BulkMode = schemas.BulkMode.atomic,
+    db: Session = Depends(database.get_db)
+):
+    return _bulk_create(crud.bulk_create_emeralds, db, rows, mode)
+
+@app.get("/emeralds/export")
+def export_emeralds(
+    format: schemas.ExportFormat = schemas.ExportFormat.csv,
+    filters: dict = Depends(params.emerald_filters),
+    db: Session = Depends(database.get_read_db)
+):
+    return _export("emeralds", *crud.iter_emeralds(db, **filters), format)
+
+@app.get(
+    "/emeralds/",
+    response_model=Union[list[schemas.EmeraldLotRead], schemas.EmeraldLotPage],
+    dependencies=[params.lots_etag],
+)
+def read_emeralds(
+    response: Response,
+    # Passing `after` (empty for the first page) switches to cursor mode
+    skip: int = 0, limit: int = params.LimitParam, after: Optional[str] = None,
+    sort: Optional[str] = params.SortParam,
+    filters: dict = Depends(params.emerald_filters),
+    db: Session = Depends(database.get_db)
+):
+    if after is not None:
+        page = _cursor_page(crud.get_emeralds_page, db, after, limit, sort=sort, as_rows=True, **filters)
+    else:
+        page = crud.get_emeralds(db, skip, limit, sort=sort, as_rows=True, **filters)
+    return serialization.json_response(page, response)
+
+@app.get("/emeralds/{emerald_id}", response_model=schemas.EmeraldLotRead, dependencies=[params.lots_etag])
+def read_emerald(emerald_id: int, db: Session = Depends(database.get_read_db)):
+    db_emerald = crud.get_emerald_cached(db, emerald_id)
+    if not db_emerald:
+        raise HTTPException(status_code=404, detail="Emerald not found")
+    return db_emerald
 
 @app.delete("/emeralds/{emerald_id}", response_model=schemas.EmeraldLotRead)
 def delete_emerald(emerald_id: int, db: Session = Depends(database.get_db)):
-    db_emerald = crud.get_emerald(db, emerald_id)  # you'll need this helper
+    db_emerald = crud.delete_emerald(db, emerald_id)
     if not db_emerald:
         raise HTTPException(status_code=404, detail="Emerald not found")
-    return crud.delete_emerald(db, emerald_id)
+    return db_emerald
 
 @app.put("/emeralds/{emerald_id}", response_model=schemas.EmeraldLotRead)
 def update_emerald(emerald_id: int, emerald: schemas.EmeraldLotCreate, db: Session = Depends(database.get_db)):
-    return crud.update_emerald(db, emerald_id, emerald)
+    db_emerald = crud.update_emerald(db, emerald_id, emerald)
+    if not db_emerald:
+        raise HTTPException(status_code=404, detail="Emerald not found")
+    return db_emerald
 
 
 # Counterparties
@@ -55,13 +145,51 @@ def create_counterparty(
     return crud.create_counterparty(db, cp)
 
 
-@app.get("/counterparties/", response_model=list[schemas.CounterpartyRead])
+@app.post("/counterparties/bulk", response_model=schemas.BulkResult)
+def create_counterparties_bulk(
+    rows: list[dict], mode: schemas.BulkMode = schemas.BulkMode.atomic,
+    db: Session = Depends(database.get_db)
+):
+    return _bulk_create(crud.bulk_create_counterparties, db, rows, mode)
+
+
+@app.get("/counterparties/export")
+def export_counterparties(
+    format: schemas.ExportFormat = schemas.ExportFormat.csv,
+    db: Session = Depends(database.get_read_db)
+):
+    return _export("counterparties", *crud.iter_counterparties(db), format)
+
+
+@app.get(
+    "/counterparties/",
+    response_model=Union[list[schemas.CounterpartyRead], schemas.CounterpartyPage],
+    dependencies=[params.counterparties_etag],
+)
 def read_counterparties(
+    response: Response,
     # I use CounterpartyUpdate here instead of CounterpartyCreate to allow partial updates
-    skip: int = 0, limit: int = 100,
+    skip: int = 0, limit: int = params.LimitParam, after: Optional[str] = None,
+    sort: Optional[str] = params.SortParam,
     db: Session = Depends(database.get_db)
 ):
-    return crud.get_counterparties(db, skip, limit)
+    if after is not None:
+        page = _cursor_page(crud.get_counterparties_page, db, after, limit, sort=sort, as_rows=True)
+    else:
+        page = crud.get_counterparties(db, skip, limit, sort=sort, as_rows=True)
+    return serialization.json_response(page, response)
+
+
+@app.get(
+    "/counterparties/{cp_id}",
+    response_model=schemas.CounterpartyRead,
+    dependencies=[params.counterparties_etag],
+)
+def read_counterparty(cp_id: int, db: Session = Depends(database.get_read_db)):
+    db_cp = crud.get_counterparty_cached(db, cp_id)
+    if not db_cp:
+        raise HTTPException(status_code=404, detail="Counterparty not found")
+    return db_cp
 
 
 @app.put("/counterparties/{cp_id}", response_model=schemas.CounterpartyRead)
@@ -71,7 +199,10 @@ def update_counterparty(
     cp: schemas.CounterpartyUpdate,
     db: Session = Depends(database.get_db)
 ):
-    return crud.update_counterparty(db, cp_id, cp)
+    db_cp = crud.update_counterparty(db, cp_id, cp)
+    if not db_cp:
+        raise HTTPException(status_code=404, detail="Counterparty not found")
+    return db_cp
 
 
 @app.delete("/counterparties/{cp_id}")
@@ -90,14 +221,53 @@ def create_trade(trade: schemas.TradeCreate, db: Session = Depends(database.get_
     return crud.create_trade(db, trade)
 
 
-@app.get("/trades/", response_model=list[schemas.TradeRead])
-def read_trades(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    return crud.get_trades(db, skip, limit)
+@app.post("/trades/bulk", response_model=schemas.BulkResult)
+def create_trades_bulk(
+    rows: list[dict], mode: schemas.BulkMode = schemas.BulkMode.atomic,
+    db: Session = Depends(database.get_db)
+):
+    return _bulk_create(crud.bulk_create_trades, db, rows, mode)
 
 
-@app.get("/trades/{trade_id}", response_model=schemas.TradeRead)
-def read_trade(trade_id: int, db: Session = Depends(database.get_db)):
-    db_trade = crud.get_trade(db, trade_id)
+@app.get("/trades/export")
+def export_trades(
+    # Declared before /trades/{trade_id} so "export" is not parsed as an id
+    format: schemas.ExportFormat = schemas.ExportFormat.csv,
+    filters: dict = Depends(params.trade_filters),
+    db: Session = Depends(database.get_read_db)
+):
+    return _export("trades", *crud.iter_trades(db, **filters), format)
+
+
+@app.get(
+    "/trades/",
+    response_model=Union[list[schemas.TradeExpandedRead], schemas.TradePage],
+    dependencies=[params.trades_etag],
+)
+def read_trades(
+    response: Response,
+    skip: int = 0, limit: int = params.LimitParam, after: Optional[str] = None,
+    sort: Optional[str] = params.SortParam,
+    filters: dict = Depends(params.trade_filters),
+    expand: set = Depends(params.trade_expand),
+    db: Session = Depends(database.get_db)
+):
+    if expand:  # nested objects go through the ORM and response_model
+        if after is not None:
+            return _cursor_page(crud.get_trades_page, db, after, limit, sort=sort, expand=expand, **filters)
+        return crud.get_trades(db, skip, limit, sort=sort, expand=expand, **filters)
+    if after is not None:
+        page = _cursor_page(crud.get_trades_page, db, after, limit, sort=sort, as_rows=True, **filters)
+    else:
+        page = crud.get_trades(db, skip, limit, sort=sort, as_rows=True, **filters)
+    return serialization.json_response(page, response)
+
+
+@app.get("/trades/{trade_id}", response_model=schemas.TradeExpandedRead, dependencies=[params.trades_etag])
+def read_trade(
+    trade_id: int, expand: set = Depends(params.trade_expand), db: Session = Depends(database.get_db)
+):
+    db_trade = crud.get_trade(db, trade_id, expand)
     if not db_trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return db_trade
@@ -118,11 +288,131 @@ def delete_trade(trade_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(status_code=404, detail="Trade not found")
     return db_trade
 
+# Import
+@app.post("/import/{entity}", response_model=schemas.ImportReport)
+def import_csv(entity: schemas.ImportEntity, file: UploadFile, db: Session = Depends(database.get_db)):
+    # The upload is decoded line by line, never read into memory as a whole
+    # Bytes that are not UTF-8 end the import with an error on that line, after the chunks before it
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return importer.import_csv(db, entity.value, lines)
+    finally:
+        lines.detach()
+
+# Search
+@app.get("/search", dependencies=[params.search_etag])
+def search(
+    response: Response,
+    q: str = Query(..., description="Fragments of a lot code, certificate, origin or counterparty name, contact or KYC note"),
+    limit: int = Query(20, ge=1, le=100), after: Optional[str] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    return serialization.json_response(_cursor_page(crud.search, db, after, limit, q=q), response)
+
 # Reports
-@app.get("/reports/inventory")
-def report_inventory(db: Session = Depends(database.get_db)):
-    return crud.get_inventory(db)
+@app.get("/reports/inventory", dependencies=[params.lots_etag])
+def report_inventory(
+    response: Response,
+    # Without `after` the whole stock is streamed as one JSON array
+    after: Optional[str] = None, limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(database.get_read_db)
+):
+    if after is not None:
+        return serialization.json_response(_cursor_page(crud.get_inventory_page, db, after, limit), response)
+    return StreamingResponse(
+        export.json_chunks(*crud.iter_inventory(db)), media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+@app.get("/reports/inventory/facets", dependencies=[params.lots_etag])
+def report_inventory_facets(
+    response: Response,
+    filters: dict = Depends(params.inventory_facet_filters),
+    db: Session = Depends(database.get_read_db)
+):
+    return serialization.json_response(crud.get_inventory_facets(db, **filters), response)
+
+@app.get("/reports/inventory/counts", dependencies=[params.lots_etag])
+def report_inventory_counts(response: Response, db: Session = Depends(database.get_read_db)):
+    return serialization.json_response(crud.get_inventory_counts(db), response)
+
+@app.get(
+    "/reports/dashboard",
+    response_model=schemas.DashboardSummary,
+    dependencies=[params.dashboard_etag],
+)
+def report_dashboard(
+    response: Response, recent: int = Query(5, ge=0, le=50), base_currency: Optional[str] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    return serialization.json_response(crud.get_dashboard(db, recent, base_currency), response)
+
+@app.get("/reports/pnl", dependencies=[params.pnl_etag])
+def report_pnl(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    currency: Optional[str] = None,
+    counterparty_id: Optional[int] = None,
+    group_by: Optional[schemas.PnlGroupBy] = None,
+    base_currency: Optional[str] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    return serialization.json_response(crud.get_pnl(
+        db, date_from, date_to, currency, counterparty_id,
+        group_by.value if group_by else None, base_currency,
+    ), response)
+
+@app.get("/reports/pnl/timeseries", dependencies=[params.pnl_etag])
+def report_pnl_timeseries(
+    response: Response,
+    bucket: schemas.PnlBucket = schemas.PnlBucket.day,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    currency: Optional[str] = None,
+    base_currency: Optional[str] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    return serialization.json_response(crud.get_pnl_timeseries(
+        db, bucket.value, date_from, date_to, currency, base_currency,
+    ), response)
+
+@app.get("/fx/rates/{currency}", response_model=schemas.FxRateRead)
+def read_fx_rate(
+    currency: str, on: Optional[date] = None, base: str = fx.FX_PIVOT,
+    db: Session = Depends(database.get_read_db)
+):
+    """Value of one unit of `currency` in `base` on day `on` (today by default), from the rate cache."""
+    on = on or date.today()
+    rate = fx.fx_cache.rate(db, currency, on, base)
+    if rate is None:
+        raise HTTPException(status_code=404, detail=f"No FX rate for {currency} in {base} on {on}")
+    return {"currency": currency, "base": base, "on": on, "rate": rate}
+
+@app.get("/reports/cache")
+def report_cache_stats():
+    """Hit, miss and eviction counters of the in-process report and identity caches."""
+    return {**report_cache.stats(), "entities": entity_cache.stats()}
+
+
+@app.get("/reports/slow-queries")
+def report_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    sort: schemas.SlowQuerySort = schemas.SlowQuerySort.total_ms,
+):
+    """Statement shapes over EMERALD_SLOW_QUERY_MS, worst first (empty while the log is off)."""
+    return {
+        "enabled": slow_log.enabled,
+        "threshold_ms": slow_log.threshold_ms,
+        "statements": slow_log.top(limit, sort.value),
+    }
+
 
-@app.get("/reports/pnl")
-def report_pnl(db: Session = Depends(database.get_db)):
-    return crud.get_pnl(db)
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Prometheus scrape endpoint. It is async so it runs on the event loop, where
+    it can read the threadpool limiter and still answer when every worker
+    thread is busy.
+    """
+    return Response(metrics.metrics.render(metrics.threadpool_gauges()), media_type=metrics.CONTENT_TYPE)
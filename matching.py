@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+I match each SALE of a lot with the earliest open PURCHASE of the same lot
+(FIFO) and store the result on the sale. roi is sale total / purchase total - 1,
+and holding_days is the number of days between the two trades. roi stays empty
+when the two trades are in different currencies. A lot with an open purchase
+is IN_STOCK, and a lot whose purchases have all been sold is SOLD. A lot left
+with no trades at all goes back to IN_STOCK.
+
+crud calls rematch_lots() inside every trade write, so the metrics and the lot
+status commit in the same transaction as the trade that changed them, and
+reads get them for free. backfill() does the same for the whole ledger, in
+chunks of lots taken in id order, each chunk in its own transaction.
+Lots whose status flips are dropped from the identity cache once the
+transaction commits.
+
+Usage:
+    python matching.py backfill --chunk-lots 5000
+"""
+
+import argparse
+import sys
+from collections import deque
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from cache import entity_cache
+from models import EmeraldLot, Trade, LotStatus, TradeType
+
+# Trade fields whose change can move a match
+MATCH_FIELDS = {"type", "date", "currency", "total_price", "emerald_lot_id"}
+# Lots per backfill transaction
+CHUNK_LOTS = 5000
+
+_COLUMNS = (
+    EmeraldLot.id, EmeraldLot.status, Trade.id, Trade.type, Trade.date,
+    Trade.currency, Trade.total_price, Trade.roi, Trade.holding_days,
+)
+
+
+def match_lot(trades):
+    """
+    FIFO-match one lot's trades, given in (date, id) order as
+    (id, type, date, currency, total_price) tuples.
+    Returns ({trade_id: (roi, holding_days)}, status); purchases get (None, None).
+    """
+    open_purchases = deque()
+    metrics, sold = {}, False
+    for trade_id, kind, day, currency, total in trades:
+        if kind == TradeType.PURCHASE:
+            open_purchases.append((day, currency, total))
+            metrics[trade_id] = (None, None)
+            continue
+        sold = True
+        if not open_purchases:  # sold before any recorded purchase
+            metrics[trade_id] = (None, None)
+            continue
+        bought_on, bought_in, cost = open_purchases.popleft()
+        roi = round(total / cost - 1, 6) if bought_in == currency and cost else None
+        metrics[trade_id] = (roi, (day - bought_on).days)
+    status = LotStatus.SOLD if sold and not open_purchases else LotStatus.IN_STOCK
+    return metrics, status
+
+
+def _lot_trades(db: Session, criterion):
+    """
+    Trades of the lots matching `criterion`, with the lot's status, in matching
+    order. A lot without trades comes back as one row whose trade columns are None.
+    """
+    return db.execute(
+        select(*_COLUMNS)
+        .select_from(EmeraldLot)
+        .outerjoin(Trade, Trade.emerald_lot_id == EmeraldLot.id)
+        .where(criterion)
+        .order_by(EmeraldLot.id, Trade.date, Trade.id)
+    ).all()
+
+
+def _apply(db: Session, rows):
+    """
+    Match the lots in `rows` and write only what changed: roi/holding_days
+    with one executemany UPDATE, flipped lot statuses with another.
+    Returns ({trade_id: (roi, holding_days)} written, [flipped lot ids]).
+    """
+    changed, flipped = {}, []
+    for lot_id, lot_rows in groupby(rows, key=itemgetter(0)):
+        lot_rows = list(lot_rows)
+        lot_status = lot_rows[0][1]
+        lot_rows = [row for row in lot_rows if row[2] is not None]
+        metrics, status = match_lot(row[2:7] for row in lot_rows)
+        for row in lot_rows:
+            if metrics[row[2]] != (row[7], row[8]):
+                changed[row[2]] = metrics[row[2]]
+        if status != lot_status:
+            flipped.append((lot_id, status))
+    if changed:
+        db.execute(update(Trade), [
+            {"id": trade_id, "roi": roi, "holding_days": days} for trade_id, (roi, days) in changed.items()
+        ])
+    if flipped:
+        db.execute(update(EmeraldLot), [{"id": lot_id, "status": status} for lot_id, status in flipped])
+        db.info.setdefault("flipped_lots", set()).update(lot_id for lot_id, _ in flipped)
+    return changed, [lot_id for lot_id, _ in flipped]
+
+
+def rematch_lots(db: Session, lot_ids):
+    """
+    Re-match `lot_ids` inside db's open transaction; the caller commits.
+    Returns {trade_id: (roi, holding_days)} for the trades whose metrics changed.
+    """
+    lot_ids = {lot_id for lot_id in lot_ids if lot_id is not None}
+    if not lot_ids:
+        return {}
+    changed, _ = _apply(db, _lot_trades(db, EmeraldLot.id.in_(lot_ids)))
+    return changed
+
+
+def backfill(db: Session, chunk_lots: int = CHUNK_LOTS):
+    """Match the whole ledger, committing every `chunk_lots` lots; returns counts."""
+    totals = {"lots": 0, "trades_updated": 0, "lots_flipped": 0}
+    last_id = 0
+    while True:
+        lot_ids = db.execute(
+            select(EmeraldLot.id).where(EmeraldLot.id > last_id).order_by(EmeraldLot.id).limit(chunk_lots)
+        ).scalars().all()
+        if not lot_ids:
+            return totals
+        changed, flipped = _apply(db, _lot_trades(db, EmeraldLot.id.between(lot_ids[0], lot_ids[-1])))
+        db.commit()
+        totals["lots"] += len(lot_ids)
+        totals["trades_updated"] += len(changed)
+        totals["lots_flipped"] += len(flipped)
+        last_id = lot_ids[-1]
+
+
+# --- Identity cache ---
+@event.listens_for(Session, "after_commit")
+def _discard_flipped(session):
+    for lot_id in session.info.pop("flipped_lots", ()):
+        entity_cache.discard(EmeraldLot.__tablename__, lot_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_flipped(session):
+    session.info.pop("flipped_lots", None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FIFO-match sales to purchases across the ledger.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--chunk-lots", type=int, default=CHUNK_LOTS)
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        totals = backfill(db, args.chunk_lots)
+    finally:
+        db.close()
+    print(f"Matched {totals['lots']} lots: {totals['trades_updated']} trades updated, "
+          f"{totals['lots_flipped']} lot statuses changed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
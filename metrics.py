@@ -0,0 +1,229 @@
+"""
+I collect request and SQL metrics in process memory and render them in the
+Prometheus text format for GET /metrics.
+MetricsMiddleware times each request under its route template (not the raw
+path, so ids do not blow up the label set) and counts status codes and
+requests in flight. Cursor events on every Engine count queries and database
+time, both in total and against the request that issued them. The per-request
+tally reaches threadpool workers through a ContextVar, which the threadpool
+copies into each call. Recording costs two perf_counter() calls and one short
+lock per request and per query.
+Like the caches, the numbers are per worker process.
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED = "unmatched"
+
+# [queries, db seconds] and ASGI scope of the request being served, if any
+_request = ContextVar("metrics_request", default=None)
+_scope = ContextVar("metrics_scope", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Bucketed observations per label tuple, rendered cumulatively."""
+
+    def __init__(self, name: str, help: str, label_names, buckets):
+        self.name, self.help, self.label_names = name, help, tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float):
+        """Record `value`; callers hold the registry lock."""
+        row = self.series.get(labels)
+        if row is None:
+            row = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        bounds = self.buckets + (float("inf"),)
+        for labels, row in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, row):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(row[-1])}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+class Metrics:
+    """The process-wide request and query counters behind /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.in_flight = 0
+            self.requests = {}  # (method, route, status) -> count
+            self.latency = Histogram(
+                "emerald_http_request_duration_seconds",
+                "Time from request start to the last body chunk.",
+                ("method", "route"), LATENCY_BUCKETS,
+            )
+            self.request_queries = Histogram(
+                "emerald_http_request_db_queries",
+                "SQL statements executed per request.",
+                ("method", "route"), QUERY_BUCKETS,
+            )
+            self.request_db_time = Histogram(
+                "emerald_http_request_db_seconds",
+                "Time spent in SQL statements per request.",
+                ("method", "route"), LATENCY_BUCKETS,
+            )
+            self.queries = 0
+            self.db_seconds = 0.0
+
+    def start_request(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish_request(self, method: str, route: str, status: int, elapsed: float, tally):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.observe(key, elapsed)
+            self.request_queries.observe(key, tally[0])
+            self.request_db_time.observe(key, tally[1])
+
+    def record_query(self, elapsed: float):
+        tally = _request.get()
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += elapsed
+            if tally is not None:
+                tally[0] += 1
+                tally[1] += elapsed
+
+    def render(self, gauges: dict = None) -> str:
+        """
+        The exposition text. `gauges` adds point-in-time values read by the
+        caller, as {name: (help, value)}.
+        """
+        with self._lock:
+            lines = [
+                "# HELP emerald_http_requests_total Requests served, by route and status code.",
+                "# TYPE emerald_http_requests_total counter",
+            ]
+            for labels, count in sorted(self.requests.items()):
+                lines.append(f"emerald_http_requests_total{_labels(('method', 'route', 'status'), labels)} {count}")
+            lines += [
+                "# HELP emerald_http_requests_in_flight Requests currently being served.",
+                "# TYPE emerald_http_requests_in_flight gauge",
+                f"emerald_http_requests_in_flight {self.in_flight}",
+                "# HELP emerald_db_queries_total SQL statements executed by this process.",
+                "# TYPE emerald_db_queries_total counter",
+                f"emerald_db_queries_total {self.queries}",
+                "# HELP emerald_db_query_seconds_total Time spent in SQL statements.",
+                "# TYPE emerald_db_query_seconds_total counter",
+                f"emerald_db_query_seconds_total {_number(self.db_seconds)}",
+            ]
+            for histogram in (self.latency, self.request_queries, self.request_db_time):
+                lines.extend(histogram.render())
+        for name, (help, value) in (gauges or {}).items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def _route(scope):
+    """Template of the matched route, e.g. /trades/{trade_id}."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED
+
+
+def current_route():
+    """Method and route template of the request being served, e.g. "GET /trades/{trade_id}"."""
+    scope = _scope.get()
+    return f"{scope['method']} {_route(scope)}" if scope is not None else None
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request through its last body chunk."""
+
+    def __init__(self, app, registry: Metrics = None):
+        self.app = app
+        self.metrics = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500  # unless the app starts a response
+
+        async def send_and_record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        tally = [0, 0.0]
+        token, scope_token = _request.set(tally), _scope.set(scope)
+        self.metrics.start_request()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request.reset(token)
+            _scope.reset(scope_token)
+            self.metrics.finish_request(scope["method"], _route(scope), status, elapsed, tally)
+
+
+def threadpool_gauges():
+    """Usage of the threadpool that runs sync routes; call from the event loop."""
+    from anyio.to_thread import current_default_thread_limiter
+
+    stats = current_default_thread_limiter().statistics()
+    return {
+        "emerald_threadpool_threads_busy": ("Worker threads running sync handlers.", stats.borrowed_tokens),
+        "emerald_threadpool_threads_max": ("Size of the worker threadpool.", stats.total_tokens),
+        "emerald_threadpool_tasks_waiting": ("Calls queued for a free worker thread.", stats.tasks_waiting),
+    }
+
+
+# Every engine (sync, read-only and the engines behind AsyncSession) reports here
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("metrics_query_started", None)
+    if started is not None:
+        metrics.record_query(time.perf_counter() - started)
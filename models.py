@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Enum, Text, Index, DDL, event
 from sqlalchemy.orm import relationship, declarative_base
 import enum
 
@@ -24,18 +24,23 @@ class EmeraldLot(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     lot_code = Column(String, unique=True, index=True, nullable=False)
-    carat = Column(Float, nullable=False)
+    carat = Column(Float, nullable=False, index=True)
     shape = Column(String)
-    color_grade = Column(String)
+    color_grade = Column(String, index=True)
     clarity = Column(String)
     treatment = Column(String)
-    origin = Column(String)
+    origin = Column(String, index=True)
     certificate_id = Column(String, nullable=True)
-    status = Column(Enum(LotStatus), default=LotStatus.IN_STOCK)
+    status = Column(Enum(LotStatus), default=LotStatus.IN_STOCK, index=True)
 
     # Relationships
     trades = relationship("Trade", back_populates="emerald_lot")
 
+    __table_args__ = (
+        # Covers the grouped pass behind /reports/inventory/facets
+        Index("ix_emerald_lots_facets", "status", "origin", "color_grade", "clarity", "treatment", "shape", "carat"),
+    )
+
 
 class Counterparty(Base):
     __tablename__ = "counterparties"
@@ -53,6 +58,12 @@ class Counterparty(Base):
 
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        # Keyset pagination walks trades in (date, id) order
+        Index("ix_trades_date_id", "date", "id"),
+        # List filters and reports split by type, then narrow by date range
+        Index("ix_trades_type_date", "type", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     type = Column(Enum(TradeType), nullable=False)  # PURCHASE or SALE
@@ -67,9 +78,188 @@ class Trade(Base):
     holding_days = Column(Integer, nullable=True)
 
     # Foreign keys
-    emerald_lot_id = Column(Integer, ForeignKey("emerald_lots.id"), nullable=False)
-    counterparty_id = Column(Integer, ForeignKey("counterparties.id"), nullable=False)
+    emerald_lot_id = Column(Integer, ForeignKey("emerald_lots.id"), nullable=False, index=True)
+    counterparty_id = Column(Integer, ForeignKey("counterparties.id"), nullable=False, index=True)
 
     # Relationships
     emerald_lot = relationship("EmeraldLot", back_populates="trades")
     counterparty = relationship("Counterparty", back_populates="trades")
+
+
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+    __table_args__ = (
+        # One rate per currency and day; also the as-of lookup path (latest date <= d)
+        Index("ux_fx_rates_currency_date", "currency", "date", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False)
+    currency = Column(String, nullable=False)
+    rate = Column(Float, nullable=False)  # value of one unit of `currency` in fx.FX_PIVOT
+
+
+# --- Rollups ---
+# Summary tables kept current by SQLite triggers, so every write path (ORM, bulk
+# inserts, raw SQL) updates them in the same transaction as the base row.
+class PnlDaily(Base):
+    __tablename__ = "pnl_daily"
+    __table_args__ = (
+        # Date-range scans across currencies (time series); covers the summed column
+        Index("ix_pnl_daily_date_type", "date", "type", "currency", "total_price"),
+    )
+
+    currency = Column(String, primary_key=True)
+    type = Column(Enum(TradeType), primary_key=True)
+    date = Column(Date, primary_key=True)
+    trade_count = Column(Integer, nullable=False, default=0)
+    total_price = Column(Float, nullable=False, default=0.0)
+
+
+class LotStatusCount(Base):
+    __tablename__ = "lot_status_counts"
+
+    status = Column(Enum(LotStatus), primary_key=True)
+    lot_count = Column(Integer, nullable=False, default=0)
+    total_carat = Column(Float, nullable=False, default=0.0)
+
+
+# Rollup tables are created after the tables they summarize, so their triggers
+# and initial contents can be set up from the base rows.
+PnlDaily.__table__.add_is_dependent_on(Trade.__table__)
+LotStatusCount.__table__.add_is_dependent_on(EmeraldLot.__table__)
+
+PNL_DAILY_REBUILD = """
+INSERT INTO pnl_daily (currency, type, date, trade_count, total_price)
+SELECT currency, type, date, COUNT(*), SUM(total_price) FROM trades
+GROUP BY currency, type, date
+"""
+
+LOT_STATUS_REBUILD = """
+INSERT INTO lot_status_counts (status, lot_count, total_carat)
+SELECT status, COUNT(*), SUM(carat) FROM emerald_lots
+WHERE status IS NOT NULL GROUP BY status
+"""
+
+_PNL_ADD = """
+    INSERT INTO pnl_daily (currency, type, date, trade_count, total_price)
+    VALUES (NEW.currency, NEW.type, NEW.date, 1, NEW.total_price)
+    ON CONFLICT (currency, type, date) DO UPDATE SET
+        trade_count = trade_count + 1,
+        total_price = total_price + excluded.total_price;
+"""
+
+_PNL_REMOVE = """
+    UPDATE pnl_daily SET trade_count = trade_count - 1, total_price = total_price - OLD.total_price
+    WHERE currency = OLD.currency AND type = OLD.type AND date = OLD.date;
+    DELETE FROM pnl_daily
+    WHERE currency = OLD.currency AND type = OLD.type AND date = OLD.date AND trade_count <= 0;
+"""
+
+_LOT_ADD = """
+    INSERT INTO lot_status_counts (status, lot_count, total_carat)
+    SELECT NEW.status, 1, NEW.carat WHERE NEW.status IS NOT NULL
+    ON CONFLICT (status) DO UPDATE SET
+        lot_count = lot_count + 1,
+        total_carat = total_carat + excluded.total_carat;
+"""
+
+_LOT_REMOVE = """
+    UPDATE lot_status_counts SET lot_count = lot_count - 1, total_carat = total_carat - OLD.carat
+    WHERE status = OLD.status;
+    DELETE FROM lot_status_counts WHERE status = OLD.status AND lot_count <= 0;
+"""
+
+ROLLUP_TRIGGERS = {
+    "pnl_daily": [
+        f"CREATE TRIGGER IF NOT EXISTS trades_rollup_ai AFTER INSERT ON trades BEGIN {_PNL_ADD} END",
+        f"CREATE TRIGGER IF NOT EXISTS trades_rollup_ad AFTER DELETE ON trades BEGIN {_PNL_REMOVE} END",
+        "CREATE TRIGGER IF NOT EXISTS trades_rollup_au "
+        f"AFTER UPDATE OF currency, type, date, total_price ON trades BEGIN {_PNL_REMOVE} {_PNL_ADD} END",
+    ],
+    "lot_status_counts": [
+        f"CREATE TRIGGER IF NOT EXISTS emerald_lots_rollup_ai AFTER INSERT ON emerald_lots BEGIN {_LOT_ADD} END",
+        f"CREATE TRIGGER IF NOT EXISTS emerald_lots_rollup_ad AFTER DELETE ON emerald_lots BEGIN {_LOT_REMOVE} END",
+        "CREATE TRIGGER IF NOT EXISTS emerald_lots_rollup_au "
+        f"AFTER UPDATE OF status, carat ON emerald_lots BEGIN {_LOT_REMOVE} {_LOT_ADD} END",
+    ],
+}
+
+for _table, _rebuild in ((PnlDaily.__table__, PNL_DAILY_REBUILD), (LotStatusCount.__table__, LOT_STATUS_REBUILD)):
+    event.listen(_table, "after_create", DDL(_rebuild).execute_if(dialect="sqlite"))
+    for _trigger in ROLLUP_TRIGGERS[_table.name]:
+        event.listen(_table, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
+
+
+# --- Full-text search ---
+# External-content FTS5 tables over the searchable text columns: the index keeps
+# no second copy of the text, and the trigram tokenizer matches any fragment of
+# three or more characters, case-insensitively. Each table gets an index over
+# all its columns and one over its natural key alone, so "is it in the key?"
+# never scans the postings of the other columns. Triggers keep both in step
+# with every write path, like the rollups.
+SEARCH_COLUMNS = {
+    "emerald_lots": ("lot_code", "certificate_id", "origin"),
+    "counterparties": ("name", "contact_info", "kyc_notes"),
+}
+
+
+def search_tables(table_name: str):
+    """Names of the FTS5 tables of `table_name` with their columns: all columns, then the key."""
+    columns = SEARCH_COLUMNS[table_name]
+    return {f"{table_name}_fts": columns, f"{table_name}_key_fts": columns[:1]}
+
+
+def _search_triggers(table_name: str):
+    add, remove = [], []
+    for fts, columns in search_tables(table_name).items():
+        listed = ", ".join(columns)
+        add.append(f"INSERT INTO {fts} (rowid, {listed}) "
+                   f"VALUES (NEW.id, {', '.join(f'NEW.{column}' for column in columns)});")
+        remove.append(f"INSERT INTO {fts} ({fts}, rowid, {listed}) "
+                      f"VALUES ('delete', OLD.id, {', '.join(f'OLD.{column}' for column in columns)});")
+    add, remove = " ".join(add), " ".join(remove)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_search_ai AFTER INSERT ON {table_name} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_search_ad AFTER DELETE ON {table_name} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_search_au "
+        f"AFTER UPDATE OF {', '.join(SEARCH_COLUMNS[table_name])} ON {table_name} BEGIN {remove} {add} END",
+    ]
+
+
+SEARCH_TRIGGERS = {table_name: _search_triggers(table_name) for table_name in SEARCH_COLUMNS}
+
+
+def search_rebuild(table_name: str):
+    """Statements re-indexing every row of `table_name` from scratch."""
+    return [f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')" for fts in search_tables(table_name)]
+
+
+def create_search_index(table, connection, **kw):
+    """Create the FTS5 tables and triggers of `table` if missing, indexing the rows it already has."""
+    if connection.dialect.name != "sqlite":
+        return
+    for fts, columns in search_tables(table.name).items():
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+        ).first()
+        if exists is None:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(columns)}, "
+                f"content='{table.name}', content_rowid='id', tokenize='trigram')"
+            )
+            connection.exec_driver_sql(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    for trigger in SEARCH_TRIGGERS[table.name]:
+        connection.exec_driver_sql(trigger)
+
+
+def drop_search_index(table, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for fts in search_tables(table.name):
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts}")
+
+
+SEARCHABLE_TABLES = (EmeraldLot.__table__, Counterparty.__table__)
+for _table in SEARCHABLE_TABLES:
+    event.listen(_table, "after_create", create_search_index)
+    event.listen(_table, "after_drop", drop_search_index)
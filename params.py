@@ -0,0 +1,84 @@
+"""
+I collect the query parameters shared by several routes (sync and async list
+endpoints, exports) as FastAPI dependencies, so each filter is declared once.
+Each dependency returns only the filters that were actually given, ready to be
+passed to the crud functions as keyword arguments.
+"""
+
+from datetime import date
+from typing import Optional
+
+from fastapi import Depends, Query, Request, Response
+
+import versioning
+from models import LotStatus, TradeType
+
+
+def _given(**filters):
+    return {name: value for name, value in filters.items() if value is not None}
+
+
+def emerald_filters(
+    status: Optional[LotStatus] = None,
+    origin: Optional[str] = None,
+    color_grade: Optional[str] = None,
+    carat_min: Optional[float] = None,
+    carat_max: Optional[float] = None,
+):
+    return _given(status=status, origin=origin, color_grade=color_grade,
+                  carat_min=carat_min, carat_max=carat_max)
+
+
+def inventory_facet_filters(
+    origin: Optional[list[str]] = Query(None),
+    color_grade: Optional[list[str]] = Query(None),
+    clarity: Optional[list[str]] = Query(None),
+    treatment: Optional[list[str]] = Query(None),
+    shape: Optional[list[str]] = Query(None),
+):
+    """Drill-down values per facet; repeat a parameter to select several values."""
+    return _given(origin=origin, color_grade=color_grade, clarity=clarity, treatment=treatment, shape=shape)
+
+
+def trade_filters(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    trade_type: Optional[TradeType] = Query(None, alias="type"),
+    currency: Optional[str] = None,
+    counterparty_id: Optional[int] = None,
+    emerald_lot_id: Optional[int] = None,
+):
+    return _given(date_from=date_from, date_to=date_to, trade_type=trade_type, currency=currency,
+                  counterparty_id=counterparty_id, emerald_lot_id=emerald_lot_id)
+
+
+def trade_expand(
+    expand: Optional[str] = Query(None, description="Comma-separated relationships to inline: emerald_lot, counterparty"),
+):
+    """The ?expand= names as a set; crud rejects unknown ones."""
+    return {name.strip() for name in (expand or "").split(",") if name.strip()}
+
+
+# "carat" sorts ascending, "-carat" descending; crud checks the key against its whitelist
+SortParam = Query(None, description="Sort key, prefixed with '-' for descending order")
+# Page size of the list routes; crud caps cursor pages at MAX_PAGE_SIZE, offset pages are uncapped
+LimitParam = Query(100, ge=1)
+
+
+# Tables whose rows ?expand= inlines into a trade
+EXPAND_TABLES = {"emerald_lot": "emerald_lots", "counterparty": "counterparties"}
+
+
+def _trades_conditional_get(request: Request, response: Response, expand: set = Depends(trade_expand)):
+    """conditional_get("trades") plus the tables of the expanded relationships."""
+    expanded = sorted(EXPAND_TABLES[name] for name in expand if name in EXPAND_TABLES)
+    versioning.check_etag(request, response, ("trades", *expanded))
+
+
+# Conditional-GET guards (ETag / If-None-Match), named after the tables a route reads
+lots_etag = Depends(versioning.conditional_get("emerald_lots"))
+counterparties_etag = Depends(versioning.conditional_get("counterparties"))
+trades_etag = Depends(_trades_conditional_get)
+pnl_etag = Depends(versioning.conditional_get("trades", "fx_rates"))
+search_etag = Depends(versioning.conditional_get("emerald_lots", "counterparties"))
+dashboard_etag = Depends(versioning.conditional_get("emerald_lots", "counterparties", "trades", "fx_rates"))
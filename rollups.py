@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+I keep the P&L and inventory rollup tables honest.
+The tables are maintained incrementally by triggers declared in models.py;
+this module recomputes them from scratch and checks them against the raw rows.
+
+Usage:
+    python rollups.py rebuild   # recompute, then verify
+    python rollups.py verify    # only compare rollups with trades / emerald_lots
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from models import (
+    EmeraldLot, Trade, PnlDaily, LotStatusCount, PNL_DAILY_REBUILD, LOT_STATUS_REBUILD,
+)
+
+# Sums are maintained by repeated float additions, so allow for rounding drift
+TOLERANCE = 1e-6
+
+
+def rebuild_rollups(db: Session):
+    """Recompute both rollup tables from the base tables in one transaction."""
+    db.query(PnlDaily).delete(synchronize_session=False)
+    db.query(LotStatusCount).delete(synchronize_session=False)
+    db.execute(text(PNL_DAILY_REBUILD))
+    db.execute(text(LOT_STATUS_REBUILD))
+    db.commit()
+
+
+def _compare(label, expected: dict, actual: dict):
+    problems = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want, got = expected.get(key), actual.get(key)
+        if want is None or got is None or want[0] != got[0] or abs(want[1] - got[1]) > TOLERANCE:
+            problems.append(f"{label} {key}: expected {want}, found {got}")
+    return problems
+
+
+def verify_rollups(db: Session):
+    """Return a list of human-readable mismatches (empty when the rollups are correct)."""
+    pnl_expected = {
+        (c, t, d): (n, total)
+        for c, t, d, n, total in db.query(
+            Trade.currency, Trade.type, Trade.date, func.count(), func.sum(Trade.total_price)
+        ).group_by(Trade.currency, Trade.type, Trade.date)
+    }
+    pnl_actual = {
+        (r.currency, r.type, r.date): (r.trade_count, r.total_price) for r in db.query(PnlDaily)
+    }
+    lots_expected = {
+        status: (n, carat)
+        for status, n, carat in db.query(
+            EmeraldLot.status, func.count(), func.sum(EmeraldLot.carat)
+        ).filter(EmeraldLot.status.isnot(None)).group_by(EmeraldLot.status)
+    }
+    lots_actual = {r.status: (r.lot_count, r.total_carat) for r in db.query(LotStatusCount)}
+    return _compare("pnl_daily", pnl_expected, pnl_actual) + _compare(
+        "lot_status_counts", lots_expected, lots_actual
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild or verify the reporting rollups.")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rebuild_rollups(db)
+            print("Rollups rebuilt.")
+        problems = verify_rollups(db)
+    finally:
+        db.close()
+
+    for problem in problems:
+        print(problem)
+    print("Rollups OK." if not problems else f"{len(problems)} rollup mismatch(es).")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,11 @@ I use model_config with from_attributes for Pydantic v2 (replaces orm_mode).
 I created separate schemas for Create and Update to support partial updates.
 """
 
-from pydantic import BaseModel
+import enum
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import inspect
 from typing import Optional
+import datetime
 from datetime import date
 from models import LotStatus, CounterpartyType, TradeType
 
@@ -29,6 +32,11 @@ class EmeraldLotRead(EmeraldLotBase):
     model_config = {"from_attributes": True}
 
 
+class EmeraldLotPage(BaseModel):  # cursor mode of GET /emeralds/
+    items: list[EmeraldLotRead]
+    next_cursor: Optional[str] = None
+
+
 # --- Counterparty ---
 class CounterpartyBase(BaseModel):
     name: str
@@ -53,6 +61,11 @@ class CounterpartyRead(CounterpartyBase):
     model_config = {"from_attributes": True}
 
 
+class CounterpartyPage(BaseModel):  # cursor mode of GET /counterparties/
+    items: list[CounterpartyRead]
+    next_cursor: Optional[str] = None
+
+
 # --- Trade ---
 class TradeBase(BaseModel):
     type: TradeType
@@ -71,7 +84,7 @@ class TradeCreate(TradeBase):
 
 class TradeUpdate(BaseModel):  # allow partial updates
     type: Optional[TradeType] = None
-    date: Optional[date] = None
+    date: Optional[datetime.date] = None  # the field name shadows `date` inside the class body
     currency: Optional[str] = None
     unit_price: Optional[float] = None
     total_price: Optional[float] = None
@@ -85,3 +98,126 @@ class TradeRead(TradeBase):
     roi: Optional[float] = None
     holding_days: Optional[int] = None
     model_config = {"from_attributes": True}
+
+
+class TradeExpandedRead(TradeRead):  # GET /trades/ and /trades/{id}, with ?expand=
+    # Left out of the JSON unless expanded, so plain responses keep their shape
+    emerald_lot: Optional[EmeraldLotRead] = Field(None, exclude_if=lambda value: value is None)
+    counterparty: Optional[CounterpartyRead] = Field(None, exclude_if=lambda value: value is None)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _loaded_relationships_only(cls, data):
+        """From an ORM row, read relationships only if they were eager-loaded."""
+        state = inspect(data, raiseerr=False)
+        if state is None or not hasattr(state, "unloaded"):
+            return data
+        skipped = state.unloaded.intersection(state.mapper.relationships.keys())
+        return {name: getattr(data, name) for name in cls.model_fields if name not in skipped}
+
+
+class TradePage(BaseModel):  # cursor mode of GET /trades/
+    items: list[TradeExpandedRead]
+    next_cursor: Optional[str] = None
+
+
+# --- FX rates ---
+class FxRateCreate(BaseModel):
+    date: date
+    currency: str
+    rate: float = Field(gt=0)  # value of one unit of `currency` in fx.FX_PIVOT
+
+
+class FxRateRead(BaseModel):
+    currency: str
+    base: str
+    on: date
+    rate: float
+
+
+# --- Bulk writes ---
+class BulkMode(str, enum.Enum):
+    atomic = "atomic"    # all-or-nothing: any bad row rejects the batch
+    partial = "partial"  # insert the good rows, report the bad ones
+
+
+class BulkRowError(BaseModel):
+    index: int
+    errors: list[str]
+
+
+class BulkResult(BaseModel):
+    created_ids: list[int]
+    errors: list[BulkRowError] = []
+
+
+# --- Import ---
+class ImportEntity(str, enum.Enum):
+    emeralds = "emeralds"
+    counterparties = "counterparties"
+    trades = "trades"
+    fx_rates = "fx_rates"
+
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: list[str]
+
+
+class ImportReport(BaseModel):
+    rows: int
+    created: int
+    error_count: int
+    errors: list[ImportRowError] = []
+
+
+# --- Export ---
+class ExportFormat(str, enum.Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+# --- Reports ---
+class PnlGroupBy(str, enum.Enum):
+    currency = "currency"
+    counterparty = "counterparty"
+    lot = "lot"
+    month = "month"
+
+
+class PnlBucket(str, enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class SlowQuerySort(str, enum.Enum):
+    total_ms = "total_ms"
+    max_ms = "max_ms"
+    count = "count"
+
+
+class StatusCount(BaseModel):
+    lot_count: int
+    total_carat: float
+
+
+class TradeTotal(BaseModel):
+    type: TradeType
+    currency: str
+    trade_count: int
+    total_price: float
+
+
+class PnlTotals(BaseModel):
+    total_cost: float
+    total_revenue: float
+    profit: float
+
+
+class DashboardSummary(BaseModel):
+    lots_by_status: dict[LotStatus, StatusCount]
+    counterparties_by_type: dict[CounterpartyType, int]
+    trades: list[TradeTotal]
+    pnl: PnlTotals
+    recent_trades: list[TradeRead]
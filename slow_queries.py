@@ -0,0 +1,162 @@
+"""
+I log SQL statements that take longer than EMERALD_SLOW_QUERY_MS milliseconds.
+I am off unless that variable is set. Each slow statement is logged with its
+parameters, its timing, the route and crud function that issued it and, on
+SQLite, its EXPLAIN QUERY PLAN. I also group statements by shape (the SQL with
+literals and IN-list lengths folded away), so GET /reports/slow-queries can
+rank the worst offenders by total time, worst case or frequency.
+Fast statements cost one perf_counter() call on each side; the stack walk and
+the EXPLAIN only run once a statement is already over the threshold.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+
+import metrics
+
+logger = logging.getLogger("emerald.slow_queries")
+
+# Modules whose functions are reported as the caller of a statement
+CALLER_MODULES = ("crud", "importer", "rollups")
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+MAX_PARAMETERS_CHARS = 500
+
+_SPACES = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\?(?:, \?)+\)")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with whitespace collapsed, literals as ? and (?, ?, ...) lists folded."""
+    shape = _LITERALS.sub("?", _SPACES.sub(" ", statement).strip())
+    return _IN_LISTS.sub("(?, ...)", shape)
+
+
+def _caller():
+    """Innermost public function of CALLER_MODULES on the stack, e.g. crud.get_pnl."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__")
+        if module in CALLER_MODULES and not frame.f_code.co_name.startswith("_"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def explain(conn, statement: str, parameters):
+    """EXPLAIN QUERY PLAN as indented lines, or None where it does not apply."""
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        rows = cursor.fetchall()
+    except Exception:
+        return None  # the plan is a bonus; never fail the query over it
+    finally:
+        cursor.close()
+    depth, lines = {0: -1}, []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    """Slow statements aggregated by shape, bounded to `max_shapes` entries."""
+
+    def __init__(self, threshold_ms: float = 0.0, max_shapes: int = 500):
+        self.threshold_ms = threshold_ms
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._watched = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def watch(self, engine):
+        """Time every statement on `engine` (a sync Engine) against the threshold."""
+        def started(conn, cursor, statement, parameters, context, executemany):
+            conn.info["slow_query_started"] = time.perf_counter()
+
+        def finished(conn, cursor, statement, parameters, context, executemany):
+            began = conn.info.pop("slow_query_started", None)
+            if began is None:
+                return
+            elapsed_ms = (time.perf_counter() - began) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self.record(conn, statement, parameters, executemany, elapsed_ms)
+
+        event.listen(engine, "before_cursor_execute", started)
+        event.listen(engine, "after_cursor_execute", finished)
+        self._watched[engine] = (started, finished)
+        return engine
+
+    def unwatch(self, engine):
+        started, finished = self._watched.pop(engine)
+        event.remove(engine, "before_cursor_execute", started)
+        event.remove(engine, "after_cursor_execute", finished)
+
+    def record(self, conn, statement: str, parameters, executemany: bool, elapsed_ms: float):
+        """Log one slow statement and fold it into its shape's totals."""
+        shape = statement_shape(statement)
+        route, caller = metrics.current_route(), _caller()
+        params = parameters[0] if executemany and parameters else parameters
+        with self._lock:
+            entry = self._shapes.get(shape)
+            needs_plan = entry is None or elapsed_ms > entry["max_ms"]
+        plan = explain(conn, statement, params) if needs_plan else None
+        logger.warning(
+            "slow query %.1f ms (%s, %s): %s parameters=%s%s",
+            elapsed_ms, route or "no route", caller or "unknown caller", shape,
+            repr(parameters)[:MAX_PARAMETERS_CHARS],
+            "".join(f"\n    {line}" for line in plan or ()),
+        )
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    del self._shapes[min(self._shapes, key=lambda key: self._shapes[key]["total_ms"])]
+                entry = self._shapes[shape] = {
+                    "statement": shape, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "routes": {}, "callers": {}, "plan": None, "slowest": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            if route:
+                entry["routes"][route] = entry["routes"].get(route, 0) + 1
+            if caller:
+                entry["callers"][caller] = entry["callers"].get(caller, 0) + 1
+            if elapsed_ms > entry["max_ms"]:
+                entry["max_ms"] = elapsed_ms
+                entry["slowest"] = {
+                    "ms": round(elapsed_ms, 3), "route": route, "caller": caller,
+                    "parameters": repr(parameters)[:MAX_PARAMETERS_CHARS],
+                }
+                entry["plan"] = plan or entry["plan"]
+
+    def top(self, limit: int = 20, sort: str = "total_ms"):
+        """Shapes ranked by `sort` (total_ms, max_ms or count), worst first."""
+        with self._lock:
+            entries = sorted(self._shapes.values(), key=lambda entry: entry[sort], reverse=True)[:limit]
+            return [
+                {**entry, "total_ms": round(entry["total_ms"], 3), "max_ms": round(entry["max_ms"], 3),
+                 "mean_ms": round(entry["total_ms"] / entry["count"], 3),
+                 "routes": dict(entry["routes"]), "callers": dict(entry["callers"])}
+                for entry in entries
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+slow_log = SlowQueryLog(threshold_ms=float(os.getenv("EMERALD_SLOW_QUERY_MS", "0")))
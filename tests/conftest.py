@@ -5,12 +5,14 @@ I override the database dependency to inject the test database.
 """
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
-from database import get_db, Base
+from cache import report_cache, entity_cache
+from fx import fx_cache
+from database import get_db, get_read_db, Base
 from models import EmeraldLot, Counterparty, Trade, LotStatus, CounterpartyType, TradeType
 from schemas import EmeraldLotCreate, CounterpartyCreate, TradeCreate
 from datetime import date
@@ -30,6 +32,9 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database for each test."""
+    report_cache.clear()  # ids are reused across tests, so cached results would leak
+    entity_cache.clear()
+    fx_cache.clear()
     Base.metadata.create_all(bind=engine)
     session = TestingSessionLocal()
     try:
@@ -49,11 +54,22 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def statements():
+    """Collect the SQL statements sent to the test database."""
+    seen = []
+    listener = lambda conn, cursor, statement, *args: seen.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield seen
+    event.remove(engine, "before_cursor_execute", listener)
+
+
 @pytest.fixture
 def sample_emerald_data():
     """Sample emerald data for testing."""
@@ -97,6 +113,22 @@ def sample_trade_data():
     }
 
 
+@pytest.fixture
+def make_trade():
+    """Factory for TradeCreate payloads with unit and total price equal, dated in 2024."""
+    def make(lot_id, cp_id, trade_type=TradeType.PURCHASE, day=1, currency="USD", total=100.0, month=1):
+        return TradeCreate(
+            type=trade_type,
+            date=date(2024, month, day),
+            currency=currency,
+            unit_price=total,
+            total_price=total,
+            emerald_lot_id=lot_id,
+            counterparty_id=cp_id
+        )
+    return make
+
+
 @pytest.fixture
 def sample_emerald(db_session, sample_emerald_data):
     """Create a sample emerald in the database."""
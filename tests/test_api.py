@@ -1,6 +1,7 @@
 """
 Unit tests for API endpoints.
 """
+import json
 import pytest
 from fastapi.testclient import TestClient
 from datetime import date
@@ -89,6 +90,16 @@ class TestEmeraldEndpoints:
         assert data["lot_code"] == "EM001_UPDATED"
         assert data["carat"] == 3.0
         assert data["shape"] == "Oval"
+    
+    def test_get_emerald_reflects_update_and_delete(self, client, sample_emerald):
+        """Test single-lot reads through the identity cache stay current."""
+        assert client.get(f"/emeralds/{sample_emerald.id}").json()["carat"] == 2.5
+        
+        client.put(f"/emeralds/{sample_emerald.id}", json={"lot_code": "EM001", "carat": 3.0})
+        assert client.get(f"/emeralds/{sample_emerald.id}").json()["carat"] == 3.0
+        
+        client.delete(f"/emeralds/{sample_emerald.id}")
+        assert client.get(f"/emeralds/{sample_emerald.id}").status_code == 404
 
 
 class TestCounterpartyEndpoints:
@@ -142,6 +153,14 @@ class TestCounterpartyEndpoints:
         assert response.status_code == 200
         data = response.json()
         assert "message" in data or "id" in data
+    
+    def test_get_counterparty(self, client, sample_counterparty):
+        """Test fetching a single counterparty, and 404 for unknown IDs."""
+        response = client.get(f"/counterparties/{sample_counterparty.id}")
+        
+        assert response.status_code == 200
+        assert response.json()["name"] == "Test Supplier"
+        assert client.get("/counterparties/999").status_code == 404
 
 
 class TestTradeEndpoints:
@@ -234,6 +253,277 @@ class TestTradeEndpoints:
         assert "Trade not found" in response.json()["detail"]
 
 
+class TestSingleStatementWrites:
+    """Test that updates and deletes are one RETURNING statement with unchanged semantics."""
+    
+    def test_update_is_one_statement(self, client, sample_trade, statements):
+        """Test that PUT /trades/{id} issues a single UPDATE ... RETURNING."""
+        response = client.put(f"/trades/{sample_trade.id}", json={"location": "Vault 7"})
+        
+        assert response.status_code == 200
+        assert response.json()["location"] == "Vault 7"
+        trade_statements = [s for s in statements if "trades" in s.split("RETURNING")[0]]
+        assert len(trade_statements) == 1
+        assert trade_statements[0].startswith("UPDATE trades SET location=")
+        assert "RETURNING" in trade_statements[0]
+    
+    def test_partial_update_keeps_unset_fields(self, client, sample_trade):
+        """Test that only the fields sent are written, including explicit nulls."""
+        response = client.put(f"/trades/{sample_trade.id}", json={"location": None})
+        
+        data = response.json()
+        assert data["location"] is None
+        assert data["total_price"] == 2500.0
+        assert data["currency"] == "USD"
+    
+    def test_empty_update_returns_row(self, client, sample_trade):
+        """Test that an update with no fields answers with the current row."""
+        response = client.put(f"/trades/{sample_trade.id}", json={})
+        
+        assert response.status_code == 200
+        assert response.json()["id"] == sample_trade.id
+        assert client.put("/trades/999", json={}).status_code == 404
+    
+    def test_update_not_found(self, client):
+        """Test 404s for updates of unknown lots and counterparties."""
+        lot = client.put("/emeralds/999", json={"lot_code": "EM999", "carat": 1.0})
+        counterparty = client.put("/counterparties/999", json={"name": "Nobody"})
+        
+        assert lot.status_code == 404
+        assert counterparty.status_code == 404
+    
+    def test_delete_returns_deleted_row(self, client, sample_counterparty):
+        """Test that the deleted row is returned and a second delete is a 404."""
+        response = client.delete(f"/counterparties/{sample_counterparty.id}")
+        
+        assert response.json()["id"] == sample_counterparty.id
+        assert client.delete(f"/counterparties/{sample_counterparty.id}").status_code == 404
+
+
+class TestTradeExpansion:
+    """Test ?expand= on trade reads."""
+    
+    def _add_trades(self, client, start, stop):
+        """Add one trade per new counterparty against lot 1."""
+        for i in range(start, stop):
+            cp = client.post("/counterparties/", json={"name": f"CP{i}", "type": "BUYER"}).json()
+            client.post("/trades/", json={
+                "type": "SALE", "date": "2024-01-15", "currency": "USD", "unit_price": 1.0,
+                "total_price": 1.0, "emerald_lot_id": 1, "counterparty_id": cp["id"]
+            })
+    
+    def test_plain_response_unchanged(self, client, sample_trade):
+        """Test that trades without expand carry no nested objects."""
+        data = client.get("/trades/").json()
+        
+        assert "emerald_lot" not in data[0]
+        assert "counterparty" not in data[0]
+    
+    def test_expand_list_and_single(self, client, sample_trade):
+        """Test nested lot and counterparty objects on list and single reads."""
+        data = client.get("/trades/?expand=emerald_lot,counterparty").json()
+        assert data[0]["emerald_lot"]["lot_code"] == "EM001"
+        assert data[0]["counterparty"]["name"] == "Test Supplier"
+        
+        single = client.get(f"/trades/{sample_trade.id}?expand=counterparty").json()
+        assert single["counterparty"]["id"] == sample_trade.counterparty_id
+        assert "emerald_lot" not in single
+    
+    def test_expand_cursor_page(self, client, sample_trade):
+        """Test expand in cursor mode."""
+        data = client.get("/trades/?after=&expand=emerald_lot").json()
+        
+        assert data["items"][0]["emerald_lot"]["id"] == sample_trade.emerald_lot_id
+    
+    def test_unknown_expand(self, client):
+        """Test that unknown relationships are rejected."""
+        response = client.get("/trades/?expand=owner")
+        
+        assert response.status_code == 400
+    
+    def test_query_count_constant(self, client, sample_emerald, statements):
+        """Test that expanding costs the same number of queries for 2 or 20 trades."""
+        self._add_trades(client, 0, 2)
+        statements.clear()
+        client.get("/trades/?expand=emerald_lot,counterparty")
+        small = len(statements)
+        
+        self._add_trades(client, 2, 20)
+        statements.clear()
+        data = client.get("/trades/?expand=emerald_lot,counterparty").json()
+        
+        assert len(data) == 20
+        assert len(statements) == small == 3  # trades, then one IN query per relationship
+
+
+class TestBulkEndpoints:
+    """Test bulk create endpoints."""
+    
+    def test_bulk_emeralds(self, client):
+        """Test creating several emeralds in one request."""
+        rows = [{"lot_code": f"EM{i:03d}", "carat": 1.0} for i in range(4)]
+        
+        response = client.post("/emeralds/bulk", json=rows)
+        
+        assert response.status_code == 200
+        assert len(response.json()["created_ids"]) == 4
+        assert len(client.get("/emeralds/").json()) == 4
+    
+    def test_bulk_atomic_failure_is_422(self, client):
+        """Test that an all-or-nothing batch with a bad row is rejected."""
+        rows = [{"lot_code": "EM001", "carat": 1.0}, {"lot_code": "EM001", "carat": 2.0}]
+        
+        response = client.post("/emeralds/bulk", json=rows)
+        
+        assert response.status_code == 422
+        assert response.json()["detail"]["errors"][0]["index"] == 1
+        assert client.get("/emeralds/").json() == []
+    
+    def test_bulk_partial_mode(self, client):
+        """Test partial mode returns both created ids and row errors."""
+        rows = [{"name": "Buyer A", "type": "BUYER"}, {"name": "Buyer B", "type": "UNKNOWN"}]
+        
+        response = client.post("/counterparties/bulk?mode=partial", json=rows)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["created_ids"]) == 1
+        assert data["errors"][0]["index"] == 1
+
+
+class TestExportEndpoints:
+    """Test streaming export endpoints."""
+    
+    def test_export_trades_csv(self, client, sample_trade):
+        """Test CSV export of trades."""
+        response = client.get("/trades/export")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        header, row = response.text.strip().splitlines()
+        assert header.split(",")[:3] == ["id", "type", "date"]
+        assert row.split(",")[:3] == [str(sample_trade.id), "PURCHASE", "2024-01-15"]
+    
+    def test_export_trades_filtered(self, client, sample_trade):
+        """Test that export honours trade filters."""
+        response = client.get("/trades/export?currency=EUR")
+        
+        assert response.text.strip().splitlines() == [response.text.splitlines()[0]]
+    
+    def test_export_emeralds_ndjson(self, client, sample_emerald):
+        """Test NDJSON export matches the JSON API fields."""
+        response = client.get("/emeralds/export?format=ndjson")
+        
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == client.get("/emeralds/").json()
+    
+    def test_export_counterparties(self, client, sample_counterparty):
+        """Test counterparty export."""
+        response = client.get("/counterparties/export?format=ndjson")
+        
+        assert json.loads(response.text)["name"] == sample_counterparty.name
+
+
+class TestImportEndpoint:
+    """Test the CSV upload endpoint."""
+    
+    def test_import_counterparties(self, client):
+        """Test uploading a counterparty CSV."""
+        csv_text = "name,type,country\nBuyer A,BUYER,Spain\nBuyer B,ALIEN,\n"
+        
+        response = client.post(
+            "/import/counterparties", files={"file": ("cps.csv", csv_text, "text/csv")}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 1
+        assert data["error_count"] == 1
+        assert data["errors"][0]["line"] == 3
+    
+    def test_import_stops_at_invalid_utf8(self, client):
+        """Test that a file turning non-UTF-8 after several chunks returns the partial report."""
+        body = b"lot_code,carat\n" + b"".join(b"EM%05d,1.0\n" % i for i in range(1500)) + b"\xff\xfe,1.0\n"
+        
+        response = client.post("/import/emeralds", files={"file": ("lots.csv", body, "text/csv")})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] >= 1000
+        assert client.get("/reports/inventory/counts").json()["IN_STOCK"]["lot_count"] == data["created"]
+        assert data["errors"][-1]["line"] == data["rows"] + 2
+    
+    def test_import_unknown_entity(self, client):
+        """Test that only known entities can be imported."""
+        response = client.post("/import/widgets", files={"file": ("x.csv", "a\n", "text/csv")})
+        
+        assert response.status_code == 422
+
+
+class TestCursorPagination:
+    """Test cursor mode on list endpoints."""
+    
+    def test_emeralds_cursor_mode(self, client):
+        """Test paging emeralds with after/next_cursor."""
+        for i in range(3):
+            client.post("/emeralds/", json={"lot_code": f"EM{i:03d}", "carat": 1.0})
+        
+        first = client.get("/emeralds/?after=&limit=2").json()
+        assert [e["lot_code"] for e in first["items"]] == ["EM000", "EM001"]
+        assert first["next_cursor"]
+        
+        second = client.get(f"/emeralds/?after={first['next_cursor']}&limit=2").json()
+        assert [e["lot_code"] for e in second["items"]] == ["EM002"]
+        assert second["next_cursor"] is None
+    
+    def test_trades_cursor_mode(self, client, sample_trade):
+        """Test that trades return a page envelope in cursor mode."""
+        response = client.get("/trades/?after=")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["items"][0]["id"] == sample_trade.id
+        assert data["next_cursor"] is None
+    
+    def test_offset_mode_still_returns_list(self, client, sample_counterparty):
+        """Test that old clients keep getting a plain list."""
+        response = client.get("/counterparties/?skip=0&limit=10")
+        
+        assert isinstance(response.json(), list)
+    
+    def test_filters_and_sort(self, client, sample_trade):
+        """Test query-string filters and sort on list endpoints."""
+        assert len(client.get("/trades/?type=PURCHASE&currency=USD").json()) == 1
+        assert client.get("/trades/?type=SALE").json() == []
+        assert client.get("/emeralds/?status=SOLD").json() == []
+        assert len(client.get("/emeralds/?status=IN_STOCK&sort=-carat").json()) == 1
+    
+    def test_invalid_sort(self, client):
+        """Test that a non-whitelisted sort key is a 400."""
+        response = client.get("/trades/?sort=location")
+        
+        assert response.status_code == 400
+        assert "location" in response.json()["detail"]
+    
+    def test_invalid_cursor(self, client):
+        """Test that a malformed cursor is a 400."""
+        response = client.get("/counterparties/?after=@@@")
+        
+        assert response.status_code == 400
+    
+    @pytest.mark.parametrize("limit", [0, -1])
+    def test_limit_below_one(self, client, limit):
+        """Test that page sizes below 1 are a 422 in both modes."""
+        assert client.get(f"/emeralds/?after=&limit={limit}").status_code == 422
+        assert client.get(f"/trades/?limit={limit}").status_code == 422
+    
+    def test_limit_cap_applies_to_cursor_mode_only(self, client):
+        """Test that offset pages stay uncapped while cursor pages stop at 1000."""
+        assert client.get("/trades/?limit=5000").status_code == 200
+        assert client.get("/trades/?after=&limit=5000").status_code == 400
+
+
 class TestReportEndpoints:
     """Test report API endpoints."""
     
@@ -247,6 +537,35 @@ class TestReportEndpoints:
         assert data[0]["id"] == sample_emerald.id
         assert data[0]["status"] == "IN_STOCK"
     
+    def test_inventory_report_pages(self, client, sample_emerald):
+        """Test cursor pages of the stock, skipping lots that are not in stock."""
+        client.post("/emeralds/", json={"lot_code": "EM002", "carat": 1.0, "status": "SOLD"})
+        client.post("/emeralds/", json={"lot_code": "EM003", "carat": 1.0})
+        
+        first = client.get("/reports/inventory?after=&limit=1").json()
+        second = client.get(f"/reports/inventory?after={first['next_cursor']}&limit=1").json()
+        
+        assert [lot["lot_code"] for lot in first["items"] + second["items"]] == ["EM001", "EM003"]
+        assert second["next_cursor"] is None
+        assert client.get("/reports/inventory").json()[1]["lot_code"] == "EM003"
+    
+    def test_inventory_facets(self, client, sample_emerald):
+        """Test facet counts with repeated drill-down values."""
+        client.post("/emeralds/", json={"lot_code": "EM002", "carat": 1.5, "origin": "Zambia"})
+        client.post("/emeralds/", json={"lot_code": "EM003", "carat": 3.0, "origin": "Brazil"})
+        
+        response = client.get("/reports/inventory/facets?origin=Colombia&origin=Zambia")
+        
+        assert response.status_code == 200
+        assert response.headers["etag"]
+        data = response.json()
+        assert (data["lot_count"], data["total_carat"]) == (2, 4.0)
+        assert len(data["facets"]["origin"]) == 3
+        assert data["facets"]["shape"] == [
+            {"value": "Round", "lot_count": 1, "total_carat": 2.5},
+            {"value": None, "lot_count": 1, "total_carat": 1.5},
+        ]
+    
     def test_pnl_report(self, client, sample_emerald, sample_counterparty):
         """Test P&L report endpoint."""
         # Create purchase trade
@@ -280,6 +599,117 @@ class TestReportEndpoints:
         assert data["total_cost"] == 2500.0
         assert data["total_revenue"] == 3000.0
         assert data["profit"] == 500.0
+    
+    def test_dashboard_report(self, client, sample_trade):
+        """Test the dashboard summary endpoint."""
+        response = client.get("/reports/dashboard")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["lots_by_status"]["IN_STOCK"]["lot_count"] == 1
+        assert data["counterparties_by_type"]["SUPPLIER"] == 1
+        assert data["pnl"]["total_cost"] == sample_trade.total_price
+        assert data["recent_trades"][0]["id"] == sample_trade.id
+    
+    def test_pnl_report_grouped_by_month(self, client, sample_trade):
+        """Test P&L report with filters and monthly grouping."""
+        response = client.get("/reports/pnl?group_by=month&currency=USD&date_from=2024-01-01")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["group_by"] == "month"
+        assert data["groups"][0]["key"] == "2024-01"
+        assert data["groups"][0]["total_cost"] == sample_trade.total_price
+    
+    def test_pnl_report_invalid_group_by(self, client):
+        """Test that unknown groupings are rejected."""
+        response = client.get("/reports/pnl?group_by=colour")
+        
+        assert response.status_code == 422
+    
+    def test_pnl_timeseries(self, client, sample_trade):
+        """Test weekly buckets keyed by their Monday, with running totals."""
+        sale = {
+            "type": "SALE", "date": "2024-01-25", "currency": "USD", "unit_price": 3000.0,
+            "total_price": 3000.0, "emerald_lot_id": sample_trade.emerald_lot_id,
+            "counterparty_id": sample_trade.counterparty_id,
+        }
+        client.post("/trades/", json=sale)
+        
+        response = client.get("/reports/pnl/timeseries?bucket=week&from=2024-01-01&to=2024-12-31")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["bucket"] == "week"
+        assert [point["bucket"] for point in data["points"]] == ["2024-01-15", "2024-01-22"]
+        assert data["points"][0]["profit"] == -2500.0
+        assert data["points"][1]["total_revenue"] == 3000.0
+        assert data["points"][1]["cumulative_cost"] == 2500.0
+        assert data["points"][1]["cumulative_profit"] == 500.0
+    
+    def test_pnl_timeseries_filters(self, client, sample_trade):
+        """Test that from/to and currency narrow the series."""
+        assert client.get("/reports/pnl/timeseries?from=2024-02-01").json()["points"] == []
+        assert client.get("/reports/pnl/timeseries?currency=EUR").json()["points"] == []
+        
+        point, = client.get("/reports/pnl/timeseries?bucket=month&currency=USD").json()["points"]
+        assert point["bucket"] == "2024-01-01"
+        assert point["cumulative_cost"] == sample_trade.total_price
+    
+    def test_pnl_timeseries_invalid_bucket(self, client):
+        """Test that unknown buckets are rejected."""
+        response = client.get("/reports/pnl/timeseries?bucket=quarter")
+        
+        assert response.status_code == 422
+
+
+class TestConditionalGet:
+    """Test ETag / If-None-Match handling."""
+    
+    def test_not_modified_until_write(self, client, sample_emerald):
+        """Test 304 on an unchanged table and 200 after a write."""
+        first = client.get("/emeralds/")
+        etag = first.headers["etag"]
+        
+        cached = client.get("/emeralds/", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        
+        client.post("/emeralds/", json={"lot_code": "EM999", "carat": 1.0})
+        fresh = client.get("/emeralds/", headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+    
+    def test_etag_depends_on_query(self, client):
+        """Test that different query strings get different ETags."""
+        a = client.get("/trades/?limit=5").headers["etag"]
+        b = client.get("/trades/?limit=6").headers["etag"]
+        
+        assert a != b
+        assert client.get("/trades/?limit=5").headers["etag"] == a
+    
+    def test_report_etag_follows_trades(self, client, sample_trade):
+        """Test that trade writes invalidate report ETags but lot-only tables do not."""
+        etag = client.get("/reports/pnl").headers["etag"]
+        client.post("/counterparties/", json={"name": "Other", "type": "BUYER"})
+        assert client.get("/reports/pnl", headers={"If-None-Match": etag}).status_code == 304
+        
+        client.delete(f"/trades/{sample_trade.id}")
+        assert client.get("/reports/pnl", headers={"If-None-Match": etag}).status_code == 200
+    
+    def test_expanded_trade_etag_follows_lots(self, client, sample_trade):
+        """Test that a lot update changes the ETag of an expanded trade but not a plain one."""
+        expanded_url = f"/trades/{sample_trade.id}?expand=emerald_lot"
+        expanded = client.get(expanded_url).headers["etag"]
+        plain = client.get(f"/trades/{sample_trade.id}").headers["etag"]
+        
+        client.put(f"/emeralds/{sample_trade.emerald_lot_id}", json={"lot_code": "EM001", "carat": 9.0})
+        
+        fresh = client.get(expanded_url, headers={"If-None-Match": expanded})
+        assert fresh.status_code == 200
+        assert fresh.json()["emerald_lot"]["carat"] == 9.0
+        assert client.get(f"/trades/{sample_trade.id}", headers={"If-None-Match": plain}).status_code == 304
+        assert client.get("/trades/?expand=counterparty").headers["etag"] != client.get("/trades/").headers["etag"]
 
 
 class TestAPIValidation:
@@ -0,0 +1,112 @@
+"""
+Unit tests for the async database stack and async routes.
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import date
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+import async_api
+import async_crud
+from cache import report_cache
+from database import Base, get_async_db, get_async_read_db, make_async_sessionmaker, SQLITE_PROFILES
+from schemas import EmeraldLotCreate, CounterpartyCreate, TradeCreate
+from models import CounterpartyType, TradeType
+
+
+@pytest_asyncio.fixture
+async def async_session_factory(tmp_path):
+    """Fresh async database in a temporary file."""
+    report_cache.clear()
+    factory = make_async_sessionmaker(
+        f"sqlite:///{tmp_path / 'async.db'}", SQLITE_PROFILES["production"]
+    )
+    engine = factory.kw["bind"]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield factory
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def seeded(async_session_factory):
+    """One lot, one counterparty and one purchase."""
+    async with async_session_factory() as db:
+        lot = await async_crud.create_emerald(db, EmeraldLotCreate(lot_code="EM001", carat=2.5))
+        cp = await async_crud.create_counterparty(
+            db, CounterpartyCreate(name="Supplier", type=CounterpartyType.SUPPLIER)
+        )
+        trade = await async_crud.create_trade(db, TradeCreate(
+            type=TradeType.PURCHASE, date=date(2024, 1, 15), currency="USD",
+            unit_price=1000.0, total_price=2500.0,
+            emerald_lot_id=lot.id, counterparty_id=cp.id
+        ))
+    return trade
+
+
+@pytest_asyncio.fixture
+async def async_client(async_session_factory):
+    """Client for an app that serves only the async router."""
+    app = FastAPI()
+    app.include_router(async_api.router)
+
+    async def override():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override
+    app.dependency_overrides[get_async_read_db] = override
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+class TestAsyncCRUD:
+    """Test the run_sync crud wrappers."""
+    
+    @pytest.mark.asyncio
+    async def test_round_trip(self, async_session_factory, seeded):
+        """Test reads and reports through AsyncSession."""
+        async with async_session_factory() as db:
+            trades = await async_crud.get_trades(db)
+            pnl = await async_crud.get_pnl(db)
+        
+        assert [t.id for t in trades] == [seeded.id]
+        assert pnl["total_cost"] == 2500.0
+
+
+class TestAsyncRoutes:
+    """Test async def route handlers."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_reads(self, async_client, seeded):
+        """Test many concurrent requests against the async handlers."""
+        responses = await asyncio.gather(*[async_client.get("/trades/") for _ in range(20)])
+        
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()[0]["id"] == seeded.id for r in responses)
+    
+    @pytest.mark.asyncio
+    async def test_trade_not_found_and_reports(self, async_client, seeded):
+        """Test 404 handling and report routes."""
+        assert (await async_client.get("/trades/999")).status_code == 404
+        assert (await async_client.get(f"/trades/{seeded.id}")).json()["total_price"] == 2500.0
+        assert (await async_client.get("/reports/pnl")).json()["total_cost"] == 2500.0
+        assert (await async_client.get("/reports/pnl/timeseries?bucket=month")).json()["points"][0]["total_cost"] == 2500.0
+        assert (await async_client.get("/emeralds/?after=")).json()["next_cursor"] is None
+        assert (await async_client.get("/search?q=EM001")).json()["items"][0]["item"]["id"] == seeded.emerald_lot_id
+        assert (await async_client.get("/reports/inventory/facets")).json()["total_carat"] == 2.5
+    
+    @pytest.mark.asyncio
+    async def test_expand(self, async_client, seeded):
+        """Test that expanded relationships are eager-loaded, never lazy-loaded, under asyncio."""
+        trades = (await async_client.get("/trades/?expand=counterparty")).json()
+        
+        assert trades[0]["counterparty"]["id"] == seeded.counterparty_id
+        assert "emerald_lot" not in trades[0]
+    
+    @pytest.mark.asyncio
+    async def test_non_numeric_trade_path_not_captured(self, async_client):
+        """Test that /trades/export is left to the sync routes."""
+        assert (await async_client.get("/trades/export")).status_code == 404
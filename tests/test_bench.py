@@ -0,0 +1,33 @@
+"""
+Unit tests for the benchmark statistics and baseline comparison.
+"""
+from bench import compare
+from bench.run import summarize
+
+
+def result(p50):
+    return {"results": {"10000": {"crud": {"crud.get_pnl": {"p50_ms": p50}}}}}
+
+
+class TestBenchmarkSuite:
+    """Test the pieces of bench/ that decide pass or fail."""
+    
+    def test_summarize(self):
+        """Test percentiles and throughput from raw latencies in seconds."""
+        stats = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0)
+        
+        assert stats["iterations"] == 100
+        assert stats["p50_ms"] == 50.5
+        assert stats["max_ms"] == 100.0
+        assert stats["ops_per_s"] == 50.0
+    
+    def test_regression_over_threshold(self):
+        """Test that only slowdowns beyond the threshold are flagged."""
+        assert compare.find_regressions(result(1.2), result(1.0), threshold=0.25) == []
+        
+        regressions = compare.find_regressions(result(1.5), result(1.0), threshold=0.25)
+        assert [key for key, *_ in regressions] == ["10000/crud/crud.get_pnl"]
+    
+    def test_new_cases_do_not_fail(self):
+        """Test that cases missing from the baseline are ignored."""
+        assert compare.find_regressions(result(9.0), {"results": {}}) == []
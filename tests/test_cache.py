@@ -0,0 +1,245 @@
+"""
+Unit tests for the in-process report and identity caches.
+"""
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import versioning
+from cache import ReportCache, EntityCache, report_cache, entity_cache
+from crud import (
+    create_trade, get_pnl, update_emerald, get_inventory_facets, delete_emerald,
+    get_emerald_cached, get_emerald_by_code, get_counterparty_by_name, update_counterparty,
+)
+from schemas import TradeCreate, EmeraldLotCreate, CounterpartyUpdate
+from models import TradeType
+
+
+class TestReportCache:
+    """Test TTL, LRU, single-flight and version checks on a private cache."""
+
+    def test_hit_after_miss(self):
+        """Test that a second lookup is served from the cache."""
+        cache, calls = ReportCache(), []
+        compute = lambda: calls.append(1) or "value"
+
+        assert cache.get_or_compute("k", ("t_hit",), compute) == "value"
+        assert cache.get_or_compute("k", ("t_hit",), compute) == "value"
+
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are recomputed and counted as evictions."""
+        cache = ReportCache(ttl=0.01)
+        cache.get_or_compute("k", (), lambda: 1)
+        time.sleep(0.02)
+
+        assert cache.get_or_compute("k", (), lambda: 2) == 2
+        assert cache.stats()["evictions"] == 1
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry goes first."""
+        cache = ReportCache(maxsize=2)
+        cache.get_or_compute("a", (), lambda: "a")
+        cache.get_or_compute("b", (), lambda: "b")
+        cache.get_or_compute("a", (), lambda: "a")  # a is now most recent
+        cache.get_or_compute("c", (), lambda: "c")
+
+        assert cache.get_or_compute("a", (), lambda: "recomputed") == "a"
+        assert cache.get_or_compute("b", (), lambda: "recomputed") == "recomputed"
+        assert cache.stats()["evictions"] >= 1
+
+    def test_single_flight(self):
+        """Test that concurrent misses for one key share a single computation."""
+        cache, calls, release = ReportCache(), [], threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(timeout=5)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("k", (), compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        while cache.stats()["shared"] < 7:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ["value"] * 8
+
+    def test_single_flight_shares_errors(self):
+        """Test that a failed computation is not cached."""
+        cache = ReportCache()
+
+        with pytest.raises(ZeroDivisionError):
+            cache.get_or_compute("k", (), lambda: 1 / 0)
+
+        assert cache.get_or_compute("k", (), lambda: 1) == 1
+
+    def test_write_during_compute_is_not_stored(self):
+        """Test that a result computed across a write is served once but not kept."""
+        cache = ReportCache()
+
+        def compute():
+            versioning.bump("t_race")
+            return "stale"
+
+        assert cache.get_or_compute("k", ("t_race",), compute) == "stale"
+        assert cache.get_or_compute("k", ("t_race",), lambda: "fresh") == "fresh"
+
+    def test_invalidate_by_table(self):
+        """Test that invalidation only drops entries reading the written tables."""
+        cache = ReportCache()
+        cache.get_or_compute("lots", ("t_lots",), lambda: 1)
+        cache.get_or_compute("trades", ("t_trades",), lambda: 2)
+
+        cache.invalidate({"t_trades"})
+
+        assert cache.stats()["size"] == 1
+        assert cache.stats()["invalidations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_single_flight(self):
+        """Test that concurrent async misses await one computation."""
+        cache, calls = ReportCache(), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute_async("k", (), compute) for _ in range(5))
+        )
+
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+
+
+class TestCachedReports:
+    """Test the cached crud reports against the database."""
+
+    def test_pnl_invalidated_by_trade_commit(self, db_session, sample_trade):
+        """Test that creating a trade evicts the cached P&L."""
+        assert get_pnl(db_session)["total_cost"] == 2500.0
+        assert get_pnl(db_session)["total_cost"] == 2500.0
+        hits = report_cache.stats()["hits"]
+
+        create_trade(db_session, TradeCreate(
+            type=TradeType.SALE,
+            date=date(2024, 2, 1),
+            currency="USD",
+            unit_price=4000.0,
+            total_price=4000.0,
+            emerald_lot_id=sample_trade.emerald_lot_id,
+            counterparty_id=sample_trade.counterparty_id
+        ))
+
+        assert get_pnl(db_session)["total_revenue"] == 4000.0
+        assert report_cache.stats()["hits"] == hits
+
+    def test_keys_normalize_arguments(self, db_session, sample_trade):
+        """Test that positional and keyword calls share one entry."""
+        get_pnl(db_session, None, None, "USD")
+        hits = report_cache.stats()["hits"]
+
+        get_pnl(db_session, currency="USD")
+
+        assert report_cache.stats()["hits"] == hits + 1
+
+    def test_inventory_invalidated_by_lot_update(self, db_session, sample_emerald):
+        """Test that a lot write evicts the inventory report."""
+        assert get_inventory_facets(db_session)["lot_count"] == 1
+
+        update_emerald(db_session, sample_emerald.id, EmeraldLotCreate(
+            lot_code="EM001", carat=2.5, status="SOLD"
+        ))
+
+        assert get_inventory_facets(db_session)["lot_count"] == 0
+
+    def test_stats_endpoint(self, client, sample_trade):
+        """Test that the counters are exposed over HTTP."""
+        client.get("/reports/pnl")
+        client.get("/reports/pnl")
+
+        stats = client.get("/reports/cache").json()
+        assert stats["hits"] >= 1
+        assert stats["misses"] >= 1
+        assert {"evictions", "invalidations", "size"} <= stats.keys()
+
+
+class TestEntityCache:
+    """Test the identity cache for lots and counterparties."""
+
+    def test_lru_and_natural_keys(self):
+        """Test eviction drops both the id and natural-key entries."""
+        cache = EntityCache(maxsize=1)
+        cache.put("lots", 1, "EM001", "one")
+        cache.put("lots", 2, "EM002", "two")
+
+        assert cache.get("lots", 1) is None
+        assert cache.get_by_key("lots", "EM001") is None
+        assert cache.get_by_key("lots", "EM002") == "two"
+        assert cache.stats()["evictions"] == 1
+
+    def test_put_replaces_renamed_key(self):
+        """Test that a changed natural key no longer resolves."""
+        cache = EntityCache()
+        cache.put("lots", 1, "OLD", "v1")
+        cache.put("lots", 1, "NEW", "v2")
+
+        assert cache.get_by_key("lots", "OLD") is None
+        assert cache.get_by_key("lots", "NEW") == "v2"
+
+    def test_hot_read_skips_database(self, db_session, sample_emerald, statements):
+        """Test that repeated lookups by id and lot_code query once."""
+        first = get_emerald_cached(db_session, sample_emerald.id)
+        statements.clear()
+
+        assert get_emerald_cached(db_session, sample_emerald.id) == first
+        assert get_emerald_by_code(db_session, "EM001") == first
+        assert statements == []
+
+    def test_update_invalidates(self, db_session, sample_emerald, sample_counterparty):
+        """Test that updates drop cached values and the next read sees the new row."""
+        get_emerald_cached(db_session, sample_emerald.id)
+        get_counterparty_by_name(db_session, "Test Supplier")
+
+        update_emerald(db_session, sample_emerald.id, EmeraldLotCreate(lot_code="EM002", carat=9.0))
+        update_counterparty(db_session, sample_counterparty.id, CounterpartyUpdate(name="Renamed"))
+
+        assert entity_cache.get("emerald_lots", sample_emerald.id) is None
+        assert entity_cache.get("counterparties", sample_counterparty.id) is None
+        assert get_emerald_cached(db_session, sample_emerald.id).carat == 9.0
+        assert get_emerald_by_code(db_session, "EM001") is None
+        assert get_counterparty_by_name(db_session, "Test Supplier") is None
+        assert get_counterparty_by_name(db_session, "Renamed").id == sample_counterparty.id
+
+    def test_delete_invalidates(self, db_session, sample_emerald):
+        """Test that deletes drop the cached entity."""
+        get_emerald_cached(db_session, sample_emerald.id)
+
+        delete_emerald(db_session, sample_emerald.id)
+
+        assert get_emerald_cached(db_session, sample_emerald.id) is None
+        assert entity_cache.stats()["invalidations"] >= 1
+
+    def test_delete_route_single_statement(self, client, sample_emerald, statements):
+        """Test that DELETE /emeralds/{id} is one DELETE ... RETURNING with no SELECT."""
+        client.delete(f"/emeralds/{sample_emerald.id}")
+
+        lot_statements = [s for s in statements if "emerald_lots" in s.split("RETURNING")[0]]
+        assert len(lot_statements) == 1
+        assert lot_statements[0].startswith("DELETE FROM emerald_lots")
@@ -3,11 +3,15 @@ Unit tests for CRUD operations.
 """
 import pytest
 from datetime import date
+from sqlalchemy import event
 from crud import (
     create_emerald, get_emeralds, get_emerald, update_emerald, delete_emerald,
     create_counterparty, get_counterparties, get_counterparty, update_counterparty, delete_counterparty,
     create_trade, get_trades, get_trade, update_trade, delete_trade,
-    get_inventory, get_pnl
+    get_inventory_page, iter_inventory, get_inventory_facets, summarize_facets, get_pnl, get_dashboard,
+    get_emeralds_page, get_counterparties_page, get_trades_page, InvalidCursorError,
+    bulk_create_emeralds, bulk_create_counterparties, bulk_create_trades,
+    InvalidQueryError
 )
 from schemas import EmeraldLotCreate, CounterpartyCreate, CounterpartyUpdate, TradeCreate, TradeUpdate
 from models import LotStatus, CounterpartyType, TradeType
@@ -229,16 +233,258 @@ class TestTradeCRUD:
         assert trade is None
 
 
+class TestKeysetPagination:
+    """Test cursor (keyset) pagination."""
+    
+    def test_emeralds_page_walks_all_rows(self, db_session):
+        """Test that following next_cursor visits every emerald exactly once."""
+        for i in range(5):
+            create_emerald(db_session, EmeraldLotCreate(lot_code=f"EM{i:03d}", carat=1.0))
+        
+        seen, cursor = [], None
+        while True:
+            rows, cursor = get_emeralds_page(db_session, after=cursor, limit=2)
+            seen.extend(r.lot_code for r in rows)
+            if cursor is None:
+                break
+        
+        assert seen == [f"EM{i:03d}" for i in range(5)]
+    
+    def test_counterparties_page_last_page_has_no_cursor(self, db_session, sample_counterparty):
+        """Test that a short final page returns no cursor."""
+        rows, cursor = get_counterparties_page(db_session, limit=10)
+        
+        assert [r.id for r in rows] == [sample_counterparty.id]
+        assert cursor is None
+    
+    def test_trades_page_orders_by_date_then_id(self, db_session, sample_emerald, sample_counterparty):
+        """Test that trade pages follow (date, id) order across same-day ties."""
+        for day in (20, 5, 20, 1):
+            create_trade(db_session, TradeCreate(
+                type=TradeType.PURCHASE,
+                date=date(2024, 1, day),
+                currency="USD",
+                unit_price=10.0,
+                total_price=10.0,
+                emerald_lot_id=sample_emerald.id,
+                counterparty_id=sample_counterparty.id
+            ))
+        
+        first, cursor = get_trades_page(db_session, limit=3)
+        second, end = get_trades_page(db_session, after=cursor, limit=3)
+        
+        ordered = [(t.date, t.id) for t in first + second]
+        assert ordered == sorted(ordered)
+        assert len(ordered) == 4
+        assert end is None
+    
+    def test_invalid_cursor(self, db_session):
+        """Test that a garbage cursor is rejected."""
+        with pytest.raises(InvalidCursorError):
+            get_trades_page(db_session, after="not-a-cursor")
+    
+    def test_page_limit_must_be_positive(self, db_session, sample_emerald):
+        """Test that cursor page sizes outside 1..MAX_PAGE_SIZE are rejected instead of failing on the cursor."""
+        with pytest.raises(InvalidQueryError):
+            get_emeralds_page(db_session, limit=0)
+        with pytest.raises(InvalidQueryError):
+            get_emeralds_page(db_session, limit=1001)
+
+
+def query_plan(db_session, run):
+    """Run a crud call, capture its SELECT and return SQLite's EXPLAIN QUERY PLAN for it."""
+    captured = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+    
+    bind = db_session.get_bind()
+    event.listen(bind, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(bind, "before_cursor_execute", capture)
+    statement, parameters = captured[-1]
+    raw = db_session.connection().connection.dbapi_connection
+    return " | ".join(row[3] for row in raw.execute("EXPLAIN QUERY PLAN " + statement, parameters))
+
+
+class TestFilteringAndSorting:
+    """Test list filters, sort keys and the indexes behind them."""
+    
+    @pytest.fixture
+    def ledger(self, db_session, sample_counterparty):
+        lots = [
+            create_emerald(db_session, EmeraldLotCreate(
+                lot_code=f"EM{i:03d}", carat=1.0 + i, origin=origin, color_grade="AA",
+                status=status
+            ))
+            for i, (origin, status) in enumerate([
+                ("Colombia", LotStatus.IN_STOCK), ("Zambia", LotStatus.SOLD),
+                ("Colombia", LotStatus.IN_STOCK), ("Brazil", LotStatus.IN_STOCK),
+            ])
+        ]
+        for i, lot in enumerate(lots):
+            create_trade(db_session, TradeCreate(
+                type=TradeType.PURCHASE if i % 2 == 0 else TradeType.SALE,
+                date=date(2024, 1, 10 + i),
+                currency="USD" if i < 3 else "EUR",
+                unit_price=100.0 * (i + 1),
+                total_price=100.0 * (i + 1),
+                emerald_lot_id=lot.id,
+                counterparty_id=sample_counterparty.id
+            ))
+        return lots
+    
+    def test_emerald_filters(self, db_session, ledger):
+        """Test status, origin and carat range filters."""
+        lots = get_emeralds(db_session, status=LotStatus.IN_STOCK, origin="Colombia", carat_min=2.0)
+        
+        assert [lot.lot_code for lot in lots] == ["EM002"]
+    
+    def test_trade_filters_and_sort(self, db_session, ledger):
+        """Test trade filters combined with a descending sort."""
+        trades = get_trades(db_session, trade_type=TradeType.PURCHASE, currency="USD", sort="-total_price")
+        
+        assert [t.total_price for t in trades] == [300.0, 100.0]
+        assert get_trades(db_session, emerald_lot_id=ledger[3].id)[0].currency == "EUR"
+        assert len(get_trades(db_session, date_from=date(2024, 1, 11), date_to=date(2024, 1, 12))) == 2
+    
+    def test_sorted_cursor_pages(self, db_session, ledger):
+        """Test keyset paging over a non-key sort column."""
+        first, cursor = get_emeralds_page(db_session, limit=3, sort="-carat")
+        rest, end = get_emeralds_page(db_session, after=cursor, limit=3, sort="-carat")
+        
+        assert [lot.carat for lot in first + rest] == [4.0, 3.0, 2.0, 1.0]
+        assert end is None
+    
+    def test_unknown_sort_key(self, db_session):
+        """Test that only whitelisted columns can be sorted on."""
+        with pytest.raises(InvalidQueryError):
+            get_trades(db_session, sort="location")
+    
+    def test_trade_type_date_filter_uses_index(self, db_session, ledger):
+        """Test that a type + date range filter is an index seek, not a table scan."""
+        plan = query_plan(db_session, lambda: get_trades(
+            db_session, trade_type=TradeType.SALE, date_from=date(2024, 1, 1)
+        ))
+        
+        assert "SEARCH trades USING INDEX ix_trades_type_date" in plan
+        assert "SCAN trades" not in plan
+    
+    def test_trade_lot_filter_uses_index(self, db_session, ledger):
+        """Test that filtering by lot uses the foreign-key index."""
+        plan = query_plan(db_session, lambda: get_trades(db_session, emerald_lot_id=ledger[0].id))
+        
+        assert "USING INDEX ix_trades_emerald_lot_id" in plan
+    
+    def test_status_filter_uses_index(self, db_session, ledger):
+        """Test that filtering lots by status uses the status index."""
+        plan = query_plan(db_session, lambda: get_emeralds(db_session, status=LotStatus.SOLD))
+        
+        assert "USING INDEX ix_emerald_lots_status" in plan
+
+
+class TestBulkCreate:
+    """Test bulk insert operations."""
+    
+    def test_bulk_create_emeralds(self, db_session):
+        """Test inserting a clean batch of emeralds."""
+        rows = [{"lot_code": f"EM{i:03d}", "carat": 1.0 + i} for i in range(3)]
+        
+        result = bulk_create_emeralds(db_session, rows)
+        
+        assert len(result["created_ids"]) == 3
+        assert result["errors"] == []
+        assert [e.lot_code for e in get_emeralds(db_session)] == ["EM000", "EM001", "EM002"]
+    
+    def test_bulk_atomic_rejects_whole_batch(self, db_session, sample_counterparty):
+        """Test that one bad row stops an all-or-nothing batch."""
+        rows = [
+            {"name": "New Buyer", "type": "BUYER"},
+            {"name": sample_counterparty.name, "type": "SUPPLIER"},  # duplicate
+            {"name": "No Type"},                                     # invalid
+        ]
+        
+        result = bulk_create_counterparties(db_session, rows, atomic=True)
+        
+        assert result["created_ids"] == []
+        assert [e["index"] for e in result["errors"]] == [1, 2]
+        assert len(get_counterparties(db_session)) == 1
+    
+    def test_bulk_partial_keeps_good_rows(self, db_session, sample_emerald, sample_counterparty):
+        """Test that partial mode inserts valid trades and reports the rest."""
+        good = {
+            "type": "PURCHASE", "date": "2024-01-15", "currency": "USD",
+            "unit_price": 10.0, "total_price": 10.0,
+            "emerald_lot_id": sample_emerald.id, "counterparty_id": sample_counterparty.id
+        }
+        rows = [good, {**good, "emerald_lot_id": 999}, {**good, "total_price": "lots"}]
+        
+        result = bulk_create_trades(db_session, rows, atomic=False)
+        
+        assert len(result["created_ids"]) == 1
+        assert result["errors"][0] == {"index": 1, "errors": ["emerald_lot_id: 999 does not exist"]}
+        assert result["errors"][1]["index"] == 2
+        assert get_trade(db_session, result["created_ids"][0]).location is None
+
+
 class TestReports:
     """Test reporting functions."""
     
     def test_get_inventory(self, db_session, sample_emerald):
         """Test getting inventory report."""
-        inventory = get_inventory(db_session)
+        inventory, next_cursor = get_inventory_page(db_session)
         
         assert len(inventory) == 1
         assert inventory[0].id == sample_emerald.id
         assert inventory[0].status == LotStatus.IN_STOCK
+        assert next_cursor is None
+    
+    def test_iter_inventory(self, db_session, sample_emerald):
+        """Test that streaming the stock skips lots that are not in stock."""
+        create_emerald(db_session, EmeraldLotCreate(lot_code="EM002", carat=1.0, status=LotStatus.SOLD))
+        
+        fields, rows = iter_inventory(db_session)
+        
+        assert [row[fields.index("lot_code")] for row in rows] == ["EM001"]
+    
+    def test_get_inventory_facets(self, db_session, sample_emerald):
+        """Test facet counts and carat sums over lots in stock only."""
+        bulk_create_emeralds(db_session, [
+            {"lot_code": "EM002", "carat": 1.5, "origin": "Zambia", "shape": "Oval", "color_grade": "G"},
+            {"lot_code": "EM003", "carat": 4.0, "origin": "Zambia", "status": "SOLD"},
+        ])
+        
+        facets = get_inventory_facets(db_session)
+        
+        assert facets["lot_count"] == 2
+        assert facets["total_carat"] == 4.0
+        assert facets["facets"]["origin"] == [
+            {"value": "Colombia", "lot_count": 1, "total_carat": 2.5},
+            {"value": "Zambia", "lot_count": 1, "total_carat": 1.5},
+        ]
+        assert facets["facets"]["color_grade"] == [{"value": "G", "lot_count": 2, "total_carat": 4.0}]
+        assert {"value": None, "lot_count": 1, "total_carat": 1.5} in facets["facets"]["clarity"]
+    
+    def test_summarize_facets_drill_down(self):
+        """Test that a facet's buckets ignore its own filter but honour the others."""
+        cells = [
+            ("Colombia", "G", "VS1", "None", "Round", 2, 5.0),
+            ("Colombia", "F", "VS1", "Oil", "Oval", 1, 1.0),
+            ("Zambia", "G", "SI1", "None", "Round", 3, 6.0),
+        ]
+        
+        facets = summarize_facets(cells, origin=["Colombia"], color_grade=["G"])
+        
+        assert (facets["lot_count"], facets["total_carat"]) == (2, 5.0)
+        assert [b["value"] for b in facets["facets"]["origin"]] == ["Zambia", "Colombia"]
+        assert [b["value"] for b in facets["facets"]["color_grade"]] == ["G", "F"]
+        assert facets["facets"]["shape"] == [{"value": "Round", "lot_count": 2, "total_carat": 5.0}]
+        
+        with pytest.raises(InvalidQueryError):
+            summarize_facets(cells, status=["SOLD"])
     
     def test_get_pnl(self, db_session, sample_emerald, sample_counterparty):
         """Test getting P&L report."""
@@ -279,3 +525,57 @@ class TestReports:
         assert pnl["total_cost"] == 0.0
         assert pnl["total_revenue"] == 0.0
         assert pnl["profit"] == 0.0
+    
+    def test_get_pnl_filters_and_grouping(self, db_session, sample_emerald, sample_counterparty):
+        """Test P&L date/currency filters and group_by."""
+        for trade_type, day, currency, total in [
+            (TradeType.PURCHASE, 10, "USD", 100.0),
+            (TradeType.SALE, 20, "USD", 150.0),
+            (TradeType.PURCHASE, 25, "EUR", 80.0),
+        ]:
+            create_trade(db_session, TradeCreate(
+                type=trade_type,
+                date=date(2024, 3, day),
+                currency=currency,
+                unit_price=total,
+                total_price=total,
+                emerald_lot_id=sample_emerald.id,
+                counterparty_id=sample_counterparty.id
+            ))
+        
+        usd = get_pnl(db_session, currency="USD")
+        assert usd["profit"] == 50.0
+        
+        early = get_pnl(db_session, date_to=date(2024, 3, 15))
+        assert early["total_cost"] == 100.0
+        assert early["total_revenue"] == 0.0
+        
+        grouped = get_pnl(db_session, group_by="currency")
+        assert grouped["total_cost"] == 180.0
+        assert grouped["groups"] == [
+            {"key": "EUR", "total_cost": 80.0, "total_revenue": 0.0, "profit": -80.0},
+            {"key": "USD", "total_cost": 100.0, "total_revenue": 150.0, "profit": 50.0},
+        ]
+    
+    def test_get_dashboard(self, db_session, sample_trade, sample_counterparty):
+        """Test the one-shot dashboard summary."""
+        create_trade(db_session, TradeCreate(
+            type=TradeType.SALE,
+            date=date(2024, 2, 1),
+            currency="EUR",
+            unit_price=4000.0,
+            total_price=4000.0,
+            emerald_lot_id=sample_trade.emerald_lot_id,
+            counterparty_id=sample_counterparty.id
+        ))
+        
+        summary = get_dashboard(db_session, recent=1)
+        
+        # The sale closes the lot's only purchase, so matching marks it SOLD
+        assert summary["lots_by_status"] == {"SOLD": {"lot_count": 1, "total_carat": 2.5}}
+        assert summary["counterparties_by_type"] == {"SUPPLIER": 1, "BUYER": 0, "BOTH": 0}
+        assert [(t["type"], t["currency"], t["trade_count"]) for t in summary["trades"]] == [
+            (TradeType.PURCHASE, "USD", 1), (TradeType.SALE, "EUR", 1)
+        ]
+        assert summary["pnl"]["profit"] == 1500.0
+        assert [t.date for t in summary["recent_trades"]] == [date(2024, 2, 1)]
@@ -0,0 +1,52 @@
+"""
+Unit tests for the SQLite tuning profile.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from database import load_sqlite_pragmas, apply_sqlite_profile, SQLITE_PROFILES
+
+
+class TestSQLiteProfile:
+    """Test PRAGMA profile loading and application."""
+    
+    def test_production_profile_is_default(self):
+        """Test that an empty environment selects the production profile."""
+        assert load_sqlite_pragmas({}) == SQLITE_PROFILES["production"]
+    
+    def test_env_overrides(self):
+        """Test profile selection and single-PRAGMA overrides."""
+        pragmas = load_sqlite_pragmas({
+            "EMERALD_SQLITE_PROFILE": "default",
+            "EMERALD_SQLITE_BUSY_TIMEOUT": "250",
+        })
+        
+        assert pragmas == {"busy_timeout": "250"}
+    
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        """Test that a tuned engine runs in WAL mode with the configured settings."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+        apply_sqlite_profile(engine, SQLITE_PROFILES["production"])
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        engine.dispose()
+    
+    def test_read_only_engine_rejects_writes(self, tmp_path):
+        """Test that the read-only engine cannot modify the database."""
+        url = f"sqlite:///{tmp_path / 'ro.db'}"
+        writer = create_engine(url)
+        reader = create_engine(url)
+        apply_sqlite_profile(writer, SQLITE_PROFILES["production"])
+        apply_sqlite_profile(reader, SQLITE_PROFILES["production"], read_only=True)
+        with writer.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 0
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+        writer.dispose()
+        reader.dispose()
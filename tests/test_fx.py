@@ -0,0 +1,124 @@
+"""
+Unit tests for FX rates and base-currency reports.
+"""
+from datetime import date
+
+import pytest
+
+from crud import bulk_upsert_fx_rates, create_trade, get_pnl, get_pnl_timeseries, MissingFxRateError, InvalidQueryError
+from fx import fx_cache
+from models import FxRate, TradeType
+from schemas import TradeCreate
+
+RATES = [
+    {"date": "2024-01-01", "currency": "EUR", "rate": 1.0},
+    {"date": "2024-02-01", "currency": "EUR", "rate": 1.1},
+]
+
+
+@pytest.fixture
+def eur_sale(db_session, sample_trade):
+    """A EUR sale in February on top of the USD purchase in January."""
+    bulk_upsert_fx_rates(db_session, RATES)
+    return create_trade(db_session, TradeCreate(
+        type=TradeType.SALE, date=date(2024, 2, 15), currency="EUR", unit_price=3000.0,
+        total_price=3000.0, emerald_lot_id=sample_trade.emerald_lot_id,
+        counterparty_id=sample_trade.counterparty_id,
+    ))
+
+
+class TestFxRates:
+    """Test loading and looking up rates."""
+    
+    def test_upsert_replaces_rate(self, db_session):
+        """Test that a second rate for the same currency and day replaces the first."""
+        bulk_upsert_fx_rates(db_session, RATES)
+        result = bulk_upsert_fx_rates(db_session, [{"date": "2024-02-01", "currency": "EUR", "rate": 1.2}])
+        
+        assert len(result["created_ids"]) == 1
+        assert db_session.query(FxRate).count() == 2
+        assert fx_cache.rate(db_session, "EUR", date(2024, 2, 1)) == 1.2
+    
+    def test_rejects_non_positive_rate(self, db_session):
+        """Test that rows are validated like every bulk write."""
+        result = bulk_upsert_fx_rates(db_session, [{"date": "2024-01-01", "currency": "EUR", "rate": 0}])
+        
+        assert result["created_ids"] == []
+        assert result["errors"][0]["index"] == 0
+    
+    def test_cache_lookup_as_of_and_reload(self, db_session):
+        """Test as-of lookups, cross rates and a reload after a commit to fx_rates."""
+        bulk_upsert_fx_rates(db_session, RATES)
+        
+        assert fx_cache.rate(db_session, "EUR", date(2024, 1, 20)) == 1.0
+        assert fx_cache.rate(db_session, "USD", date(2024, 3, 1), base="EUR") == pytest.approx(1 / 1.1)
+        assert fx_cache.rate(db_session, "EUR", date(2023, 12, 31)) is None
+        assert fx_cache.rate(db_session, "GBP", date(2024, 1, 20)) is None
+        loads = fx_cache.loads
+        fx_cache.rate(db_session, "EUR", date(2024, 1, 20))
+        assert fx_cache.loads == loads
+        
+        bulk_upsert_fx_rates(db_session, [{"date": "2024-01-20", "currency": "EUR", "rate": 1.05}])
+        
+        assert fx_cache.rate(db_session, "EUR", date(2024, 1, 20)) == 1.05
+        assert fx_cache.loads == loads + 1
+    
+    def test_csv_import_and_lookup_route(self, client):
+        """Test loading rates through /import and reading one back."""
+        csv_text = "date,currency,rate\n2024-01-01,EUR,1.08\n2024-01-01,GBP,1.27\n"
+        
+        response = client.post("/import/fx_rates", files={"file": ("rates.csv", csv_text, "text/csv")})
+        
+        assert response.json()["created"] == 2
+        rate = client.get("/fx/rates/GBP?on=2024-06-30&base=EUR").json()
+        assert rate["rate"] == pytest.approx(1.27 / 1.08)
+        assert client.get("/fx/rates/JPY?on=2024-06-30").status_code == 404
+
+
+class TestBaseCurrencyReports:
+    """Test reports converted inside the SQL aggregate."""
+    
+    def test_pnl_in_base_currency(self, db_session, eur_sale):
+        """Test conversion at each trade's rate from the rollup and from trades."""
+        usd = get_pnl(db_session, base_currency="USD")
+        by_counterparty = get_pnl(db_session, counterparty_id=eur_sale.counterparty_id, base_currency="USD")
+        eur = get_pnl(db_session, group_by="month", base_currency="EUR")
+        
+        assert usd["total_cost"] == 2500.0
+        assert usd["total_revenue"] == pytest.approx(3300.0)
+        assert usd["base_currency"] == "USD"
+        assert by_counterparty["total_revenue"] == pytest.approx(3300.0)
+        assert [group["key"] for group in eur["groups"]] == ["2024-01", "2024-02"]
+        assert eur["total_cost"] == 2500.0
+        assert eur["total_revenue"] == 3000.0
+    
+    def test_timeseries_in_base_currency(self, db_session, eur_sale):
+        """Test that running totals add converted amounts."""
+        report = get_pnl_timeseries(db_session, "month", base_currency="USD")
+        
+        assert report["points"][-1]["cumulative_profit"] == pytest.approx(800.0)
+    
+    def test_missing_rate_and_unknown_base(self, db_session, eur_sale):
+        """Test that a gap in the rates is an error rather than a silently smaller sum."""
+        db_session.query(FxRate).filter(FxRate.date == date(2024, 1, 1)).delete()
+        db_session.commit()
+        
+        with pytest.raises(MissingFxRateError, match="USD to EUR"):
+            get_pnl(db_session, base_currency="EUR")
+        with pytest.raises(InvalidQueryError, match="JPY"):
+            get_pnl(db_session, base_currency="JPY")
+    
+    def test_report_routes(self, client, eur_sale):
+        """Test base_currency on the routes and that new rates change the ETag."""
+        response = client.get("/reports/pnl?base_currency=USD")
+        etag = response.headers["etag"]
+        
+        assert response.json()["total_revenue"] == pytest.approx(3300.0)
+        assert client.get("/reports/dashboard?base_currency=USD").json()["pnl"]["profit"] == pytest.approx(800.0)
+        assert client.get("/reports/pnl/timeseries?base_currency=JPY").status_code == 400
+        
+        client.post("/import/fx_rates", files={"file": ("rates.csv", "date,currency,rate\n2024-02-10,EUR,1.2\n")})
+        
+        response = client.get("/reports/pnl?base_currency=USD", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["total_revenue"] == pytest.approx(3600.0)
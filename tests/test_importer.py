@@ -0,0 +1,62 @@
+"""
+Unit tests for the chunked CSV importer.
+"""
+import io
+import pytest
+from importer import import_csv
+from crud import get_emeralds, get_trades
+from models import TradeType
+
+
+LOTS_CSV = """lot_code,carat,origin,status
+EM001,1.5,Colombia,IN_STOCK
+EM002,not-a-number,Zambia,IN_STOCK
+EM003,2.0,,IN_STOCK
+EM001,3.0,Brazil,IN_STOCK
+"""
+
+
+class TestImportCSV:
+    """Test CSV import."""
+    
+    def test_import_emeralds_reports_bad_lines(self, db_session):
+        """Test that good rows load and bad rows are reported by line."""
+        report = import_csv(db_session, "emeralds", io.StringIO(LOTS_CSV), chunk_size=2)
+        
+        assert report["rows"] == 4
+        assert report["created"] == 2
+        assert [e["line"] for e in report["errors"]] == [3, 5]
+        lots = get_emeralds(db_session)
+        assert [lot.lot_code for lot in lots] == ["EM001", "EM003"]
+        assert lots[1].origin is None
+    
+    def test_import_trades_resolves_natural_keys(self, db_session, sample_emerald, sample_counterparty):
+        """Test that lot_code and counterparty_name become foreign keys."""
+        csv_text = (
+            "type,date,currency,unit_price,total_price,lot_code,counterparty_name\n"
+            f"PURCHASE,2024-01-15,USD,10,10,{sample_emerald.lot_code},{sample_counterparty.name}\n"
+            f"SALE,2024-02-15,USD,12,12,NOPE,{sample_counterparty.name}\n"
+        )
+        
+        report = import_csv(db_session, "trades", io.StringIO(csv_text))
+        
+        assert report["created"] == 1
+        assert report["errors"] == [{"line": 3, "errors": ["lot_code: 'NOPE' not found"]}]
+        trade = get_trades(db_session)[0]
+        assert trade.type == TradeType.PURCHASE
+        assert trade.emerald_lot_id == sample_emerald.id
+        assert trade.counterparty_id == sample_counterparty.id
+    
+    def test_undecodable_bytes_end_the_import_with_a_report(self, db_session):
+        """Test that chunks before invalid UTF-8 stay imported and the stop is reported."""
+        # Larger than the wrapper's decode buffer, so the first chunks decode before the bad bytes
+        data = b"lot_code,carat\n" + b"".join(b"EM%05d,1.0\n" % i for i in range(2000)) + b"\xff\xfe,1.0\n"
+        lines = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+        
+        report = import_csv(db_session, "emeralds", lines, chunk_size=500)
+        
+        assert report["created"] >= 1000
+        assert report["created"] == len(get_emeralds(db_session, limit=2000))
+        assert report["error_count"] == 1
+        assert report["errors"][0]["line"] == report["rows"] + 2
+        assert "UTF-8" in report["errors"][0]["errors"][0]
@@ -0,0 +1,81 @@
+"""
+Unit tests for the synthetic ledger generator.
+"""
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+import ledger_gen
+from models import ROLLUP_TRIGGERS, SEARCH_TRIGGERS
+from rollups import verify_rollups
+
+
+def generate(path, seed=7, trades=400):
+    engine = create_engine(f"sqlite:///{path}")
+    counts = ledger_gen.generate(engine, lots=100, counterparties=10, trades=trades, seed=seed)
+    return engine, counts
+
+
+def dump(engine):
+    with engine.connect() as conn:
+        return [
+            conn.execute(text(f"SELECT * FROM {table} ORDER BY id")).all()
+            for table in ("emerald_lots", "counterparties", "trades")
+        ]
+
+
+class TestLedgerGenerator:
+    """Test determinism and consistency of generated ledgers."""
+    
+    def test_same_seed_same_rows(self, tmp_path):
+        """Test that a seed reproduces the ledger exactly and another seed does not."""
+        first, _ = generate(tmp_path / "a.db")
+        again, _ = generate(tmp_path / "b.db")
+        other, _ = generate(tmp_path / "c.db", seed=8)
+        
+        assert dump(first) == dump(again)
+        assert dump(first) != dump(other)
+    
+    def test_counts_and_rollups(self, tmp_path):
+        """Test row counts and that the rebuilt rollups match the trades."""
+        engine, counts = generate(tmp_path / "ledger.db")
+        
+        assert counts == {"lots": 100, "counterparties": 10, "trades": 400}
+        with Session(engine) as db:
+            assert db.execute(text("SELECT COUNT(*) FROM trades")).scalar() == 400
+            assert verify_rollups(db) == []
+    
+    def test_status_follows_last_trade(self, tmp_path):
+        """Test that lots whose last trade is a sale are SOLD and the rest IN_STOCK."""
+        engine, _ = generate(tmp_path / "ledger.db")
+        
+        with engine.connect() as conn:
+            mismatched = conn.execute(text("""
+                SELECT COUNT(*) FROM emerald_lots l
+                WHERE l.status != CASE (
+                    SELECT t.type FROM trades t WHERE t.emerald_lot_id = l.id
+                    ORDER BY t.date DESC, t.id DESC LIMIT 1
+                ) WHEN 'SALE' THEN 'SOLD' ELSE 'IN_STOCK' END
+            """)).scalar()
+            first_trades = conn.execute(text("""
+                SELECT t.type FROM trades t
+                WHERE t.id = (SELECT MIN(id) FROM trades WHERE emerald_lot_id = t.emerald_lot_id)
+                GROUP BY t.type
+            """)).scalars().all()
+        
+        assert mismatched == 0
+        assert first_trades == ["PURCHASE"]
+    
+    def test_triggers_and_indexes_restored(self, tmp_path):
+        """Test that triggers and indexes dropped for the load are back afterwards."""
+        engine, _ = generate(tmp_path / "ledger.db")
+        
+        with engine.connect() as conn:
+            triggers = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        indexes = {index["name"] for index in inspect(engine).get_indexes("trades")}
+        
+        all_triggers = (*ROLLUP_TRIGGERS.values(), *SEARCH_TRIGGERS.values())
+        assert triggers == {ledger_gen._trigger_name(ddl) for ddls in all_triggers for ddl in ddls}
+        assert {index.name for index in ledger_gen.TRADE_INDEXES} <= indexes
+        with engine.connect() as conn:
+            indexed = conn.execute(text("SELECT count(*) FROM emerald_lots_fts WHERE emerald_lots_fts MATCH 'EM0000042'")).scalar()
+        assert indexed == 1
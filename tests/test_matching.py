@@ -0,0 +1,161 @@
+"""
+Unit tests for FIFO purchase/sale matching.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from cache import entity_cache
+from crud import create_trade, update_trade, delete_trade, get_emerald_cached, bulk_create_trades
+from matching import match_lot, backfill
+from models import EmeraldLot, Trade, LotStatus, TradeType
+from rollups import verify_rollups
+from schemas import TradeUpdate
+
+P, S = TradeType.PURCHASE, TradeType.SALE
+
+
+# make_trade() arguments for the sale these tests put against sample_trade's purchase
+SALE = {"trade_type": S, "month": 3, "total": 3000.0}
+
+
+class TestMatchLot:
+    """Test the matching rules on plain trade tuples."""
+    
+    def test_fifo_order(self):
+        """Test that each sale takes the earliest open purchase."""
+        metrics, status = match_lot([
+            (1, P, date(2024, 1, 1), "USD", 100.0),
+            (2, P, date(2024, 1, 11), "USD", 200.0),
+            (3, S, date(2024, 1, 21), "USD", 150.0),
+            (4, S, date(2024, 1, 31), "USD", 300.0),
+        ])
+        
+        assert metrics[3] == (0.5, 20)
+        assert metrics[4] == (0.5, 20)
+        assert metrics[1] == metrics[2] == (None, None)
+        assert status == LotStatus.SOLD
+    
+    def test_open_purchase_keeps_lot_in_stock(self):
+        """Test that an unsold purchase leaves the lot IN_STOCK."""
+        _, status = match_lot([(1, P, date(2024, 1, 1), "USD", 100.0)])
+        
+        assert status == LotStatus.IN_STOCK
+    
+    def test_cross_currency_and_unmatched_sales(self):
+        """Test that roi needs one currency and a sale needs an earlier purchase."""
+        metrics, status = match_lot([
+            (1, S, date(2024, 1, 1), "USD", 100.0),
+            (2, P, date(2024, 1, 2), "USD", 100.0),
+            (3, S, date(2024, 1, 5), "EUR", 120.0),
+        ])
+        
+        assert metrics[1] == (None, None)
+        assert metrics[3] == (None, 3)
+        assert status == LotStatus.SOLD
+
+
+class TestWriteTimeMatching:
+    """Test that trade writes match within their own transaction."""
+    
+    def test_sale_fills_metrics_and_sells_lot(self, db_session, sample_trade, make_trade):
+        """Test roi, holding days and the lot status after a sale."""
+        get_emerald_cached(db_session, sample_trade.emerald_lot_id)
+        
+        sale = create_trade(db_session, make_trade(sample_trade.emerald_lot_id, sample_trade.counterparty_id, **SALE))
+        
+        assert sale.roi == 0.2
+        assert sale.holding_days == (date(2024, 3, 1) - date(2024, 1, 15)).days
+        assert entity_cache.get("emerald_lots", sample_trade.emerald_lot_id) is None
+        assert get_emerald_cached(db_session, sample_trade.emerald_lot_id).status == LotStatus.SOLD
+        assert verify_rollups(db_session) == []
+    
+    def test_update_returns_rematched_metrics(self, db_session, sample_trade, make_trade):
+        """Test that a price change re-matches and the returned trade shows it."""
+        sale = create_trade(db_session, make_trade(sample_trade.emerald_lot_id, sample_trade.counterparty_id, **SALE))
+        
+        updated = update_trade(db_session, sale.id, TradeUpdate(total_price=5000.0))
+        
+        assert updated.roi == 1.0
+        assert db_session.get(Trade, sale.id).roi == 1.0
+    
+    def test_update_without_match_fields_skips_matching(self, db_session, sample_trade, statements):
+        """Test that cosmetic edits stay a single statement."""
+        update_trade(db_session, sample_trade.id, TradeUpdate(location="Vault 9"))
+        
+        assert len([s for s in statements if "trades" in s.split("RETURNING")[0]]) == 1
+    
+    def test_delete_sale_restocks_lot(self, db_session, sample_trade, make_trade):
+        """Test that deleting the sale reopens the purchase."""
+        sale = create_trade(db_session, make_trade(sample_trade.emerald_lot_id, sample_trade.counterparty_id, **SALE))
+        
+        delete_trade(db_session, sale.id)
+        
+        assert db_session.get(EmeraldLot, sample_trade.emerald_lot_id).status == LotStatus.IN_STOCK
+    
+    def test_deleting_every_trade_restocks_lot(self, db_session, sample_trade, make_trade):
+        """Test that a lot left without trades goes back in stock and out of the cache."""
+        sale = create_trade(db_session, make_trade(sample_trade.emerald_lot_id, sample_trade.counterparty_id, **SALE))
+        get_emerald_cached(db_session, sample_trade.emerald_lot_id)
+        
+        delete_trade(db_session, sale.id)
+        delete_trade(db_session, sample_trade.id)
+        
+        assert entity_cache.get("emerald_lots", sample_trade.emerald_lot_id) is None
+        assert get_emerald_cached(db_session, sample_trade.emerald_lot_id).status == LotStatus.IN_STOCK
+        assert verify_rollups(db_session) == []
+    
+    def test_moving_a_trade_rematches_both_lots(self, db_session, sample_trade, sample_counterparty, make_trade):
+        """Test that changing emerald_lot_id re-matches the lot it left."""
+        other = EmeraldLot(lot_code="EM002", carat=1.0)
+        db_session.add(other)
+        db_session.commit()
+        sale = create_trade(db_session, make_trade(sample_trade.emerald_lot_id, sample_counterparty.id, **SALE))
+        
+        moved = update_trade(db_session, sale.id, TradeUpdate(emerald_lot_id=other.id))
+        
+        assert (moved.roi, moved.holding_days) == (None, None)
+        assert db_session.get(EmeraldLot, sample_trade.emerald_lot_id).status == LotStatus.IN_STOCK
+        assert db_session.get(EmeraldLot, other.id).status == LotStatus.SOLD
+    
+    def test_bulk_insert_matches(self, db_session, sample_trade, make_trade):
+        """Test that the bulk path matches the lots it wrote to."""
+        row = make_trade(sample_trade.emerald_lot_id, sample_trade.counterparty_id, **SALE).model_dump(mode="json")
+        
+        result = bulk_create_trades(db_session, [row])
+        
+        assert db_session.get(Trade, result["created_ids"][0]).roi == 0.2
+
+
+class TestBackfill:
+    """Test matching a ledger written around crud."""
+    
+    @pytest.mark.parametrize("chunk_lots", [1, 100])
+    def test_backfill_in_chunks(self, db_session, sample_trade, sample_counterparty, chunk_lots, make_trade):
+        """Test that every chunk size gives the same result and a rerun changes nothing."""
+        lots = [EmeraldLot(lot_code=f"BF{i}", carat=1.0) for i in range(3)]
+        db_session.add_all(lots)
+        db_session.commit()
+        db_session.execute(insert(Trade), [
+            make_trade(lot.id, sample_counterparty.id, trade_type, day, total=total, month=3).model_dump()
+            for lot in lots
+            for trade_type, day, total in ((P, 1, 100.0), (S, 11, 125.0))
+        ])
+        db_session.commit()
+        
+        totals = backfill(db_session, chunk_lots=chunk_lots)
+        
+        assert totals == {"lots": 4, "trades_updated": 3, "lots_flipped": 3}
+        assert sorted(db_session.query(Trade.roi).filter(Trade.type == S).all()) == [(0.25,)] * 3
+        assert backfill(db_session, chunk_lots=chunk_lots)["trades_updated"] == 0
+        assert verify_rollups(db_session) == []
+    
+    def test_backfill_restocks_lots_without_trades(self, db_session):
+        """Test that a SOLD lot with no trades left is put back in stock."""
+        lot = EmeraldLot(lot_code="BF0", carat=1.0, status=LotStatus.SOLD)
+        db_session.add(lot)
+        db_session.commit()
+        
+        assert backfill(db_session)["lots_flipped"] == 1
+        assert db_session.get(EmeraldLot, lot.id).status == LotStatus.IN_STOCK
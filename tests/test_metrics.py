@@ -0,0 +1,83 @@
+"""
+Unit tests for the request and SQL metrics behind /metrics.
+"""
+import re
+
+from metrics import Histogram, Metrics, metrics
+
+
+def sample(text, name, **labels):
+    """Value of one sample line in exposition text, or None."""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = "^" + re.escape(name + (f"{{{label_text}}}" if labels else "")) + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class TestExposition:
+    """Test the Prometheus text rendering."""
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket bounds, +Inf, sum and count."""
+        histogram = Histogram("h", "Help.", ("route",), (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(("/x",), value)
+        
+        text = "\n".join(histogram.render())
+        
+        assert sample(text, "h_bucket", route="/x", le="0.1") == 2
+        assert sample(text, "h_bucket", route="/x", le="1.0") == 3
+        assert sample(text, "h_bucket", route="/x", le="+Inf") == 4
+        assert sample(text, "h_sum", route="/x") == 3.65
+        assert sample(text, "h_count", route="/x") == 4
+        assert "# TYPE h histogram" in text
+    
+    def test_label_values_are_escaped(self):
+        """Test that quotes and backslashes cannot break the format."""
+        registry = Metrics()
+        registry.start_request()
+        registry.finish_request("GET", 'a"b\\c', 200, 0.01, [0, 0.0])
+        
+        assert 'route="a\\"b\\\\c"' in registry.render()
+
+
+class TestMetricsEndpoint:
+    """Test what the middleware and cursor events record for real requests."""
+    
+    def test_route_template_and_status(self, client, sample_emerald):
+        """Test that requests are labelled by route template, not raw path."""
+        before = sample(client.get("/metrics").text, "emerald_http_requests_total",
+                        method="GET", route="/emeralds/{emerald_id}", status="404") or 0
+        
+        client.get(f"/emeralds/{sample_emerald.id}")
+        client.get("/emeralds/999999")
+        client.get("/no-such-route")
+        response = client.get("/metrics")
+        
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert sample(text, "emerald_http_requests_total",
+                      method="GET", route="/emeralds/{emerald_id}", status="404") == before + 1
+        assert sample(text, "emerald_http_requests_total",
+                      method="GET", route="unmatched", status="404") >= 1
+        assert "/emeralds/999999" not in text
+    
+    def test_queries_counted_per_request(self, client, sample_trade):
+        """Test that statements run in the threadpool count against their request."""
+        metrics.clear()
+        
+        client.get("/trades/?limit=10&expand=emerald_lot,counterparty")
+        text = client.get("/metrics").text
+        
+        assert sample(text, "emerald_http_request_db_queries_sum", method="GET", route="/trades/") == 3
+        assert sample(text, "emerald_http_request_db_queries_count", method="GET", route="/trades/") == 1
+        assert sample(text, "emerald_http_request_db_seconds_sum", method="GET", route="/trades/") > 0
+        assert sample(text, "emerald_db_queries_total") >= 3
+    
+    def test_in_flight_and_threadpool_gauges(self, client):
+        """Test that only the scrape itself is in flight and the threadpool is reported."""
+        text = client.get("/metrics").text
+        
+        assert sample(text, "emerald_http_requests_in_flight") == 1
+        assert sample(text, "emerald_threadpool_threads_max") > 0
+        assert sample(text, "emerald_threadpool_tasks_waiting") == 0
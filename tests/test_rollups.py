@@ -0,0 +1,78 @@
+"""
+Unit tests for the P&L and inventory rollups.
+"""
+import pytest
+from datetime import date
+from sqlalchemy import text
+from crud import (
+    create_emerald, update_emerald, delete_emerald,
+    create_trade, update_trade, delete_trade, get_pnl, get_inventory_counts
+)
+from rollups import rebuild_rollups, verify_rollups
+from schemas import EmeraldLotCreate, TradeUpdate
+from models import PnlDaily, LotStatus, TradeType
+
+
+class TestPnlRollup:
+    """Test that pnl_daily follows trade writes."""
+    
+    def test_insert_update_delete(self, db_session, sample_emerald, sample_counterparty, make_trade):
+        """Test the rollup through a full trade lifecycle."""
+        trade = create_trade(db_session, make_trade(sample_emerald.id, sample_counterparty.id))
+        create_trade(db_session, make_trade(sample_emerald.id, sample_counterparty.id, total=50.0))
+        
+        row = db_session.query(PnlDaily).one()
+        assert (row.trade_count, row.total_price) == (2, 150.0)
+        
+        update_trade(db_session, trade.id, TradeUpdate(type=TradeType.SALE, date=date(2024, 1, 2)))
+        assert db_session.query(PnlDaily).count() == 2
+        assert verify_rollups(db_session) == []
+        
+        delete_trade(db_session, trade.id)
+        row = db_session.query(PnlDaily).one()
+        assert (row.type, row.trade_count, row.total_price) == (TradeType.PURCHASE, 1, 50.0)
+    
+    def test_pnl_matches_raw_trades(self, db_session, sample_emerald, sample_counterparty, make_trade):
+        """Test that rollup-backed and trade-backed P&L agree."""
+        create_trade(db_session, make_trade(sample_emerald.id, sample_counterparty.id, day=3, total=70.0))
+        create_trade(db_session, make_trade(
+            sample_emerald.id, sample_counterparty.id, TradeType.SALE, day=9, currency="EUR", total=90.0
+        ))
+        
+        from_rollup = get_pnl(db_session, group_by="currency")
+        from_trades = get_pnl(db_session, counterparty_id=sample_counterparty.id, group_by="currency")
+        
+        assert from_rollup == from_trades
+
+
+class TestLotStatusRollup:
+    """Test that lot_status_counts follows lot writes."""
+    
+    def test_status_counts(self, db_session):
+        """Test counts and carat totals as lots move between statuses."""
+        lot = create_emerald(db_session, EmeraldLotCreate(lot_code="EM001", carat=2.0))
+        create_emerald(db_session, EmeraldLotCreate(lot_code="EM002", carat=1.5))
+        update_emerald(db_session, lot.id, EmeraldLotCreate(lot_code="EM001", carat=2.0, status=LotStatus.SOLD))
+        
+        assert get_inventory_counts(db_session) == {
+            "IN_STOCK": {"lot_count": 1, "total_carat": 1.5},
+            "SOLD": {"lot_count": 1, "total_carat": 2.0},
+        }
+        
+        delete_emerald(db_session, lot.id)
+        assert "SOLD" not in get_inventory_counts(db_session)
+
+
+class TestRebuild:
+    """Test the rebuild/verify command."""
+    
+    def test_rebuild_repairs_drift(self, db_session, sample_trade):
+        """Test that verify spots a corrupted rollup and rebuild fixes it."""
+        db_session.execute(text("UPDATE pnl_daily SET total_price = total_price + 1"))
+        db_session.execute(text("DELETE FROM lot_status_counts"))
+        db_session.commit()
+        
+        assert len(verify_rollups(db_session)) == 2
+        
+        rebuild_rollups(db_session)
+        assert verify_rollups(db_session) == []
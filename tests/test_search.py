@@ -0,0 +1,104 @@
+"""
+Unit tests for full-text search over lots and counterparties.
+"""
+import pytest
+
+from crud import search, InvalidQueryError
+from models import EmeraldLot, Counterparty, CounterpartyType
+
+
+def hits(db_session, q, **kwargs):
+    items, _ = search(db_session, q=q, **kwargs)
+    return [(item["rank"], item["type"], item["item"].id) for item in items]
+
+
+@pytest.fixture
+def ledger(db_session, sample_emerald, sample_counterparty):
+    """Lots and counterparties whose text overlaps in every searchable column."""
+    lots = [
+        EmeraldLot(lot_code="EM0010", carat=1.0, origin="Zambia"),
+        EmeraldLot(lot_code="ZB-7", carat=1.0, origin="Zambia", certificate_id="EM0010-X"),
+    ]
+    broker = Counterparty(name="Zambia Brokers", type=CounterpartyType.BOTH, kyc_notes="Passport on file")
+    db_session.add_all([*lots, broker])
+    db_session.commit()
+    return sample_emerald, *lots, sample_counterparty, broker
+
+
+class TestSearch:
+    """Test matching, ranking and paging."""
+    
+    def test_fragments_of_every_column(self, db_session, ledger):
+        """Test that a fragment of each searchable column finds its row."""
+        emerald, _, _, supplier, broker = ledger
+        
+        assert hits(db_session, "gia123") == [(2, "emerald_lot", emerald.id)]
+        assert hits(db_session, "lombia") == [(2, "emerald_lot", emerald.id)]
+        assert hits(db_session, "Supp") == [(1, "counterparty", supplier.id)]
+        assert hits(db_session, "example.com") == [(2, "counterparty", supplier.id)]
+        assert hits(db_session, "passport") == [(2, "counterparty", broker.id)]
+    
+    def test_ranking(self, db_session, ledger):
+        """Test exact key, then key fragment, then other columns, lots before counterparties."""
+        emerald, em0010, zb7, _, broker = ledger
+        
+        assert hits(db_session, "EM0010") == [(0, "emerald_lot", em0010.id), (2, "emerald_lot", zb7.id)]
+        assert hits(db_session, "EM00") == [
+            (1, "emerald_lot", emerald.id), (1, "emerald_lot", em0010.id), (2, "emerald_lot", zb7.id),
+        ]
+        assert hits(db_session, "Zambia") == [
+            (1, "counterparty", broker.id), (2, "emerald_lot", em0010.id), (2, "emerald_lot", zb7.id),
+        ]
+    
+    def test_every_term_must_match(self, db_session, ledger):
+        """Test that terms are ANDed and may sit in different columns."""
+        _, _, zb7, _, _ = ledger
+        
+        assert hits(db_session, "ZB- Zambia") == [(2, "emerald_lot", zb7.id)]
+        assert hits(db_session, "EM0010 Zambia") == [(2, "emerald_lot", ledger[1].id), (2, "emerald_lot", zb7.id)]
+        assert hits(db_session, "EM0010 Colombia") == []
+    
+    def test_cursor_pages_follow_the_ranking(self, db_session, ledger):
+        """Test that one-row pages walk the same order as a single page."""
+        expected, pages, after = hits(db_session, "Zam EM0"), [], ""
+        while after is not None:
+            items, after = search(db_session, after, 1, q="Zam EM0")
+            pages += [(item["rank"], item["type"], item["item"].id) for item in items]
+        
+        assert len(expected) == 2
+        assert pages == expected
+    
+    def test_query_syntax_is_literal(self, db_session, ledger):
+        """Test that FTS5 operators and quotes in q are searched for, not parsed."""
+        assert hits(db_session, 'EM"0 OR NOT') == []
+        with pytest.raises(InvalidQueryError):
+            search(db_session, q="EM")
+    
+    def test_index_follows_writes(self, client, db_session, ledger):
+        """Test that updates and deletes through the API reach the index."""
+        emerald = ledger[0]
+        payload = {"lot_code": "RENAMED-1", "carat": 2.5, "certificate_id": "GIA123456"}
+        
+        client.put(f"/emeralds/{emerald.id}", json=payload)
+        
+        assert hits(db_session, "EM001") == [(1, "emerald_lot", ledger[1].id), (2, "emerald_lot", ledger[2].id)]
+        assert hits(db_session, "RENAMED") == [(1, "emerald_lot", emerald.id)]
+        
+        client.delete(f"/emeralds/{emerald.id}")
+        
+        assert hits(db_session, "RENAMED") == []
+    
+    def test_search_route(self, client, ledger):
+        """Test the endpoint's shape, paging and validation."""
+        response = client.get("/search?q=Zambia&limit=2")
+        
+        assert response.status_code == 200
+        assert "etag" in response.headers
+        page = response.json()
+        assert [item["type"] for item in page["items"]] == ["counterparty", "emerald_lot"]
+        assert page["items"][0]["item"]["name"] == "Zambia Brokers"
+        assert "kyc_notes" not in page["items"][0]["item"]
+        rest = client.get(f"/search?q=Zambia&limit=2&after={page['next_cursor']}").json()
+        assert [item["item"]["lot_code"] for item in rest["items"]] == ["ZB-7"]
+        assert rest["next_cursor"] is None
+        assert client.get("/search?q=ab").status_code == 400
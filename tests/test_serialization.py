@@ -0,0 +1,61 @@
+"""
+Unit tests for the fast JSON path.
+"""
+import json
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+import serialization
+import schemas
+from crud import get_trades, get_emeralds
+from models import LotStatus, TradeType
+
+
+def response_model_bytes(schema, rows):
+    """What FastAPI renders for response_model=list[schema] over ORM rows."""
+    models = TypeAdapter(list[schema]).validate_python(rows, from_attributes=True)
+    return json.dumps(jsonable_encoder(models), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class TestDumps:
+    """Test the encoder on its own."""
+    
+    def test_enums_dates_and_keys(self):
+        """Test enums, dates and enum dict keys encode as the API shows them."""
+        content = {LotStatus.SOLD: [TradeType.SALE, date(2024, 1, 15), None, 2.5, "Bogotá"]}
+        
+        assert serialization.dumps(content) == '{"SOLD":["SALE","2024-01-15",null,2.5,"Bogotá"]}'.encode()
+    
+    def test_models(self):
+        """Test that Pydantic models are dumped in JSON mode."""
+        assert serialization.dumps([schemas.PnlTotals(total_cost=1, total_revenue=2, profit=1)]) == (
+            b'[{"total_cost":1.0,"total_revenue":2.0,"profit":1.0}]'
+        )
+
+
+class TestWireFormat:
+    """Test that the fast path renders the same bytes as response_model did."""
+    
+    def test_rows_match_orm_serialization(self, db_session, sample_trade):
+        """Test Row tuples against ORM rows for lots and trades."""
+        assert serialization.dumps(get_trades(db_session, as_rows=True)) == (
+            response_model_bytes(schemas.TradeRead, get_trades(db_session))
+        )
+        assert serialization.dumps(get_emeralds(db_session, as_rows=True)) == (
+            response_model_bytes(schemas.EmeraldLotRead, get_emeralds(db_session))
+        )
+    
+    def test_list_endpoint_bytes(self, client, sample_trade, db_session):
+        """Test the /trades/ body and its JSON content type."""
+        response = client.get("/trades/")
+        
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == response_model_bytes(schemas.TradeRead, get_trades(db_session))
+    
+    def test_dashboard_matches_schema(self, client, sample_trade):
+        """Test the dashboard payload still validates as DashboardSummary unchanged."""
+        data = client.get("/reports/dashboard").json()
+        
+        assert schemas.DashboardSummary.model_validate(data).model_dump(mode="json") == data
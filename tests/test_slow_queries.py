@@ -0,0 +1,83 @@
+"""
+Unit tests for the slow query log.
+"""
+import logging
+
+import pytest
+
+from crud import get_trades, get_pnl
+from slow_queries import SlowQueryLog, statement_shape
+from tests.conftest import engine
+
+
+@pytest.fixture
+def slow_log():
+    """A log on the test engine that treats every statement as slow."""
+    log = SlowQueryLog(threshold_ms=1e-9)
+    log.watch(engine)
+    yield log
+    log.unwatch(engine)
+
+
+class TestStatementShape:
+    """Test how statements are grouped."""
+    
+    def test_literals_and_in_lists_fold(self):
+        """Test that values and IN-list lengths do not create new shapes."""
+        first = statement_shape("SELECT * FROM trades\n WHERE id IN (?, ?, ?) AND currency = 'USD' LIMIT 10")
+        second = statement_shape("SELECT * FROM trades WHERE id IN (?, ?) AND currency = 'EUR' LIMIT 5")
+        
+        assert first == second == "SELECT * FROM trades WHERE id IN (?, ...) AND currency = ? LIMIT ?"
+    
+    def test_identifiers_keep_digits(self):
+        """Test that numbered aliases are not mistaken for literals."""
+        assert statement_shape("SELECT anon_1.id FROM t AS anon_1") == "SELECT anon_1.id FROM t AS anon_1"
+
+
+class TestSlowQueryLog:
+    """Test logging, plans and aggregation against the test database."""
+    
+    def test_logs_plan_and_caller(self, db_session, sample_trade, slow_log, caplog):
+        """Test that a slow statement is logged with its caller and query plan."""
+        with caplog.at_level(logging.WARNING, logger="emerald.slow_queries"):
+            get_trades(db_session, currency="USD")
+        
+        record = next(r for r in caplog.records if "FROM trades" in r.getMessage())
+        assert "crud.get_trades" in record.getMessage()
+        entry = next(e for e in slow_log.top(50) if "FROM trades" in e["statement"])
+        assert entry["callers"] == {"crud.get_trades": 1}
+        assert any("SCAN" in line or "SEARCH" in line for line in entry["plan"])
+        assert entry["slowest"]["parameters"]
+    
+    def test_aggregates_by_shape(self, db_session, sample_trade, slow_log):
+        """Test that repeated shapes accumulate and rank by count."""
+        for currency in ("USD", "EUR", "GBP"):
+            get_pnl.__wrapped__(db_session, currency=currency)
+        
+        top = slow_log.top(1, sort="count")[0]
+        assert top["count"] == 3
+        assert top["callers"] == {"crud.get_pnl": 3}
+        assert top["mean_ms"] == pytest.approx(top["total_ms"] / 3, abs=0.001)
+    
+    def test_route_attribution_and_endpoint(self, client, sample_trade, slow_log):
+        """Test that statements issued by a request carry its route template."""
+        client.get(f"/trades/{sample_trade.id}")
+        
+        routes = {route for entry in slow_log.top(50) for route in entry["routes"]}
+        assert "GET /trades/{trade_id}" in routes
+        body = client.get("/reports/slow-queries?sort=max_ms").json()
+        assert body["enabled"] is False  # the process-wide log stays off in tests
+        assert body["statements"] == []
+    
+    def test_bounded_shapes(self, db_session, sample_trade):
+        """Test that the cheapest shape is dropped once the log is full."""
+        log = SlowQueryLog(threshold_ms=1e-9, max_shapes=2)
+        log.watch(engine)
+        try:
+            get_trades(db_session)
+            get_pnl.__wrapped__(db_session)
+            get_trades(db_session, currency="USD")
+        finally:
+            log.unwatch(engine)
+        
+        assert len(log.top(10)) == 2
@@ -0,0 +1,54 @@
+"""
+Unit tests for table write-version counters.
+"""
+import pytest
+from sqlalchemy import insert
+import versioning
+from models import EmeraldLot
+from crud import create_emerald
+from schemas import EmeraldLotCreate
+
+
+class TestTableVersions:
+    """Test that commits, and only commits, bump versions."""
+    
+    def test_commit_bumps_table_and_rollup(self, db_session):
+        """Test that an ORM write bumps the table and its rollup."""
+        before = versioning.version("emerald_lots", "lot_status_counts", "trades")
+        
+        create_emerald(db_session, EmeraldLotCreate(lot_code="EM001", carat=1.0))
+        
+        after = versioning.version("emerald_lots", "lot_status_counts", "trades")
+        assert after[0] > before[0]
+        assert after[1] > before[1]
+        assert after[2] == before[2]
+    
+    def test_rollback_does_not_bump(self, db_session):
+        """Test that discarded writes leave versions alone."""
+        before = versioning.version("emerald_lots")
+        
+        db_session.add(EmeraldLot(lot_code="EM001", carat=1.0))
+        db_session.flush()
+        db_session.rollback()
+        
+        assert versioning.version("emerald_lots") == before
+    
+    def test_bulk_statement_bumps(self, db_session):
+        """Test that ORM bulk INSERT statements are tracked too."""
+        before = versioning.version("emerald_lots")
+        
+        db_session.execute(insert(EmeraldLot), [{"lot_code": "EM001", "carat": 1.0}])
+        db_session.commit()
+        
+        assert versioning.version("emerald_lots")[0] == before[0] + 1
+    
+    def test_subscribers_are_notified(self, db_session):
+        """Test that subscribers receive the written tables."""
+        seen = []
+        listener = versioning.subscribe(seen.append)
+        try:
+            create_emerald(db_session, EmeraldLotCreate(lot_code="EM001", carat=1.0))
+        finally:
+            versioning.unsubscribe(listener)
+        
+        assert {"emerald_lots", "lot_status_counts"} <= seen[-1]
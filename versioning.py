@@ -0,0 +1,124 @@
+"""
+I keep a write-version counter per table and use it for conditional GETs.
+Every committed ORM write (unit-of-work flushes and ORM bulk/DML statements
+issued through a Session) bumps the counters of the tables it touched, so a GET
+can build its ETag from the counters alone and answer If-None-Match with 304
+without opening a database connection or serializing anything.
+
+The counters live in process memory: ETags are exact for a single worker
+process (the default `uvicorn main:app`). Each process has its own epoch, so
+ETags never collide across restarts.
+"""
+
+import hashlib
+import threading
+import uuid
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tables summarized by rollups move together with their base table
+DERIVED_TABLES = {
+    "trades": ("pnl_daily",),
+    "emerald_lots": ("lot_status_counts",),
+}
+
+_EPOCH = uuid.uuid4().hex[:8]
+_versions = {}
+_lock = threading.Lock()
+_listeners = []
+
+
+def bump(*tables):
+    """Advance the version of each table and notify subscribers."""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+    for listener in _listeners:
+        listener(set(tables))
+
+
+def version(*tables):
+    """Current versions of `tables`, in the order given."""
+    with _lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+
+def subscribe(listener):
+    """Call `listener(tables)` after every commit that wrote to `tables`."""
+    _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener):
+    _listeners.remove(listener)
+
+
+# --- Session hooks ---
+def _pending(session: Session):
+    return session.info.setdefault("written_tables", set())
+
+
+def _touch(session: Session, table_name: str):
+    pending = _pending(session)
+    pending.add(table_name)
+    pending.update(DERIVED_TABLES.get(table_name, ()))
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            _touch(session, table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_dml(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _touch(orm_execute_state.session, mapper.local_table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session):
+    written = session.info.pop("written_tables", None)
+    if written:
+        bump(*written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("written_tables", None)
+
+
+# --- Conditional GET ---
+def make_etag(request: Request, tables):
+    """Weak ETag from the table versions plus the path and sorted query string."""
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.blake2b(f"{request.url.path}?{params}".encode(), digest_size=6).hexdigest()
+    versions = ".".join(str(v) for v in version(*tables))
+    return f'W/"{_EPOCH}-{versions}-{digest}"'
+
+
+def check_etag(request: Request, response: Response, tables):
+    """Raise 304 when If-None-Match matches the ETag of `tables`, else stamp the ETag on `response`."""
+    etag = make_etag(request, tables)
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+
+def conditional_get(*tables):
+    """
+    Route dependency: I answer a matching If-None-Match with 304 before the
+    handler (and its database session) runs, and stamp the ETag otherwise.
+    Declare it before the db dependency.
+    """
+    def check(request: Request, response: Response):
+        check_etag(request, response, tables)
+    return check